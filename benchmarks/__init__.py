@@ -0,0 +1 @@
+"""Benchmarks and load tooling for dnd_gen (not shipped with the package)."""
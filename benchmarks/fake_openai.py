@@ -0,0 +1,229 @@
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Answers ``POST /v1/chat/completions`` after a configurable delay with a
+canned name, list of names or backstory, so end-to-end runs measure our
+overhead rather than the provider's. It can also fail a fraction of requests
+(429/500, as the real API does under load), stall a fraction of them for a
+slow tail, enforce a requests-per-minute ceiling with 429s, and honours
+``stream=True`` with server-sent events, spacing chunks by ``token_interval``.
+
+    python -m benchmarks.fake_openai --port 8011 --latency 0.3 --error-rate 0.05 --rpm 600
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIRST = ["Arin", "Belra", "Cedric", "Dora", "Elryn", "Faelar", "Gorin", "Hilda", "Isen", "Jora",
+         "Kael", "Lirien", "Marek", "Nessa", "Orin", "Perrin", "Quill", "Rhea", "Soren", "Tamsin"]
+LAST = ["Stoneheart", "Ravenshadow", "Ironfist", "Moonwhisper", "Stormblade", "Duskbane",
+        "Amberfall", "Brightwater", "Copperkettle", "Deepdelve", "Emberlock", "Frostmantle"]
+STORY = (
+    "{name} was raised far from the great cities, learning early that the world rewards "
+    "the patient and punishes the careless. Years of hardship shaped a stubborn resolve, "
+    "and when an old mentor vanished on the road north, {name} took up the search. "
+    "Rumours of a sealed vault, a broken oath and a debt owed to a stranger now pull "
+    "{obj} toward the frontier, and each of {poss} answers only raises two new questions."
+)
+
+def _reply(prompt):
+    batch = re.match(r"Generate (\d+) unique first and last names", prompt)
+    if batch:
+        names = random.sample([f"{f} {l}" for f in FIRST for l in LAST], int(batch.group(1)))
+        return "\n".join(f"{i}. {name}" for i, name in enumerate(names, 1))
+    if "first and last name" in prompt:
+        return f"{random.choice(FIRST)} {random.choice(LAST)}"
+    match = re.search(r"^Name: (.*)$", prompt, re.M)
+    pronouns = re.search(r"^Pronouns: \w+/(\w+)/(\w+)$", prompt, re.M)
+    obj, poss = pronouns.groups() if pronouns else ("them", "their")
+    return STORY.format(name=match.group(1) if match else "The hero", obj=obj, poss=poss)
+
+def _admit(server):
+    """Enforce `rpm` the way OpenAI does, quantized to rpm/60 per rolling second.
+
+    Call with the server lock held.
+    """
+    now = time.monotonic()
+    while server.window and now - server.window[0] >= 1.0:
+        server.window.popleft()
+    if len(server.window) >= max(1, server.rpm // 60):
+        server.rate_limited += 1
+        return False
+    server.window.append(now)
+    return True
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body go out as separate writes
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests += 1
+            limited = server.rpm is not None and not _admit(server)
+        if limited:
+            self._send_json(429, {"error": {"message": "fake rate limit reached",
+                                            "type": "requests", "code": "rate_limit_exceeded"}})
+            return
+        if random.random() < server.slow_rate:
+            time.sleep(server.slow_latency)
+        else:
+            time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+
+        if random.random() < server.error_rate:
+            with server.lock:
+                server.errors += 1
+            status, kind = random.choice([(429, "rate_limit_exceeded"), (500, "server_error")])
+            self._send_json(status, {"error": {"message": f"fake {kind}", "type": kind, "code": kind}})
+            return
+
+        text = _reply(body.get("messages", [{}])[-1].get("content", ""))
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        completion_tokens = len(text.split())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if body.get("stream"):
+            self._stream(body, text, usage)
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _send_json(self, status, obj):
+        payload = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, text, usage):
+        # No Content-Length: the event stream ends when the connection closes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else " " + word},
+                    "finish_reason": "stop" if i == len(words) - 1 else None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.server.token_interval)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                     "created": int(time.time()), "model": body.get("model", "fake"),
+                     "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-reply; that is part of the test
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class FakeOpenAIServer:
+    """Threaded fake endpoint; use as a context manager and pass `base_url` to the client."""
+
+    def __init__(self, latency=0.05, host="127.0.0.1", port=0, error_rate=0.0,
+                 jitter=0.0, token_interval=0.005, rpm=None, slow_rate=0.0, slow_latency=5.0):
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.error_rate = error_rate
+        self.httpd.token_interval = token_interval
+        self.httpd.rpm = rpm
+        self.httpd.slow_rate = slow_rate
+        self.httpd.slow_latency = slow_latency
+        self.httpd.window = deque()
+        self.httpd.rate_limited = 0
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.errors = 0
+        self._thread = None
+
+    @property
+    def stats(self):
+        return {"requests": self.httpd.requests, "errors": self.httpd.errors,
+                "rate_limited": self.httpd.rate_limited}
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="seconds before the first byte of each completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds added to latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 429/500")
+    parser.add_argument("--token-interval", type=float, default=0.005,
+                        help="seconds between streamed chunks")
+    parser.add_argument("--rpm", type=int, help="requests per minute before answering 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0,
+                        help="fraction of requests that take --slow-latency instead")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    server = FakeOpenAIServer(args.latency, args.host, args.port, args.error_rate,
+                              args.jitter, args.token_interval, args.rpm,
+                              args.slow_rate, args.slow_latency)
+    print(f"Fake OpenAI endpoint on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
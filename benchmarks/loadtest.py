@@ -0,0 +1,181 @@
+"""Multi-session load test of the Streamlit app against the fake endpoint.
+
+Each simulated session is an ``AppTest`` instance of ``dnd_generator_app.py``
+that clicks "Create Character" repeatedly with an AI-generated name. Sessions
+run on their own threads inside this process, sharing the dnd_gen module
+state exactly as sessions of one Streamlit server do.
+
+    python -m benchmarks.loadtest --sessions 16 --iterations 5 --latency 0.3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dnd_gen import ai
+from dnd_gen.cache import ResponseCache, set_response_cache
+from dnd_gen.gateway import LLMGateway, get_gateway, set_gateway
+from dnd_gen.store import CharacterStore, set_character_store
+
+from .fake_openai import FakeOpenAIServer
+
+APP = Path(__file__).resolve().parent.parent / "dnd_generator_app.py"
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values` (q in 0–100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _thread_safe_apptest():
+    """Let ``AppTest`` sessions run on concurrent threads.
+
+    Each ``AppTest.run`` installs a mock Runtime and clears it when it
+    finishes, pulling it out from under runs still in progress on other
+    threads, so fall back to the most recent mock. Script compilation is
+    serialized because concurrent ``ast.parse`` calls can fail on CPython
+    3.11 ("AST constructor recursion depth mismatch").
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original_instance = Runtime.instance.__func__
+    latest = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+        elif latest:
+            return latest[0]
+        return original_instance(cls)
+
+    original_bytecode = ScriptCache.get_bytecode
+    compile_lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return original_bytecode(self, script_path)
+
+    Runtime.instance = classmethod(instance)
+    ScriptCache.get_bytecode = get_bytecode
+
+_setup_lock = threading.Lock()
+
+def _session(base_url, iterations, stream, timeout, start):
+    from streamlit.testing.v1 import AppTest
+
+    try:
+        # Sessions load one at a time; only the clicks below run concurrently
+        with _setup_lock:
+            at = AppTest.from_file(str(APP), default_timeout=timeout)
+            at.secrets["OPENAI_API_KEY"] = "fake-key"
+            at.secrets["OPENAI_BASE_URL"] = base_url
+            at.run()
+            at.radio(key="name_option").set_value("AI-generated")
+            at.checkbox(key="stream_story").set_value(stream)
+            at.run()
+    except BaseException:
+        start.abort()   # don't leave the other sessions waiting at the start line
+        raise
+    start.wait()
+
+    latencies, failures = [], 0
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        at.button(key="create_character").click().run()
+        latencies.append(time.perf_counter() - t0)
+        sheet = at.session_state["sheet"]
+        if at.exception or "Error" in sheet.name or "Error:" in (sheet.backstory or ""):
+            failures += 1
+    return latencies, failures
+
+def run(args):
+    set_response_cache(ResponseCache(max_size=0 if args.no_cache else 512))
+    set_gateway(LLMGateway(rpm=args.rpm, tpm=None))
+    set_character_store(CharacterStore(":memory:"))
+    _thread_safe_apptest()
+    with FakeOpenAIServer(latency=args.latency, error_rate=args.error_rate, jitter=args.jitter,
+                          token_interval=args.token_interval, rpm=args.rpm,
+                          slow_rate=args.slow_rate, slow_latency=args.slow_latency) as server:
+        ai.configure(api_key="fake-key", base_url=server.base_url)
+        # AppTest swaps the global st.secrets during each run, so concurrent
+        # sessions can see each other's (or no) secrets; the env is shared.
+        os.environ.update(OPENAI_API_KEY="fake-key", OPENAI_BASE_URL=server.base_url)
+        start = threading.Barrier(args.sessions + 1)
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(_session, server.base_url, args.iterations, args.stream,
+                                   args.timeout, start)
+                       for _ in range(args.sessions)]
+            try:
+                start.wait()
+            except threading.BrokenBarrierError:
+                pass        # a session failed to start; its error surfaces below
+            t0 = time.perf_counter()
+            errors = [f.exception() for f in futures]
+            for error in errors:
+                if error is not None and not isinstance(error, threading.BrokenBarrierError):
+                    raise error
+            results = [f.result() for f in futures]
+            wall = time.perf_counter() - t0
+        upstream = server.stats
+
+    latencies = [lat for lats, _ in results for lat in lats]
+    failures = sum(f for _, f in results)
+    return {
+        "config": vars(args),
+        "characters": len(latencies),
+        "failures": failures,
+        "wall_s": wall,
+        "throughput_per_s": len(latencies) / wall,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.fmean(latencies),
+            "max": max(latencies),
+        },
+        "upstream": upstream,
+        "gateway": get_gateway().stats(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit app offline.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=5, help="characters per session")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--slow-rate", type=float, default=0.0,
+                        help="fraction of upstream requests that take --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=5.0)
+    parser.add_argument("--rpm", type=int,
+                        help="provider request ceiling, enforced by the fake endpoint and the gateway")
+    parser.add_argument("--stream", action="store_true", help="stream the backstory")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--timeout", type=float, default=120, help="per-run AppTest timeout")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    lat = report["latency_s"]
+    print(f"{report['characters']} characters, {report['failures']} failed, "
+          f"{report['throughput_per_s']:.2f}/s, p50 {lat['p50']:.3f}s "
+          f"p95 {lat['p95']:.3f}s p99 {lat['p99']:.3f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,214 @@
+"""Reproducible timings for the generation, rules and rendering hot paths.
+
+    python -m benchmarks.run                         # print JSON
+    python -m benchmarks.run -o bench.json           # save results
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Every benchmark reports the best and median time per call over several
+repeats. The end-to-end run talks to `benchmarks.fake_openai` with
+``--latency`` seconds per completion, the response cache disabled, no
+gateway rate limits and a fresh, cold name pool.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+from dnd_gen import ai
+from dnd_gen.cache import ResponseCache, get_response_cache, set_response_cache
+from dnd_gen.character import Character
+from dnd_gen.dice import roll_stat
+from dnd_gen.gateway import LLMGateway, get_gateway, set_gateway
+from dnd_gen.namepool import NamePool, get_name_pool, set_name_pool
+from dnd_gen.rules import ABILITIES, RACES, apply_racial_asi, asi_slots_available
+from dnd_gen.sheet import create_character, sheet_text
+
+from .fake_openai import FakeOpenAIServer
+
+STATS = {"Strength": 15, "Dexterity": 14, "Constitution": 13,
+         "Intelligence": 12, "Wisdom": 10, "Charisma": 8}
+SHEET = {
+    "name": "Arin Stoneheart", "race": "Half-Elf", "class": "Fighter",
+    "background": "Soldier", "alignment": "Lawful Good", "level": 8,
+    "base_stats": STATS, "final_stats": apply_racial_asi(STATS, "Half-Elf"),
+    "backstory": "Arin grew up on the march. " * 20, "apply_racial": True,
+}
+CHARACTER = Character.from_dict(SHEET)
+SCORES = tuple(SHEET["final_stats"][a] for a in ABILITIES)
+E2E = ("create_character_ai", "race_name_ai")   # run against the fake endpoint
+
+def _time(func, repeat, min_time=0.2):
+    """Return (best, median) seconds per call, auto-sizing the loop count."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return min(runs), statistics.median(runs)
+
+def _benchmarks(args):
+    yield "roll_stat", lambda: roll_stat(), 1
+    yield "roll_stat_x6", lambda: {a: roll_stat() for a in ABILITIES}, 1
+    yield "apply_racial_asi", lambda: apply_racial_asi(STATS, "Dwarf"), 1
+    yield "apply_racial_asi_half_elf", lambda: apply_racial_asi(STATS, "Half-Elf", ["Strength", "Wisdom"]), 1
+    yield "apply_racial_asi_human", lambda: apply_racial_asi(STATS, "Human"), 1
+    yield "apply_racial_asi_subrace", lambda: apply_racial_asi(STATS, "Dwarf", subrace="Hill Dwarf"), 1
+    yield "asi_slots_available", lambda: asi_slots_available("Fighter", 14), 1
+    yield "sheet_text", lambda: sheet_text(CHARACTER), 1
+    yield "character_apply_asi", lambda: CHARACTER.copy().apply_asi("Wisdom", 1, "Charisma"), 1
+
+    import numpy as np
+    from dnd_gen.batch import generate_characters
+    from dnd_gen import seeding
+    seeds = seeding.character_seeds(seeding.spawn(0, 1)[0], 100_000)
+    yield "generate_characters_100k", lambda: generate_characters(100_000), 100_000
+    yield "generate_characters_100k_seeded", lambda: generate_characters(100_000, seeds=seeds), 100_000
+    wood_elves = dict(race="Elf", subrace="Wood Elf", spend_asis=True)
+    yield "generate_characters_100k_subrace", lambda: generate_characters(100_000, **wood_elves), 100_000
+
+    from dnd_gen.asiplan import _plan, plan_increments
+    rolled = generate_characters(100_000, rng=np.random.default_rng(0))
+    yield "plan_asis_uncached", lambda: _plan.__wrapped__("Fighter", SCORES, 7), 1
+    yield "plan_asis_100k", lambda: plan_increments(rolled["final_stats"], rolled["class"], 5), 100_000
+
+    from dnd_gen.progression import progress_batch, timeline
+    novice = Character.from_dict({**SHEET, "level": 1})
+    yield "progression_timeline", lambda: timeline(novice), 1
+    yield "progress_batch_100k", lambda: progress_batch(rolled["final_stats"], rolled["class"]), 100_000
+
+    from dnd_gen.render import write_sheets
+    from dnd_gen.sheet import iter_characters
+    npcs = list(iter_characters(100_000, seed=0))
+    for fmt in ("txt", "md", "json", "html"):
+        yield f"write_sheets_100k_{fmt}", lambda fmt=fmt: write_sheets(npcs, io.BytesIO(), fmt), 100_000
+
+    from dnd_gen.names import get_name_generator
+    names = get_name_generator()
+    every_race = np.arange(100_000) % len(RACES)
+    yield "random_name", lambda: names.name("Elf"), 1
+    yield "markov_names_100k", lambda: names.generate_for(every_race), 100_000
+    yield "markov_names_100k_seeded", lambda: names.generate_for(every_race, seeds=seeds), 100_000
+
+    offline = dict(race="Elf", char_class="Wizard", background="Sage",
+                   alignment="True Neutral", gender="Female", level=5)
+    yield "create_character_offline", lambda: create_character(**offline), 1
+    if not args.skip_e2e:
+        yield "create_character_ai", lambda: create_character(ai_name=True, **offline), 1
+        yield "race_name_ai", lambda: ai.generate_race_name_ai("Elf", "Wizard", "Female"), 1
+
+def _memory(count=10_000):
+    """Bytes per live character: classic sheet dict vs `Character`."""
+    import tracemalloc
+
+    def build_dicts():
+        return [dict(SHEET, base_stats=dict(STATS), final_stats=dict(SHEET["final_stats"]))
+                for _ in range(count)]
+
+    def build_characters():
+        return [Character.from_dict(SHEET) for _ in range(count)]
+
+    out = {}
+    for name, build in (("sheet_dict", build_dicts), ("character", build_characters)):
+        tracemalloc.start()
+        objects = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del objects
+        out[f"{name}_bytes"] = size / count
+    return out
+
+def run(args):
+    results = {}
+    server = None if args.skip_e2e else FakeOpenAIServer(latency=args.latency).start()
+    previous_cache = get_response_cache()
+    previous_gateway = get_gateway()
+    previous_pool = get_name_pool()
+    try:
+        for name, func, items in _benchmarks(args):
+            if name in E2E:
+                ai.configure(api_key="fake-key", base_url=server.base_url)
+                set_response_cache(ResponseCache(max_size=0))
+                set_gateway(LLMGateway(rpm=None, tpm=None))
+                set_name_pool(NamePool())
+            else:
+                ai.configure(api_key=None)
+            best, median = _time(func, args.repeat, args.min_time)
+            results[name] = {
+                "best_s": best,
+                "median_s": median,
+                "items_per_s": items / median,
+            }
+            print(f"{name:<28} {median * 1e6:>14.2f} µs/call", file=sys.stderr)
+    finally:
+        set_response_cache(previous_cache)
+        set_gateway(previous_gateway)
+        set_name_pool(previous_pool)
+        if server is not None:
+            server.stop()
+    memory = _memory()
+    print(f"{'memory per character':<28} dict {memory['sheet_dict_bytes']:.0f} B, "
+          f"Character {memory['character_bytes']:.0f} B", file=sys.stderr)
+    return {"meta": _meta(args), "results": results, "memory": memory}
+
+def _meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "fake_latency_s": None if args.skip_e2e else args.latency,
+    }
+
+def compare(current, baseline, tolerance):
+    """Print best-time ratios against `baseline`; return names slower than `tolerance`."""
+    regressions = []
+    for name, res in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = res["best_s"] / base["best_s"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<28} {ratio:>6.2f}x {flag}", file=sys.stderr)
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dnd_gen benchmark suite")
+    parser.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="fake endpoint seconds per completion")
+    parser.add_argument("--skip-e2e", action="store_true", help="skip the fake-endpoint run")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a saved run")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before --compare fails")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
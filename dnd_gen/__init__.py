@@ -0,0 +1,75 @@
+"""UI-free core of the D&D character generator.
+
+The rule tables and scalar helpers are imported eagerly; everything that
+pulls in NumPy, OpenAI or asyncio is resolved on first attribute access.
+"""
+from importlib import import_module
+
+from .dice import generate_name, roll_stat
+from .rules import (
+    ABILITIES, ALIGNMENTS, ASI_LEVELS, BACKGROUNDS, CLASSES, GENDERS, PRONOUNS, RACE_ASI,
+    RACES, SUBRACES, apply_racial_asi, asi_slots_available,
+)
+
+_LAZY = {
+    "generate_characters": "dnd_gen.batch",
+    "find_allocations": "dnd_gen.pointbuy",
+    "optimize_point_buy": "dnd_gen.pointbuy",
+    "plan_asis": "dnd_gen.asiplan",
+    "plan_increments": "dnd_gen.asiplan",
+    "Progression": "dnd_gen.progression",
+    "timeline": "dnd_gen.progression",
+    "progress_batch": "dnd_gen.progression",
+    "score_pmf": "dnd_gen.probability",
+    "total_pmf": "dnd_gen.probability",
+    "modifier_distribution": "dnd_gen.probability",
+    "array_percentile": "dnd_gen.probability",
+    "configure": "dnd_gen.ai",
+    "generate_race_name_ai": "dnd_gen.ai",
+    "fetch_names": "dnd_gen.ai",
+    "generate_backstory": "dnd_gen.ai",
+    "stream_backstory": "dnd_gen.ai",
+    "generate_many": "dnd_gen.ai",
+    "agenerate_many": "dnd_gen.ai",
+    "LLMGateway": "dnd_gen.gateway",
+    "get_gateway": "dnd_gen.gateway",
+    "set_gateway": "dnd_gen.gateway",
+    "Resilience": "dnd_gen.resilience",
+    "get_resilience": "dnd_gen.resilience",
+    "set_resilience": "dnd_gen.resilience",
+    "TemplateBank": "dnd_gen.templates",
+    "get_template_bank": "dnd_gen.templates",
+    "set_template_bank": "dnd_gen.templates",
+    "MarkovNames": "dnd_gen.names",
+    "get_name_generator": "dnd_gen.names",
+    "random_name": "dnd_gen.names",
+    "NamePool": "dnd_gen.namepool",
+    "get_name_pool": "dnd_gen.namepool",
+    "set_name_pool": "dnd_gen.namepool",
+    "CharacterStore": "dnd_gen.store",
+    "get_character_store": "dnd_gen.store",
+    "set_character_store": "dnd_gen.store",
+    "Character": "dnd_gen.character",
+    "create_character": "dnd_gen.sheet",
+    "iter_characters": "dnd_gen.sheet",
+    "character_from_seed": "dnd_gen.sheet",
+    "new_seed": "dnd_gen.seeding",
+    "sheet_text": "dnd_gen.sheet",
+    "render": "dnd_gen.render",
+    "write_sheets": "dnd_gen.render",
+    "generate_sharded": "dnd_gen.bulk",
+    "iter_export": "dnd_gen.export",
+    "write_export": "dnd_gen.export",
+}
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
+
+__all__ = [
+    "ABILITIES", "ALIGNMENTS", "ASI_LEVELS", "BACKGROUNDS", "CLASSES", "GENDERS", "PRONOUNS",
+    "RACE_ASI", "RACES", "SUBRACES", "apply_racial_asi", "asi_slots_available", "generate_name", "roll_stat",
+    *_LAZY,
+]
@@ -0,0 +1,501 @@
+"""OpenAI-backed name and backstory generation with local fallbacks.
+
+``openai`` is imported on first use, so importing this module stays cheap
+for workers and scripts that never touch the API.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+
+from .cache import NAME_SLOT, fill_name, get_response_cache, strip_name
+from .dice import generate_name
+from .gateway import INTERACTIVE, BudgetExceeded, estimate_tokens, get_gateway
+from .metrics import (
+    FALLBACKS, GENERATE_SECONDS, LLM_REQUESTS, LLM_SECONDS, record_usage, timed,
+)
+from .namepool import get_name_pool
+from .resilience import ProviderUnavailable, get_resilience, is_transient
+from .templates import get_template_bank, make_template, personalize, template_key
+
+# -----------------------------
+# Config & client
+# -----------------------------
+_api_key = os.getenv("OPENAI_API_KEY")
+_base_url = os.getenv("OPENAI_BASE_URL")
+_client = None
+_aclient = None
+_loop = None
+_client_lock = threading.Lock()
+
+def configure(api_key=None, base_url=None):
+    """Set the OpenAI key and optional endpoint; a falsy key disables AI.
+
+    The initial values come from ``OPENAI_API_KEY`` and ``OPENAI_BASE_URL``.
+    """
+    global _api_key, _base_url, _client, _aclient
+    with _client_lock:
+        if (api_key, base_url) != (_api_key, _base_url):
+            _api_key, _base_url = api_key, base_url
+            _client = _aclient = None
+
+def ai_enabled():
+    return bool(_api_key)
+
+def get_client():
+    """Return the shared OpenAI client, building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                # Retries and timeouts are dnd_gen.resilience's job
+                _client = OpenAI(api_key=_api_key, base_url=_base_url, max_retries=0)
+    return _client
+
+def _background_loop():
+    """Event loop thread that owns the shared AsyncOpenAI client.
+
+    Building an AsyncOpenAI client costs tens of milliseconds and its
+    connection pool is tied to one loop, so the blocking wrappers run every
+    batch on this loop instead of a fresh ``asyncio.run``.
+    """
+    global _loop, _aclient
+    if _loop is None:
+        with _client_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="dnd-gen-ai", daemon=True).start()
+                _loop = loop
+    if _aclient is None:
+        with _client_lock:
+            if _aclient is None:
+                from openai import AsyncOpenAI
+                _aclient = AsyncOpenAI(api_key=_api_key, base_url=_base_url, max_retries=0)
+    return _loop, _aclient
+
+RACE_NAME_STYLES = {
+    "Dragonborn": "powerful, draconic names, often harsh and guttural",
+    "Dwarf": "gritty, earthy Dwarven names that sound sturdy and traditional",
+    "Elf": "elegant, melodic Elvish names with lyrical qualities",
+    "Gnome": "quirky, playful names with a touch of cleverness or whimsy",
+    "Half-Elf": "a blend of Elvish elegance and Human familiarity",
+    "Half-Orc": "rough, strong-sounding names with Orcish grit and Human influence",
+    "Halfling": "cheerful, simple names with a rural, friendly tone",
+    "Human": "classic medieval fantasy names with cultural variety",
+    "Tiefling": "mysterious, dark names, often with infernal or celestial flair"
+}
+
+def _names_prompt(race, char_class, gender, count):
+    style = RACE_NAME_STYLES.get(race, "fantasy names")
+    return (
+        f"Generate {count} unique first and last names for a {gender.lower()} {race} "
+        f"{char_class} in D&D. Use {style}. Return one name per line and nothing else."
+    )
+
+_LIST_MARKER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+
+def _parse_names(text):
+    """Names from a one-per-line completion, minus numbering, bullets and quotes."""
+    names = []
+    for line in text.splitlines():
+        name = _LIST_MARKER.sub("", line).strip().strip("\"'*").strip()
+        if name and len(name) <= 40 and 1 <= len(name.split()) <= 4:
+            names.append(name)
+    return names
+
+def _backstory_prompt(name, race, char_class, background, alignment, pronoun):
+    return (
+        f"Write a short D&D backstory for this character:\n"
+        f"Name: {name}\nRace: {race}\nClass: {char_class}\n"
+        f"Background: {background}\nAlignment: {alignment}\n"
+        f"Pronouns: {pronoun['subj']}/{pronoun['obj']}/{pronoun['poss']}"
+    )
+
+def fallback_backstory(name, race, char_class, background, alignment, pronoun):
+    return (
+        f"{name} is a {alignment.lower()} {race} {char_class} who grew up as a "
+        f"{background.lower()}. {pronoun['subj']} seeks adventure to prove "
+        f"{pronoun['poss']} worth to the world."
+    )
+
+def _backstory_key(race, char_class, background, alignment, pronoun):
+    # The name is not part of the key: stories are cached with a name slot
+    # and re-personalized on the way out.
+    return ("backstory", race, char_class, background, alignment,
+            pronoun['subj'], pronoun['obj'], pronoun['poss'])
+
+def _stored_backstory(name, race, char_class, background, alignment, pronoun):
+    """A stored backstory personalized for `name`, or None to write a fresh one.
+
+    In reuse mode the template bank decides, otherwise the response cache.
+    With `name` None the name slots are left in.
+    """
+    bank = get_template_bank()
+    if bank.reuse:
+        template = bank.draw(template_key(race, char_class, background, alignment, pronoun))
+        return None if template is None else personalize(template, name, pronoun)
+    cached = get_response_cache().get(_backstory_key(race, char_class, background, alignment,
+                                                     pronoun))
+    return fill_name(cached, name) if cached is not None and name else cached
+
+def _store_backstory(story, name, race, char_class, background, alignment, pronoun):
+    """Keep a fresh backstory for `_stored_backstory` (`name` None: already slotted)."""
+    bank = get_template_bank()
+    if bank.reuse:
+        bank.add(template_key(race, char_class, background, alignment, pronoun),
+                 make_template(story, name, pronoun))
+    else:
+        get_response_cache().put(_backstory_key(race, char_class, background, alignment, pronoun),
+                                 strip_name(story, name) if name else story)
+
+def _observe(op, start, ok=True, usage=None):
+    """Record one upstream completion: latency, outcome and token usage."""
+    if not ok:
+        LLM_REQUESTS.inc(op=op, outcome="error")
+        return
+    LLM_SECONDS.observe(time.perf_counter() - start, op=op)
+    LLM_REQUESTS.inc(op=op, outcome="ok")
+    record_usage(op, usage)
+
+def _complete(prompt, temperature, max_tokens, priority, session, op):
+    """One completion through the gateway; identical concurrent prompts share a call.
+
+    The call runs under the resilience policy (deadline, retries, hedging,
+    circuit breaker) and raises `ProviderUnavailable` when it gives up.
+    """
+    policy = get_resilience()
+    deadline = policy.begin()
+    gateway = get_gateway()
+    tokens = estimate_tokens(prompt, max_tokens)
+
+    def attempt(timeout):
+        start = time.perf_counter()
+        try:
+            resp = get_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            )
+        except Exception:
+            _observe(op, start, ok=False)
+            raise
+        _observe(op, start, usage=resp.usage)
+        return resp
+
+    def run():
+        return policy.call(attempt, deadline, op, on_retry=lambda: gateway.debit(tokens))
+    # An interactive call never joins a bulk one: it would wait at the bulk priority
+    resp = gateway.call(run, tokens, key=(prompt, temperature, max_tokens, priority),
+                        priority=priority, session=session, deadline=deadline)
+    return resp.choices[0].message.content.strip()
+
+def fetch_names(race, char_class, gender, count, session=None, priority=INTERACTIVE):
+    """Ask for `count` names in one completion; the name pools refill with this."""
+    prompt = _names_prompt(race, char_class, gender, count)
+    return _parse_names(_complete(prompt, 1.0, count * 8, priority, session, "names"))
+
+@timed(GENERATE_SECONDS, op="race_name")
+def generate_race_name_ai(race, char_class, gender, session=None, priority=INTERACTIVE):
+    # Fallback if no key
+    if not ai_enabled():
+        FALLBACKS.inc(op="race_name", reason="no_key")
+        return generate_name(race)
+
+    try:
+        return get_name_pool().get(race, char_class, gender, session, priority)
+    except BudgetExceeded:
+        FALLBACKS.inc(op="race_name", reason="budget")
+        return generate_name(race)
+    except ProviderUnavailable as e:
+        FALLBACKS.inc(op="race_name", reason=e.reason)
+        return generate_name(race)
+    except Exception:
+        FALLBACKS.inc(op="race_name", reason="error")
+        return generate_name(race)
+
+@timed(GENERATE_SECONDS, op="backstory")
+def generate_backstory(name, race, char_class, background, alignment, pronoun,
+                       session=None, priority=INTERACTIVE):
+    # Fallback if no key
+    if not ai_enabled():
+        FALLBACKS.inc(op="backstory", reason="no_key")
+        return fallback_backstory(name, race, char_class, background, alignment, pronoun)
+
+    stored = _stored_backstory(name, race, char_class, background, alignment, pronoun)
+    if stored is not None:
+        return stored
+
+    prompt = _backstory_prompt(name, race, char_class, background, alignment, pronoun)
+    try:
+        story = _complete(prompt, 0.8, 300, priority, session, "backstory")
+        _store_backstory(story, name, race, char_class, background, alignment, pronoun)
+        return story
+    except BudgetExceeded:
+        FALLBACKS.inc(op="backstory", reason="budget")
+        return fallback_backstory(name, race, char_class, background, alignment, pronoun)
+    except ProviderUnavailable as e:
+        FALLBACKS.inc(op="backstory", reason=e.reason)
+        return fallback_backstory(name, race, char_class, background, alignment, pronoun)
+    except Exception:
+        FALLBACKS.inc(op="backstory", reason="error")
+        return fallback_backstory(name, race, char_class, background, alignment, pronoun)
+
+class BackstoryInterrupted(RuntimeError):
+    """A streamed backstory failed after part of it had been yielded.
+
+    `partial` is the text streamed so far, which is not a usable backstory,
+    and `fallback` an offline backstory to show and keep instead.
+    """
+
+    def __init__(self, partial, fallback, error):
+        super().__init__(f"the backstory stream broke off: {error}")
+        self.partial = partial
+        self.fallback = fallback
+
+def stream_backstory(name, race, char_class, background, alignment, pronoun,
+                     session=None, priority=INTERACTIVE):
+    """Yield the backstory in chunks as the model writes it (``stream=True``).
+
+    Errors before any text fall back to an offline backstory. A stream that
+    breaks off midway raises `BackstoryInterrupted` instead of yielding
+    more, so the partial text is never taken for a whole backstory. Only
+    the time spent waiting for chunks is observed, not the consumer's.
+    """
+    chunks = _stream_backstory(name, race, char_class, background, alignment, pronoun,
+                               session, priority)
+    waited = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                waited += time.perf_counter() - start
+            yield chunk
+    finally:
+        chunks.close()
+        GENERATE_SECONDS.observe(waited, op="backstory_stream")
+
+def _stream_backstory(name, race, char_class, background, alignment, pronoun, session, priority):
+    if not ai_enabled():
+        FALLBACKS.inc(op="backstory", reason="no_key")
+        yield fallback_backstory(name, race, char_class, background, alignment, pronoun)
+        return
+
+    stored = _stored_backstory(name, race, char_class, background, alignment, pronoun)
+    if stored is not None:
+        yield stored
+        return
+
+    prompt = _backstory_prompt(name, race, char_class, background, alignment, pronoun)
+    parts = []
+    usage = None
+    gateway = get_gateway()
+    policy = get_resilience()
+    tokens = estimate_tokens(prompt, 300)
+
+    def open_stream(timeout):
+        # `timeout` also bounds every wait for the next chunk
+        return get_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.8,
+            max_tokens=300,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+        )
+
+    try:
+        deadline = policy.begin()
+        # Streams are never shared, but still wait their turn for a request slot
+        with gateway.slot(tokens, priority, session, deadline):
+            start = time.perf_counter()
+            try:
+                # Opening the stream is retried; once text has been shown it is not
+                stream = policy.call(open_stream, deadline, "backstory_stream", hedge=False,
+                                     on_retry=lambda: gateway.debit(tokens))
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage   # sent on the last chunk
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        paused = time.perf_counter()
+                        yield delta
+                        start += time.perf_counter() - paused   # the consumer's time is not latency
+            except Exception as e:
+                _observe("backstory_stream", start, ok=False)
+                if is_transient(e):     # the stream broke after it opened
+                    policy.breaker.failure()
+                raise
+            _observe("backstory_stream", start, usage=usage)
+    except BudgetExceeded:
+        FALLBACKS.inc(op="backstory", reason="budget")
+        yield fallback_backstory(name, race, char_class, background, alignment, pronoun)
+        return
+    except ProviderUnavailable as e:
+        FALLBACKS.inc(op="backstory", reason=e.reason)
+        yield fallback_backstory(name, race, char_class, background, alignment, pronoun)
+        return
+    except Exception as e:
+        FALLBACKS.inc(op="backstory", reason="error")
+        fallback = fallback_backstory(name, race, char_class, background, alignment, pronoun)
+        if parts:
+            raise BackstoryInterrupted("".join(parts), fallback, e) from e
+        yield fallback
+        return
+    story = "".join(parts).strip()
+    tokens = getattr(usage, "total_tokens", None) or estimate_tokens(prompt + story, 0)
+    gateway.charge(session, tokens)
+    _store_backstory(story, name, race, char_class, background, alignment, pronoun)
+
+# ---------- Concurrent generation (AsyncOpenAI) ----------
+AI_CONCURRENCY = 8   # max in-flight completions per asyncio.run
+
+async def _acomplete(aclient, sem, prompt, temperature, max_tokens, priority, session, op):
+    policy = get_resilience()
+    deadline = policy.begin()
+    gateway = get_gateway()
+    tokens = estimate_tokens(prompt, max_tokens)
+
+    async def attempt(timeout):
+        start = time.perf_counter()
+        try:
+            resp = await aclient.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+            )
+        except Exception:
+            _observe(op, start, ok=False)
+            raise
+        _observe(op, start, usage=resp.usage)
+        return resp
+
+    async def run():
+        return await policy.acall(attempt, deadline, op, on_retry=lambda: gateway.debit(tokens))
+    async with sem:
+        resp = await gateway.acall(run, tokens, key=(prompt, temperature, max_tokens, priority),
+                                   priority=priority, session=session, deadline=deadline)
+    return resp.choices[0].message.content.strip()
+
+async def _agenerate_one(aclient, sem, spec, priority, session):
+    """Return (name, backstory) for one spec, running both completions at once.
+
+    Without a given name the backstory is drafted around NAME_SLOT and filled
+    in when the name arrives, so neither call waits for the other.
+    """
+    race, char_class, gender = spec["race"], spec["char_class"], spec["gender"]
+    background, alignment, pronoun = spec["background"], spec["alignment"], spec["pronoun"]
+    name = spec.get("name")
+
+    async def name_task():
+        try:
+            return await get_name_pool().aget(race, char_class, gender, session, priority)
+        except BudgetExceeded:
+            FALLBACKS.inc(op="race_name", reason="budget")
+            return generate_name(race)
+        except ProviderUnavailable as e:
+            FALLBACKS.inc(op="race_name", reason=e.reason)
+            return generate_name(race)
+        except Exception:
+            # Never an error message: it would be filled into the backstory as the name
+            FALLBACKS.inc(op="race_name", reason="error")
+            return generate_name(race)
+
+    async def backstory_task():
+        stored = _stored_backstory(name, race, char_class, background, alignment, pronoun)
+        if stored is not None:
+            return stored
+        prompt = _backstory_prompt(name or NAME_SLOT, race, char_class, background, alignment, pronoun)
+        if name is None:
+            prompt += f"\nRefer to the character only as {NAME_SLOT}, written exactly like that."
+        try:
+            story = await _acomplete(aclient, sem, prompt, 0.8, 300, priority, session, "backstory")
+        except BudgetExceeded:
+            FALLBACKS.inc(op="backstory", reason="budget")
+            return fallback_backstory(name or NAME_SLOT, race, char_class, background,
+                                      alignment, pronoun)
+        except ProviderUnavailable as e:
+            FALLBACKS.inc(op="backstory", reason=e.reason)
+            return fallback_backstory(name or NAME_SLOT, race, char_class, background,
+                                      alignment, pronoun)
+        except Exception:
+            FALLBACKS.inc(op="backstory", reason="error")
+            return fallback_backstory(name or NAME_SLOT, race, char_class, background,
+                                      alignment, pronoun)
+        _store_backstory(story, name, race, char_class, background, alignment, pronoun)
+        return story
+
+    if name is None:
+        name, story = await asyncio.gather(name_task(), backstory_task())
+    else:
+        story = await backstory_task()
+    return name, fill_name(story, name)
+
+async def agenerate_many(specs, concurrency=AI_CONCURRENCY, aclient=None,
+                         priority=INTERACTIVE, session=None):
+    """Generate (name, backstory) pairs for many specs concurrently.
+
+    Each spec is a dict with ``race``, ``char_class``, ``background``,
+    ``alignment``, ``gender``, ``pronoun`` and an optional ``name``. Without
+    `aclient` a client is opened for this call and closed afterwards. Every
+    completion is admitted by the gateway at `priority` and charged to
+    `session`. With AI off every pair comes from the offline generators.
+    """
+    if not ai_enabled():
+        return _offline_many(specs)
+    sem = asyncio.Semaphore(concurrency)
+    if aclient is not None:
+        return await _agather(aclient, sem, specs, priority, session)
+
+    from openai import AsyncOpenAI
+    async with AsyncOpenAI(api_key=_api_key, base_url=_base_url, max_retries=0) as aclient:
+        return await _agather(aclient, sem, specs, priority, session)
+
+def _offline_many(specs):
+    FALLBACKS.inc(len(specs), op="backstory", reason="no_key")
+    out = []
+    for spec in specs:
+        name = spec.get("name") or generate_name(spec["race"])
+        out.append((name, fallback_backstory(
+            name, spec["race"], spec["char_class"], spec["background"],
+            spec["alignment"], spec["pronoun"])))
+    return out
+
+async def _agather(aclient, sem, specs, priority, session):
+    if not get_template_bank().reuse:
+        return await asyncio.gather(*(_agenerate_one(aclient, sem, spec, priority, session)
+                                      for spec in specs))
+    # In reuse mode the first spec of each template key goes ahead and leaves
+    # a template behind; started together, the rest would all miss
+    leads = {}
+    for i, spec in enumerate(specs):
+        leads.setdefault(template_key(spec["race"], spec["char_class"], spec["background"],
+                                      spec["alignment"], spec["pronoun"]), i)
+    first = set(leads.values())
+    out = [None] * len(specs)
+    for phase in (sorted(first), [i for i in range(len(specs)) if i not in first]):
+        results = await asyncio.gather(*(_agenerate_one(aclient, sem, specs[i], priority, session)
+                                         for i in phase))
+        for i, result in zip(phase, results):
+            out[i] = result
+    return out
+
+@timed(GENERATE_SECONDS, op="generate_many")
+def generate_many(specs, concurrency=AI_CONCURRENCY, priority=INTERACTIVE, session=None):
+    """Blocking wrapper around `agenerate_many`, with local fallbacks when AI is off."""
+    if not ai_enabled():
+        return _offline_many(specs)
+    loop, aclient = _background_loop()
+    future = asyncio.run_coroutine_threadsafe(
+        agenerate_many(specs, concurrency, aclient, priority, session), loop)
+    return future.result()
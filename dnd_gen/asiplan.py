@@ -0,0 +1,104 @@
+"""Optimal allocation of every Ability Score Improvement a character has earned.
+
+The class score from `dnd_gen.pointbuy` is a sum of per-ability terms, so
+spending ``2 * slots`` points is a knapsack over the six abilities:
+``best[i][p]`` is the top score of abilities ``0..i`` with exactly ``p``
+points spent, built one ability at a time with the 20 cap as each
+ability's room. Any even split of points can be dealt out as real ASIs
+(+2 to one ability, or +1/+1 to two), so +2 versus +1/+1 falls out of the
+score rather than being guessed. The tables are computed for a whole batch
+of characters at once, and scalar plans are memoized per
+(class, scores, slots).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from .character import MAX_SCORE
+from .pointbuy import ability_values, class_weights
+from .rules import ABILITIES, CLASSES, asi_levels, asi_slots_available
+
+CLASS_WEIGHTS = np.array([class_weights(c) for c in CLASSES])   # (classes, 6)
+
+def plan_increments(final_stats, class_idx, slots):
+    """Best per-ability increments for a batch of characters.
+
+    `final_stats` is ``(n, 6)`` in ``ABILITIES`` order, `class_idx` indexes
+    ``CLASSES`` and `slots` is the number of ASIs to spend, per row or for
+    all rows. Returns ``(n, 6)`` int8 increments; a row spends fewer than
+    ``2 * slots`` points only when the 20 cap leaves no room for them.
+    """
+    final = np.asarray(final_stats, dtype=np.int16).reshape(-1, len(ABILITIES))
+    n = len(final)
+    slots = np.broadcast_to(np.asarray(slots, dtype=np.int16), (n,))
+    points = 2 * int(slots.max(initial=0))
+    out = np.zeros((n, len(ABILITIES)), dtype=np.int8)
+    if points == 0:
+        return out
+    weights = CLASS_WEIGHTS[np.broadcast_to(np.asarray(class_idx), (n,))]
+
+    # Tables are (points + 1, n) so every step works on contiguous rows; a
+    # score no allocation reaches is -inf. Scores are multiples of 0.25 far
+    # below 2**22, so float32 holds them exactly.
+    spend = np.arange(points + 1)
+    best = np.full((points + 1, n), -np.inf, dtype=np.float32)
+    best[0] = 0.0
+    choice = np.zeros((len(ABILITIES), points + 1, n), dtype=np.int8)
+    for i in range(len(ABILITIES)):
+        gain = ability_values(final[:, i] + spend[:, None], weights[:, i]).astype(np.float32)
+        gain[spend[:, None] > MAX_SCORE - final[:, i]] = -np.inf
+        nxt = best + gain[0]
+        for d in range(1, points + 1):
+            cand = best[:points + 1 - d] + gain[d]
+            better = cand > nxt[d:]
+            np.copyto(nxt[d:], cand, where=better)
+            np.copyto(choice[i, d:], d, where=better)
+        best = nxt
+
+    # Extra points never lower the score, so take the largest even total that fits
+    usable = np.isfinite(best) & (spend[:, None] % 2 == 0) & (spend[:, None] <= 2 * slots)
+    left = np.where(usable, spend[:, None], -1).max(axis=0)
+    rows = np.arange(n)
+    for i in reversed(range(len(ABILITIES))):
+        d = choice[i, left, rows]
+        out[:, i] = d
+        left = left - d
+    return out
+
+def increments_to_asis(increments, weights=None):
+    """Deal an even split of points out as ``(first, amount, second)`` ASIs.
+
+    Pairs of points on one ability become +2s and the odd points left over
+    become +1/+1s. With `weights` (``ABILITIES`` order) the ASIs touching the
+    most important abilities come first.
+    """
+    asis = []
+    odd = []
+    for ability, d in zip(ABILITIES, increments):
+        asis += [(ability, 2, None)] * (int(d) // 2)
+        if d % 2:
+            odd.append(ability)
+    asis += [(a, 1, b) for a, b in zip(odd[::2], odd[1::2])]
+    if weights is not None:
+        rank = dict(zip(ABILITIES, weights))
+        asis.sort(key=lambda asi: -(rank[asi[0]] + (rank[asi[2]] if asi[2] else rank[asi[0]])))
+    return asis
+
+@lru_cache(maxsize=65536)
+def _plan(char_class, scores, slots):
+    increments = plan_increments([scores], CLASSES.index(char_class), slots)[0]
+    return tuple(increments_to_asis(increments, CLASS_WEIGHTS[CLASSES.index(char_class)]))
+
+def plan_asis(final_stats, char_class, level, spent=0):
+    """Plan every ASI `char_class` has earned by `level` beyond the `spent` ones.
+
+    Returns ``[(level, first, amount, second), ...]`` in the class's ASI
+    schedule order; `Character.apply_asis` takes the list as is. It is
+    shorter than the ASIs available when the 20 cap leaves nothing to raise.
+    """
+    slots = asi_slots_available(char_class, level) - spent
+    if slots <= 0:
+        return []
+    scores = tuple(int(final_stats[a]) for a in ABILITIES)
+    schedule = asi_levels(char_class)[spent:]
+    return [(lvl, *asi) for lvl, asi in zip(schedule, _plan(char_class, scores, slots))]
@@ -0,0 +1,123 @@
+"""Vectorized batch character generation (NumPy)."""
+import numpy as np
+
+from . import seeding
+from .rules import (
+    ABILITIES, ASI_SLOTS, CLASSES, LINEAGE_ASI, MAX_LEVEL, RACES, lineage_index, racial_vector,
+)
+
+# The compiled rule tables as arrays: one modifier row per lineage (races
+# first, so a race index is its row) and ASIs earned per [class, level].
+LINEAGE_ASI_VECTORS = np.array(LINEAGE_ASI, dtype=np.int8)
+LINEAGE_ASI_VECTORS.setflags(write=False)
+RACE_ASI_VECTORS = LINEAGE_ASI_VECTORS[:len(RACES)]
+ASI_SLOT_TABLE = np.array(ASI_SLOTS, dtype=np.uint8)
+ASI_SLOT_TABLE.setflags(write=False)
+
+def generate_characters(n, race=None, char_class=None, method="roll", level=1,
+                        apply_racial=True, half_elf_extras=None, rng=None, spend_asis=False,
+                        seeds=None, subrace=None):
+    """Generate `n` characters in one vectorized pass.
+
+    ``method`` is ``"roll"`` (4d6 drop lowest) or ``"pointbuy"`` (the optimal
+    27-point spread for each row's class and race). With `spend_asis` every
+    ASI earned by `level` is added to ``final_stats`` as planned by
+    `dnd_gen.asiplan`. With `seeds` (one per row) each row is drawn from its
+    own seed's stream (see `dnd_gen.seeding`) instead of from `rng`, so it
+    comes out the same in any batch. A `subrace` (of the given `race`) adds
+    its bonuses on top of the race's.
+
+    Returns a dict of NumPy arrays: ``race`` and ``class`` hold indices into
+    ``RACES``/``CLASSES`` (random per row when not given), ``lineage`` into
+    ``LINEAGES`` (the race's own row without a subrace), ``base_stats`` and
+    ``final_stats`` are ``(n, 6)`` int8 matrices in ``ABILITIES`` order.
+    """
+    if method not in ("roll", "pointbuy"):
+        raise ValueError(f"Unknown generation method: {method!r}")
+    if subrace is not None and race is None:
+        raise ValueError("a subrace needs its race")
+    if seeds is not None:
+        seeds = np.asarray(seeds, dtype=np.uint64)
+        if len(seeds) != n:
+            raise ValueError(f"expected {n} seeds, got {len(seeds)}")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    def pick(position, options):
+        if seeds is not None:
+            return seeding.choose(seeds, position, len(options)).astype(np.uint8)
+        return rng.integers(0, len(options), size=n, dtype=np.uint8)
+
+    if race is None:
+        race_idx = lineage_idx = pick(seeding.RACE, RACES)
+    else:
+        race_idx = np.full(n, RACES.index(race), dtype=np.uint8)
+        lineage_idx = np.full(n, lineage_index(race, subrace), dtype=np.uint8)
+    if char_class is None:
+        class_idx = pick(seeding.CLASS, CLASSES)
+    else:
+        class_idx = np.full(n, CLASSES.index(char_class), dtype=np.uint8)
+
+    if method == "pointbuy":
+        base_stats, final_stats = _pointbuy_stats(race_idx, class_idx, apply_racial, half_elf_extras,
+                                                  subrace)
+    else:
+        # 4d6 drop lowest for the whole N×6 matrix at once
+        if seeds is not None:
+            base_stats = seeding.roll_scores(seeds)
+        else:
+            dice = rng.integers(1, 7, size=(n, len(ABILITIES), 4), dtype=np.int8)
+            base_stats = dice.sum(axis=2, dtype=np.int8) - dice.min(axis=2)
+        if apply_racial:
+            vectors = LINEAGE_ASI_VECTORS
+            if half_elf_extras:
+                vectors = vectors.copy()
+                vectors[RACES.index("Half-Elf")] = racial_vector("Half-Elf", half_elf_extras)
+            final_stats = base_stats + vectors[lineage_idx]
+        else:
+            final_stats = base_stats.copy()
+
+    if spend_asis:
+        from .asiplan import plan_increments
+        slots = ASI_SLOT_TABLE[class_idx, min(max(level, 0), MAX_LEVEL)]
+        final_stats = final_stats + plan_increments(final_stats, class_idx, slots)
+
+    return {
+        "race": race_idx,
+        "class": class_idx,
+        "lineage": lineage_idx,
+        "level": np.full(n, level, dtype=np.uint8),
+        "base_stats": base_stats,
+        "final_stats": final_stats,
+    }
+
+def _pointbuy_stats(race_idx, class_idx, apply_racial, half_elf_extras, subrace=None):
+    from .pointbuy import optimize_point_buy
+
+    # One optimizer lookup per distinct (race, class) pair, then a gather
+    pairs = race_idx.astype(np.uint16) * len(CLASSES) + class_idx
+    unique, inverse = np.unique(pairs, return_inverse=True)
+    base = np.empty((len(unique), len(ABILITIES)), dtype=np.int8)
+    final = np.empty_like(base)
+    for i, pair in enumerate(unique.tolist()):
+        race = RACES[pair // len(CLASSES)]
+        stats, extras = optimize_point_buy(CLASSES[pair % len(CLASSES)],
+                                           race if apply_racial else None, half_elf_extras,
+                                           subrace)
+        base[i] = [stats[a] for a in ABILITIES]
+        final[i] = base[i] + racial_vector(race, extras, subrace) if apply_racial else base[i]
+    inverse = inverse.reshape(-1)
+    return base[inverse], final[inverse]
+
+def iter_rows(batch):
+    """Yield each batch row as plain Python values (names, stat dicts)."""
+    base = batch["base_stats"].tolist()
+    final = batch["final_stats"].tolist()
+    for i, (r, c, lvl) in enumerate(zip(batch["race"].tolist(), batch["class"].tolist(),
+                                         batch["level"].tolist())):
+        yield {
+            "race": RACES[r],
+            "class": CLASSES[c],
+            "level": lvl,
+            "base_stats": dict(zip(ABILITIES, base[i])),
+            "final_stats": dict(zip(ABILITIES, final[i])),
+        }
@@ -0,0 +1,79 @@
+"""Multi-process bulk NPC generation into sharded files.
+
+The run is planned once in the parent (`dnd_gen.sheet.chunk_plan`): every
+chunk gets its own spawned seed stream. Consecutive chunks are grouped into
+shards, and each worker process generates its shard's characters and
+streams them straight into its own file. Only the shard's path, count and
+size travel back to the parent. The shards of a seeded run, read in order,
+are exactly what `iter_characters` yields for the same seed.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .export import FORMATS, write_export
+from .sheet import BATCH_CHUNK, chunk_plan, iter_chunks
+
+SHARD_SIZE = 100_000    # characters per output file (a multiple of BATCH_CHUNK)
+
+def shard_path(out_dir, index, fmt, stem="npcs"):
+    return Path(out_dir) / f"{stem}-{index:05d}.{FORMATS[fmt][0]}"
+
+def _write_shard(path, fmt, chunks, options):
+    """Worker: generate one shard's chunks into `path`; returns (path, count, bytes)."""
+    count = 0
+
+    def counted(characters):
+        nonlocal count
+        for count, char in enumerate(characters, 1):
+            yield char
+
+    written = write_export(counted(iter_chunks(chunks, **options)), path, fmt)
+    return str(path), count, written
+
+def generate_sharded(n, out_dir, fmt="jsonl", workers=None, shard_size=SHARD_SIZE, seed=None,
+                     progress=None, stem="npcs", **options):
+    """Generate `n` offline characters across `workers` processes into shard files.
+
+    `options` are those of `iter_characters` (race, char_class, method,
+    level, apply_racial, spend_asis, unique_names; `unique_names` holds per
+    shard). `progress(done, n, elapsed)` is called as shards finish.
+    Returns a dict with the shard paths (in order), count, bytes, seconds
+    and characters per second.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if options.get("use_ai"):
+        raise ValueError("bulk generation is offline only; use iter_characters for AI text")
+    per_shard = max(1, shard_size // BATCH_CHUNK)
+    plan = chunk_plan(n, seed)
+    shards = [plan[i:i + per_shard] for i in range(0, len(plan), per_shard)]
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, max(len(shards), 1))
+
+    start = time.perf_counter()
+    done = 0
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_write_shard, shard_path(out_dir, i, fmt, stem), fmt, chunks, options): i
+                   for i, chunks in enumerate(shards)}
+        try:
+            for future in as_completed(futures):
+                results[futures[future]] = _, count, _ = future.result()
+                done += count
+                if progress is not None:
+                    progress(done, n, time.perf_counter() - start)
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    seconds = time.perf_counter() - start
+    ordered = [results[i] for i in range(len(shards))]
+    return {
+        "shards": [path for path, _, _ in ordered],
+        "count": sum(count for _, count, _ in ordered),
+        "bytes": sum(size for _, _, size in ordered),
+        "workers": workers,
+        "seconds": seconds,
+        "per_s": done / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,146 @@
+"""Process-wide response cache for the AI helpers."""
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+NAME_SLOT = "{name}"
+FIRST_NAME_SLOT = "{first_name}"
+
+class ResponseCache:
+    """LRU cache for AI responses with TTL eviction and an optional SQLite tier.
+
+    Every key keeps up to `variants` responses. Until that many have been
+    collected a lookup counts as a miss (so fresh completions keep arriving);
+    afterwards a random stored variant is served, keeping results varied.
+    On disk each variant has a slot, so a write is one ``INSERT OR REPLACE``
+    over the oldest; expired rows are deleted every `prune_every` writes.
+    """
+
+    def __init__(self, max_size=512, ttl=7 * 24 * 3600, variants=3, path=None, prune_every=256):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.variants = variants
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self._mem = OrderedDict()   # key -> [(created, value, slot), ...], oldest first
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if path:
+            # Autocommit: every write is a single statement
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("DROP TABLE IF EXISTS responses")   # the unslotted layout
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS variants "
+                "(key TEXT, slot INTEGER, value TEXT, created REAL, PRIMARY KEY (key, slot))"
+            )
+            self._prune(time.time())
+
+    @staticmethod
+    def _db_key(key):
+        return "\x1f".join(map(str, key))
+
+    def _prune(self, now):
+        self._db.execute("DELETE FROM variants WHERE created <= ?", (now - self.ttl,))
+
+    def _entries(self, key):
+        """Return the live variants for `key`, loading from disk on a memory miss.
+
+        Only keys with live variants are kept in memory, so misses never
+        push cached responses out.
+        """
+        now = time.time()
+        entries = self._mem.get(key)
+        if entries is None and self._db is not None:
+            entries = self._db.execute(
+                "SELECT created, value, slot FROM variants WHERE key = ? AND created > ? "
+                "ORDER BY created",
+                (self._db_key(key), now - self.ttl),
+            ).fetchall()
+        entries = [e for e in entries or () if now - e[0] < self.ttl][-self.variants:]
+        if entries:
+            self._remember(key, entries)
+        else:
+            self._mem.pop(key, None)
+        return entries
+
+    def _remember(self, key, entries):
+        self._mem[key] = entries
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entries = self._entries(key)
+            if len(entries) < self.variants:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return random.choice(entries)[1]
+
+    def put(self, key, value):
+        created = time.time()
+        with self._lock:
+            entries = self._entries(key)
+            taken = {e[2] for e in entries}
+            free = [n for n in range(self.variants) if n not in taken]
+            slot = free[0] if free else entries[0][2]     # else overwrite the oldest variant
+            entries = [e for e in entries if e[2] != slot] + [(created, value, slot)]
+            self._remember(key, entries)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO variants (key, slot, value, created) VALUES (?, ?, ?, ?)",
+                    (self._db_key(key), slot, value, created),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune(created)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._mem),
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache(path=None):
+    """Return the process-wide cache, creating it on first use.
+
+    The SQLite tier is enabled by `path` or the ``DND_CACHE_PATH`` env var;
+    only the first call decides.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(path=path or os.getenv("DND_CACHE_PATH"))
+    return _cache
+
+def set_response_cache(cache):
+    """Replace the process-wide cache (``ResponseCache(max_size=0)`` disables it)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+def strip_name(text, name):
+    """Swap the full name, then the bare first name, for slots."""
+    first = name.split()[0] if name.split() else name
+    text = re.sub(rf"\b{re.escape(name)}\b", NAME_SLOT, text)
+    if first != name:
+        text = re.sub(rf"\b{re.escape(first)}\b", FIRST_NAME_SLOT, text)
+    return text
+
+def fill_name(text, name):
+    first = name.split()[0] if name.split() else name
+    return text.replace(NAME_SLOT, name).replace(FIRST_NAME_SLOT, first)
@@ -0,0 +1,165 @@
+"""Compact character record.
+
+A `Character` keeps its twelve ability scores (base then final, in
+``ABILITIES`` order) in one ``array('b')`` instead of two dicts, and uses
+``__slots__``, so bulk NPC lists and many live sessions stay small. The
+``to_dict``/``from_dict`` pair converts losslessly to the sheet dict shape
+used by older code and JSON output.
+"""
+from array import array
+
+from .rules import ABILITIES
+
+MAX_SCORE = 20
+_N = len(ABILITIES)
+_INDEX = {a: i for i, a in enumerate(ABILITIES)}
+
+class ASIError(ValueError):
+    """An Ability Score Improvement that breaks the rules."""
+
+class Character:
+    __slots__ = ("name", "race", "char_class", "background", "alignment", "level",
+                 "backstory", "apply_racial", "seed", "subrace", "_scores")
+
+    def __init__(self, name, race, char_class, background, alignment, level,
+                 base_stats, final_stats=None, backstory=None, apply_racial=True, seed=None,
+                 subrace=None):
+        self.name = name
+        self.race = race
+        self.char_class = char_class
+        self.background = background
+        self.alignment = alignment
+        self.level = level
+        self.backstory = backstory
+        self.apply_racial = apply_racial
+        self.seed = seed        # replays the random parts, see dnd_gen.seeding
+        self.subrace = subrace
+        final_stats = base_stats if final_stats is None else final_stats
+        self._scores = array("b", [base_stats[a] for a in ABILITIES] +
+                                  [final_stats[a] for a in ABILITIES])
+
+    @property
+    def lineage(self):
+        """The subrace when there is one (``"Hill Dwarf"``), else the race."""
+        return self.subrace or self.race
+
+    # ---------- Ability scores ----------
+    @property
+    def base_stats(self):
+        return dict(zip(ABILITIES, self._scores[:_N]))
+
+    @property
+    def final_stats(self):
+        return dict(zip(ABILITIES, self._scores[_N:]))
+
+    @property
+    def scores(self):
+        """Base then final scores, in ``ABILITIES`` order, as one tuple."""
+        return tuple(self._scores)
+
+    def base(self, ability):
+        return self._scores[_INDEX[ability]]
+
+    def final(self, ability):
+        return self._scores[_N + _INDEX[ability]]
+
+    def apply_asi(self, first, amount=2, second=None):
+        """Apply one ASI in place: +2 to `first`, or +1 to `first` (and `second`).
+
+        Everything is validated before anything changes; a rule violation
+        raises `ASIError` and leaves the scores untouched.
+        """
+        if amount not in (1, 2):
+            raise ASIError("An ASI adds +1 or +2 to an ability.")
+        if second is not None and amount == 2:
+            raise ASIError("If you add +2 to one ability, you cannot improve a second ability.")
+        if second is not None and second == first:
+            raise ASIError("Cannot apply bonuses to the same ability twice in one ASI.")
+        i = _N + _INDEX[first]
+        if self._scores[i] + amount > MAX_SCORE:
+            raise ASIError(f"Cannot improve {first}: would exceed maximum of {MAX_SCORE} "
+                           f"(currently {self._scores[i]}).")
+        if second is not None:
+            j = _N + _INDEX[second]
+            if self._scores[j] + 1 > MAX_SCORE:
+                raise ASIError(f"Cannot improve {second}: would exceed maximum of {MAX_SCORE} "
+                               f"(currently {self._scores[j]}).")
+            self._scores[j] += 1
+        self._scores[i] += amount
+
+    def apply_asis(self, asis):
+        """Apply several ASIs at once, all or nothing.
+
+        Each item ends with ``(first, amount, second)``, so the plans from
+        `dnd_gen.asiplan.plan_asis` (which lead with the level) work as is.
+        """
+        saved = array("b", self._scores)
+        try:
+            for *_, first, amount, second in asis:
+                self.apply_asi(first, amount, second)
+        except ASIError:
+            self._scores = saved
+            raise
+
+    # ---------- Conversion ----------
+    @property
+    def packed_scores(self):
+        """Base then final scores as 12 signed bytes (see `from_packed`)."""
+        return self._scores.tobytes()
+
+    @classmethod
+    def from_packed(cls, name, race, char_class, background, alignment, level, packed,
+                    backstory=None, apply_racial=True, seed=None, subrace=None):
+        """Rebuild a Character from `packed_scores` without going through dicts."""
+        char = cls.__new__(cls)
+        char.name = name
+        char.race = race
+        char.char_class = char_class
+        char.background = background
+        char.alignment = alignment
+        char.level = level
+        char.backstory = backstory
+        char.apply_racial = bool(apply_racial)
+        char.seed = seed
+        char.subrace = subrace
+        char._scores = array("b", packed)
+        return char
+
+    def to_dict(self):
+        """Return the sheet dict the app has always used."""
+        return {
+            "name": self.name,
+            "race": self.race,
+            "class": self.char_class,
+            "background": self.background,
+            "alignment": self.alignment,
+            "level": self.level,
+            "base_stats": self.base_stats,
+            "final_stats": self.final_stats,
+            "backstory": self.backstory,
+            "apply_racial": self.apply_racial,
+            "seed": self.seed,
+            "subrace": self.subrace,
+        }
+
+    @classmethod
+    def from_dict(cls, sheet):
+        return cls(sheet["name"], sheet["race"], sheet["class"], sheet["background"],
+                   sheet["alignment"], sheet["level"], sheet["base_stats"],
+                   sheet.get("final_stats"), sheet.get("backstory"),
+                   sheet.get("apply_racial", True), sheet.get("seed"), sheet.get("subrace"))
+
+    def copy(self):
+        other = Character.__new__(Character)
+        for slot in Character.__slots__:
+            setattr(other, slot, getattr(self, slot))
+        other._scores = array("b", self._scores)
+        return other
+
+    def __eq__(self, other):
+        if not isinstance(other, Character):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in Character.__slots__)
+
+    def __repr__(self):
+        return f"Character({self.name!r}, {self.race}, {self.char_class}, level {self.level})"
@@ -0,0 +1,118 @@
+"""``dnd-gen`` command line entry point for scripted bulk use."""
+import argparse
+import sys
+
+from . import metrics
+from .rules import CLASSES, RACES, SUBRACES
+
+def _cmd_generate(args):
+    from .export import write_export
+    from .sheet import iter_characters
+
+    if args.metrics:
+        metrics.enable()
+    if args.reuse is not None:
+        from .templates import TemplateBank, set_template_bank
+        set_template_bank(TemplateBank(reuse=args.reuse))
+    characters = iter_characters(args.n, race=args.race, char_class=args.char_class,
+                                 method=args.method, level=args.level,
+                                 apply_racial=not args.no_racial, use_ai=args.ai,
+                                 unique_names=args.unique_names, spend_asis=args.asi,
+                                 seed=args.seed, subrace=args.subrace)
+    if args.db:
+        from .store import CharacterStore
+        store = CharacterStore(args.db)
+        print(f"saved {store.add_many(characters):,} characters to {args.db}", file=sys.stderr)
+        store.close()
+    elif args.output:
+        write_export(characters, args.output, args.format)
+    else:
+        write_export(characters, sys.stdout.buffer, args.format)
+        sys.stdout.buffer.flush()
+    if args.reuse:
+        from .templates import get_template_bank
+        stats = get_template_bank().stats()
+        print(f"backstories: {stats['reused']:,} reused, {stats['fresh']:,} written fresh",
+              file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.render())
+    return 0
+
+def _cmd_bulk(args):
+    from .bulk import generate_sharded
+
+    def progress(done, total, elapsed):
+        print(f"\r{done:,}/{total:,} NPCs ({done / total:.0%}), {done / elapsed:,.0f}/s",
+              end="", file=sys.stderr, flush=True)
+
+    result = generate_sharded(args.n, args.output, args.format, workers=args.workers,
+                              shard_size=args.shard_size, seed=args.seed, progress=progress,
+                              race=args.race, char_class=args.char_class, method=args.method,
+                              level=args.level, apply_racial=not args.no_racial,
+                              unique_names=args.unique_names, spend_asis=args.asi,
+                              subrace=args.subrace)
+    print(f"\nwrote {result['count']:,} NPCs ({result['bytes'] / 1e6:,.1f} MB) to "
+          f"{len(result['shards'])} shards in {args.output} with {result['workers']} workers: "
+          f"{result['seconds']:.1f}s, {result['per_s']:,.0f}/s", file=sys.stderr)
+    return 0
+
+def _race_of(subrace):
+    return next(race for race, subs in SUBRACES.items() if subrace in subs)
+
+def _add_character_options(parser):
+    parser.add_argument("-n", type=int, default=1, help="number of characters")
+    parser.add_argument("--race", choices=RACES, help="fixed race (random per character if omitted)")
+    parser.add_argument("--subrace", choices=[s for subs in SUBRACES.values() for s in subs],
+                        help="subrace of --race (e.g. 'Hill Dwarf')")
+    parser.add_argument("--class", dest="char_class", choices=CLASSES,
+                        help="fixed class (random per character if omitted)")
+    parser.add_argument("--level", type=int, default=1, choices=range(1, 21), metavar="1-20")
+    parser.add_argument("--method", choices=["roll", "pointbuy"], default="roll",
+                        help="4d6 drop lowest, or the optimal 27-point buy for the class")
+    parser.add_argument("--no-racial", action="store_true", help="skip PHB racial bonuses")
+    parser.add_argument("--asi", action="store_true",
+                        help="spend every ASI earned by --level on the class's best abilities")
+    parser.add_argument("--unique-names", action="store_true",
+                        help="never repeat an offline name within the run (bulk: within a shard)")
+    parser.add_argument("--seed", type=int,
+                        help="repeat a run exactly (each character also gets its own seed)")
+    parser.add_argument("-f", "--format",
+                        choices=["jsonl", "csv", "zip-txt", "zip-md", "zip-html", "zip-json"],
+                        default="jsonl", help="output format (default: jsonl)")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dnd-gen", description="Headless D&D character generator.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="generate characters and stream them out")
+    _add_character_options(gen)
+    gen.add_argument("--ai", action="store_true",
+                     help="generate names and backstories with the API (needs OPENAI_API_KEY)")
+    gen.add_argument("--reuse", type=float, metavar="RATIO",
+                     help="with --ai, personalize a stored backstory for this fraction of "
+                          "characters sharing race, class, background and alignment (e.g. 0.9)")
+    gen.add_argument("-o", "--output", help="write to this file instead of stdout")
+    gen.add_argument("--db", metavar="PATH",
+                     help="save to this SQLite character store instead of exporting")
+    gen.add_argument("--metrics", metavar="FILE",
+                     help="write the run's metrics to FILE (Prometheus text format)")
+    gen.set_defaults(func=_cmd_generate)
+
+    bulk = sub.add_parser("bulk", help="generate offline NPCs on every core into sharded files")
+    _add_character_options(bulk)
+    bulk.add_argument("-o", "--output", required=True, metavar="DIR", help="directory for the shards")
+    bulk.add_argument("-w", "--workers", type=int, help="worker processes (default: one per core)")
+    bulk.add_argument("--shard-size", type=int, default=100_000,
+                      help="characters per shard file (default: 100000)")
+    bulk.set_defaults(func=_cmd_bulk)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.subrace and args.subrace not in SUBRACES.get(args.race, []):
+        parser.error(f"--subrace {args.subrace!r} needs --race {_race_of(args.subrace)}")
+    if getattr(args, "reuse", None) is not None and not 0 <= args.reuse <= 1:
+        parser.error("--reuse must be between 0 and 1")
+    return args.func(args)
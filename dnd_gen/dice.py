@@ -0,0 +1,21 @@
+"""Scalar dice rolls and offline names.
+
+Both take an optional `rng` (a ``random.Random``) so callers can replay
+them; without one they use the global ``random`` module.
+"""
+import random
+
+def generate_name(race=None, rng=None):
+    """Return an offline name, race-flavoured (see `dnd_gen.names`) when `race` is given."""
+    if race is not None:
+        from .names import random_name
+        return random_name(race, None if rng is None else rng.getrandbits(63))
+    rng = rng or random
+    first_names = ["Arin", "Belra", "Cedric", "Dora", "Elryn", "Faelar", "Gorin", "Hilda", "Isen", "Jora"]
+    last_names = ["Stoneheart", "Ravenshadow", "Ironfist", "Moonwhisper", "Stormblade", "Duskbane", "Lightbringer"]
+    return f"{rng.choice(first_names)} {rng.choice(last_names)}"
+
+def roll_stat(rng=None):
+    rng = rng or random
+    rolls = sorted([rng.randint(1, 6) for _ in range(4)], reverse=True)
+    return sum(rolls[:3])
@@ -0,0 +1,123 @@
+"""Streaming bulk export of characters to JSONL, CSV or a ZIP of sheets.
+
+Every writer consumes an iterable of `Character` objects and produces
+``bytes`` chunks as it goes, so memory use does not grow with the number of
+characters. `write_export` streams them to a file.
+"""
+import csv
+import io
+import zipfile
+
+from .render import SHEET_FORMATS, iter_sheets, render
+from .rules import ABILITIES
+from .sheet import sheet_filename
+
+FORMATS = {
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+    "zip-txt": ("zip", "application/zip"),
+    "zip-md": ("zip", "application/zip"),
+    "zip-html": ("zip", "application/zip"),
+    "zip-json": ("zip", "application/zip"),
+}
+CHUNK_BYTES = 64 * 1024
+
+CSV_COLUMNS = (["name", "race", "subrace", "class", "background", "alignment", "level"]
+               + [f"base_{a.lower()}" for a in ABILITIES]
+               + [f"final_{a.lower()}" for a in ABILITIES]
+               + ["apply_racial", "backstory", "seed"])
+
+def _coalesce(pieces):
+    """Join small encoded pieces into chunks of about CHUNK_BYTES."""
+    buf, size = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+def iter_jsonl(characters):
+    # The compiled JSON sheet is exactly json.dumps(c.to_dict(), ensure_ascii=False)
+    return iter_sheets(characters, "json", "\n")
+
+def _csv_lines(characters):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for c in characters:
+        writer.writerow([c.name, c.race, c.subrace, c.char_class, c.background, c.alignment,
+                         c.level, *c.base_stats.values(), *c.final_stats.values(),
+                         c.apply_racial, c.backstory, c.seed])
+        yield out.getvalue().encode()
+        out.seek(0)
+        out.truncate()
+    # No characters: the header is still waiting in the buffer
+    if out.tell():
+        yield out.getvalue().encode()
+
+def iter_csv(characters):
+    return _coalesce(_csv_lines(characters))
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile streams into."""
+
+    def __init__(self):
+        self.parts = []
+        self.pos = 0
+        self.buffered = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        self.pos += len(b)
+        self.buffered += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        self.buffered = 0
+        return data
+
+def iter_zip(characters, sheet_format="txt"):
+    """ZIP of one sheet per character in `sheet_format` (see `SHEET_FORMATS`), streamed."""
+    ext = SHEET_FORMATS[sheet_format][0]
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, c in enumerate(characters, 1):
+            zf.writestr(f"{i:06d}_{sheet_filename(c, ext)}", render(c, sheet_format))
+            if sink.buffered >= CHUNK_BYTES:
+                yield sink.drain()
+    yield sink.drain()
+
+def iter_export(characters, fmt):
+    """Yield the export of `characters` in `fmt` (see `FORMATS`) as bytes chunks."""
+    if fmt == "jsonl":
+        return iter_jsonl(characters)
+    if fmt == "csv":
+        return iter_csv(characters)
+    if fmt.startswith("zip-") and fmt in FORMATS:
+        return iter_zip(characters, fmt[len("zip-"):])
+    raise ValueError(f"Unknown export format: {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+def write_export(characters, target, fmt):
+    """Stream the export to `target`, a path or a binary file object."""
+    if isinstance(target, (str, bytes)) or hasattr(target, "__fspath__"):
+        with open(target, "wb") as f:
+            return write_export(characters, f, fmt)
+    written = 0
+    for chunk in iter_export(characters, fmt):
+        target.write(chunk)
+        written += len(chunk)
+    return written
+
+def export_filename(fmt, stem="characters"):
+    return f"{stem}.{FORMATS[fmt][0]}"
@@ -0,0 +1,349 @@
+"""Process-wide gateway in front of every LLM call.
+
+All completions made by `dnd_gen.ai` pass through one `LLMGateway`, which
+
+* coalesces identical in-flight requests, so concurrent callers share one
+  upstream call (single flight);
+* keeps requests and tokens per minute under the provider's limits with
+  two token buckets;
+* admits waiting requests in priority order, interactive before bulk;
+* enforces an optional token budget per session.
+
+Admission is decided on a dispatcher thread and handed back as a
+``concurrent.futures.Future``, so blocking callers and any event loop can
+share the same gateway.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from .resilience import DeadlineExceeded
+
+INTERACTIVE = 0
+BULK = 1
+
+class BudgetExceeded(RuntimeError):
+    """The session has used up its token budget."""
+
+def estimate_tokens(prompt, max_tokens):
+    """Tokens a request counts against TPM: prompt (≈4 chars/token) plus `max_tokens`."""
+    return len(prompt) // 4 + max_tokens
+
+def _usage(result, estimate):
+    usage = getattr(result, "usage", None)
+    return getattr(usage, "total_tokens", None) or estimate
+
+class TokenBucket:
+    """Token bucket for `per_minute` units (requests or tokens), stored as the time it is next empty.
+
+    A take is allowed once the bucket's debt is at most `burst` seconds of
+    refill; the take itself may then overdraw it. With ``burst=0`` requests
+    are paced evenly, which is what a provider enforcing its per-minute limit
+    over one-second windows needs.
+    """
+
+    def __init__(self, per_minute, burst=0.0):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.empty_at = time.monotonic()
+
+    def wait_time(self, now):
+        """Seconds until the next take is allowed."""
+        return max(0.0, self.empty_at - self.burst - now)
+
+    def take(self, amount, now):
+        self.empty_at = max(self.empty_at, now) + amount / self.rate
+
+class LLMGateway:
+    """Single-flight, rate-limited, prioritized admission for LLM requests.
+
+    `rpm` and `tpm` are the provider's per-minute limits (``None`` for no
+    limit), `max_in_flight` caps concurrent upstream calls and
+    `session_budget` caps the tokens any one session may use. Providers
+    enforce per-minute limits over short windows, so requests are paced
+    evenly unless `burst` allows some seconds of slack. Session usage is
+    forgotten once a session has been idle for `session_ttl` seconds, and
+    only the `max_sessions` most recently active are kept.
+    """
+
+    def __init__(self, rpm=500, tpm=200_000, max_in_flight=16, session_budget=None, burst=0.0,
+                 session_ttl=24 * 3600, max_sessions=10_000):
+        self.buckets = [TokenBucket(rpm, burst) if rpm else None,
+                        TokenBucket(tpm, burst) if tpm else None]
+        self.max_in_flight = max_in_flight
+        self.session_budget = session_budget
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._cond = threading.Condition()
+        self._queue = []        # heap of (priority, seq, tokens, queued_at, ticket)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._flights = {}      # key -> Future shared by every caller of that request
+        self._used = OrderedDict()   # session -> [tokens used, last charged], oldest first
+        self._dispatcher = None
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.wait_s = 0.0
+
+    # ---------- Admission ----------
+    def _admit(self, tokens, priority):
+        ticket = Future()
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._seq), tokens, time.monotonic(), ticket))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="dnd-gen-gateway",
+                                                    daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return ticket
+
+    def _wait(self, future, deadline):
+        """``future.result()``, but only until the absolute monotonic `deadline` (None: no limit)."""
+        if deadline is None:
+            return future.result()
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            raise DeadlineExceeded("no request slot before the call's deadline") from None
+
+    def _wait_admitted(self, ticket, deadline):
+        try:
+            self._wait(ticket, deadline)
+        except DeadlineExceeded:
+            self._withdraw(ticket)
+            raise
+
+    def _withdraw(self, ticket):
+        """Take back a ticket nobody waits for any more, returning its slot if it got one."""
+        if not ticket.cancel():
+            self._release()     # admitted just as we gave up
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                if not self._queue or self._in_flight >= self.max_in_flight:
+                    self._cond.wait()
+                    continue
+                _, _, tokens, queued, ticket = self._queue[0]
+                if ticket.cancelled():
+                    heapq.heappop(self._queue)
+                    continue
+                now = time.monotonic()
+                delay = max((b.wait_time(now) for b in self.buckets if b), default=0.0)
+                if delay > 0:
+                    # A higher-priority arrival wakes us early and is looked at first
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._queue)
+                if not ticket.set_running_or_notify_cancel():
+                    continue
+                for bucket, n in zip(self.buckets, (1, tokens)):
+                    if bucket:
+                        bucket.take(n, now)
+                self._in_flight += 1
+                self.requests += 1
+                self.wait_s += now - queued
+                ticket.set_result(None)
+
+    def debit(self, tokens):
+        """Count an extra upstream request (a retry or a hedge) against the limits without waiting.
+
+        The buckets go into debt, so the requests queued behind it are paced
+        to make up for it.
+        """
+        with self._cond:
+            now = time.monotonic()
+            for bucket, n in zip(self.buckets, (1, tokens)):
+                if bucket:
+                    bucket.take(n, now)
+            self.requests += 1
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    # ---------- Sessions ----------
+    def _expire(self, now):
+        idle_since = now - self.session_ttl
+        while self._used and (len(self._used) > self.max_sessions
+                              or next(iter(self._used.values()))[1] < idle_since):
+            self._used.popitem(last=False)
+
+    def remaining(self, session):
+        """Tokens `session` may still use, or ``None`` when it has no budget."""
+        if self.session_budget is None or session is None:
+            return None
+        with self._cond:
+            self._expire(time.monotonic())
+            used = self._used.get(session)
+            return max(0, self.session_budget - (used[0] if used else 0))
+
+    def charge(self, session, tokens):
+        """Count `tokens` against `session`'s budget."""
+        if session is None or self.session_budget is None:
+            return
+        with self._cond:
+            now = time.monotonic()
+            used = self._used.pop(session, None) or [0, now]
+            used[0] += tokens
+            used[1] = now
+            self._used[session] = used
+            self._expire(now)
+
+    def check_budget(self, session, tokens):
+        """Refuse a request whose `tokens` would take `session` past its budget."""
+        remaining = self.remaining(session)
+        if remaining is not None and tokens > remaining:
+            with self._cond:
+                self.rejected += 1
+            raise BudgetExceeded(f"session token budget of {self.session_budget} would be exceeded "
+                                 f"({tokens} tokens asked, {remaining} left)")
+
+    # ---------- Single flight ----------
+    def _join(self, key):
+        """Return (flight, leader): the shared future for `key` and whether we run it."""
+        if key is None:
+            return None, True
+        with self._cond:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Future()
+            flight.set_running_or_notify_cancel()
+            return flight, True
+
+    def _land(self, key, flight, result=None, exc=None):
+        if key is None:
+            return
+        with self._cond:
+            del self._flights[key]
+        if exc is None:
+            flight.set_result(result)
+        elif isinstance(exc, asyncio.CancelledError):
+            flight.set_exception(RuntimeError("the shared request was cancelled"))
+        else:
+            flight.set_exception(exc)
+
+    # ---------- Calls ----------
+    def call(self, run, tokens, key=None, priority=INTERACTIVE, session=None, deadline=None):
+        """Run ``run()`` (one completion) once admitted and return its result.
+
+        Concurrent calls with the same hashable `key` share a single run.
+        `tokens` is the request's TPM cost; the session is charged the
+        response's ``usage.total_tokens`` when there is one. A call still
+        waiting at `deadline` (absolute ``time.monotonic()``, as from
+        `Resilience.begin`) gives up its place and raises `DeadlineExceeded`.
+        """
+        self.check_budget(session, tokens)
+        flight, leader = self._join(key)
+        if not leader:
+            return self._wait(flight, deadline)
+        try:
+            self._wait_admitted(self._admit(tokens, priority), deadline)
+            try:
+                result = run()
+            finally:
+                self._release()
+            self.charge(session, _usage(result, tokens))
+        except BaseException as e:
+            self._land(key, flight, exc=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def acall(self, run, tokens, key=None, priority=INTERACTIVE, session=None,
+                    deadline=None):
+        """Async `call`: ``await run()`` once admitted, from any event loop."""
+        self.check_budget(session, tokens)
+        flight, leader = self._join(key)
+        if not leader:
+            return await self._await(asyncio.shield(asyncio.wrap_future(flight)), deadline)
+        try:
+            ticket = self._admit(tokens, priority)
+            try:
+                await self._await(asyncio.shield(asyncio.wrap_future(ticket)), deadline)
+            except (asyncio.CancelledError, DeadlineExceeded):
+                self._withdraw(ticket)
+                raise
+            try:
+                result = await run()
+            finally:
+                self._release()
+            self.charge(session, _usage(result, tokens))
+        except BaseException as e:
+            self._land(key, flight, exc=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    @staticmethod
+    async def _await(future, deadline):
+        if deadline is None:
+            return await future
+        try:
+            return await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("no request slot before the call's deadline") from None
+
+    @contextmanager
+    def slot(self, tokens, priority=INTERACTIVE, session=None, deadline=None):
+        """Hold one admitted request for a call that cannot be shared, such as a stream.
+
+        The caller charges the session itself with `charge` once usage is known.
+        """
+        self.check_budget(session, tokens)
+        self._wait_admitted(self._admit(tokens, priority), deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "wait_s": self.wait_s,
+                "sessions": len(self._used),
+            }
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def get_gateway():
+    """Return the process-wide gateway, creating it on first use.
+
+    Limits come from ``DND_AI_RPM``, ``DND_AI_TPM`` and
+    ``DND_AI_SESSION_BUDGET`` (tokens); the defaults match gpt-4o-mini on
+    the first usage tier, with no session budget.
+    """
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(rpm=_env_int("DND_AI_RPM", 500),
+                                      tpm=_env_int("DND_AI_TPM", 200_000),
+                                      session_budget=_env_int("DND_AI_SESSION_BUDGET", None))
+    return _gateway
+
+def set_gateway(gateway):
+    """Replace the process-wide gateway (``LLMGateway(rpm=None, tpm=None)`` removes the limits)."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
@@ -0,0 +1,252 @@
+"""Process-wide counters and latency histograms with a Prometheus text export.
+
+Instrumentation is off unless ``DND_METRICS`` is set (or `enable` is
+called); while it is off every ``inc``/``observe``/``time`` returns after a
+single flag check. Enabled metrics can be scraped from `render` (served by
+`serve` when ``DND_METRICS_PORT`` is set) or dumped as JSON every few
+seconds with `dump_json_every` (``DND_METRICS_JSON``).
+
+    histogram_quantile(0.95, sum by (le, op) (rate(dnd_gen_generate_seconds_bucket[5m])))
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("DND_METRICS", "") not in ("", "0")
+_metrics = []
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+class _Metric:
+    kind = None
+    suffix = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}       # label values tuple -> value
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_text(self, key, extra=()):
+        pairs = [*zip(self.labels, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    """A monotonically increasing count (``_total`` is appended on export)."""
+    kind = "counter"
+    suffix = "_total"
+
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _lines(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{self.suffix}{self._label_text(key)} {_number(value)}"
+
+    def _snapshot(self):
+        return {",".join(key): value for key, value in self._values.items()}
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, plus their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent inside it."""
+        return _Timer(self, labels)
+
+    def _lines(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            running = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                running += n
+                le = bound if bound == "+Inf" else _number(bound)
+                yield f"{self.name}_bucket{self._label_text(key, [('le', le)])} {running}"
+            yield f"{self.name}_sum{self._label_text(key)} {_number(total)}"
+            yield f"{self.name}_count{self._label_text(key)} {count}"
+
+    def _snapshot(self):
+        return {",".join(key): {"count": count, "sum": total,
+                                "buckets": dict(zip(map(str, (*self.buckets, "+Inf")), counts))}
+                for key, (counts, total, count) in self._values.items()}
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter() if _enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+def timed(histogram, **labels):
+    """Decorator observing each call's duration in `histogram`."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# ---------- The metrics themselves ----------
+GENERATE_SECONDS = Histogram(
+    "dnd_gen_generate_seconds", "Wall time of the AI name and backstory helpers.", ["op"])
+LLM_SECONDS = Histogram(
+    "dnd_gen_llm_request_seconds", "Upstream completion latency, admission wait excluded.", ["op"])
+LLM_REQUESTS = Counter(
+    "dnd_gen_llm_requests", "Upstream completions by outcome.", ["op", "outcome"])
+LLM_TOKENS = Counter(
+    "dnd_gen_llm_tokens", "Tokens reported in the completions' usage.", ["op", "type"])
+LLM_RETRIES = Counter("dnd_gen_llm_retries", "Upstream attempts retried after a transient failure.",
+                      ["op"])
+LLM_HEDGES = Counter("dnd_gen_llm_hedges", "Duplicate requests sent after the hedging delay.", ["op"])
+CIRCUIT_OPENED = Counter("dnd_gen_circuit_opened", "Times the AI circuit breaker opened.")
+FALLBACKS = Counter(
+    "dnd_gen_fallbacks", "Local text used instead of the API.", ["op", "reason"])
+BACKSTORY_TEMPLATES = Counter(
+    "dnd_gen_backstory_templates", "Reuse-mode backstory draws, reused or fresh.", ["outcome"])
+CREATE_SECONDS = Histogram(
+    "dnd_gen_create_character_seconds", "Create Character handler, name and backstory included.",
+    ["names"])
+CHARACTERS = Counter("dnd_gen_characters_created", "Characters created in the app.", ["names"])
+ASI_SECONDS = Histogram(
+    "dnd_gen_apply_asi_seconds", "Apply ASI handlers.", ["mode"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+ASI_APPLIED = Counter("dnd_gen_asis_applied", "ASIs applied in the app.", ["mode", "outcome"])
+RERUN_SECONDS = Histogram("dnd_gen_script_run_seconds", "Full app script runs.")
+
+def record_usage(op, usage):
+    """Count the prompt and completion tokens of a response's ``usage`` under `op`."""
+    if _enabled and usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, op=op, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, op=op, type="completion")
+
+# ---------- Export ----------
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        family = metric.name + metric.suffix
+        lines.append(f"# HELP {family} {metric.help}")
+        lines.append(f"# TYPE {family} {metric.kind}")
+        with metric._lock:
+            lines.extend(metric._lines())
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """All metrics as one JSON-ready dict."""
+    out = {"timestamp": time.time()}
+    for metric in _metrics:
+        with metric._lock:
+            out[metric.name] = metric._snapshot()
+    return out
+
+def reset():
+    for metric in _metrics:
+        metric.reset()
+
+def _handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return Handler
+
+def serve(port, host="0.0.0.0"):
+    """Enable metrics and serve ``/metrics`` from a daemon thread; returns the server.
+
+    ``http.server`` is imported here, so importing this module stays cheap.
+    """
+    from http.server import ThreadingHTTPServer
+
+    enable()
+    server = ThreadingHTTPServer((host, port), _handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="dnd-gen-metrics", daemon=True).start()
+    return server
+
+def dump_json_every(path, interval=15.0):
+    """Enable metrics and rewrite `path` with a `snapshot` every `interval` seconds."""
+    enable()
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot(), f)
+            os.replace(tmp, path)
+
+    thread = threading.Thread(target=loop, name="dnd-gen-metrics-dump", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,167 @@
+"""Pre-warmed pools of AI names per (race, class, gender).
+
+A single completion asks for dozens of names at once, and the pool hands
+them out one at a time. When a pool drops below its low-water mark it is
+refilled on a background thread at bulk priority, so a warm pool serves a
+name in microseconds; only a cold pool makes the caller wait for the API.
+
+Refill completions are not charged to any session. Instead, every name
+served is charged to the session that takes it at `NAME_TOKENS`, about
+one name's share of a refill, so pooled names count against session
+budgets like any other AI text.
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .gateway import BULK, INTERACTIVE, get_gateway
+
+NAME_TOKENS = 10    # a 40-name refill: ~8 output tokens per name plus the prompt
+
+class NamePool:
+    """Bounded name pools with background refills.
+
+    `fetch(race, char_class, gender, count, session, priority)` returns a
+    list of names (by default `dnd_gen.ai.fetch_names`). Each refill asks
+    for `batch` names; a pool holds at most `capacity` and is refilled once
+    it has fewer than `low_water` left. `get` charges `name_tokens` per
+    name to the caller's session.
+    """
+
+    def __init__(self, fetch=None, batch=40, capacity=120, low_water=10, workers=2,
+                 name_tokens=NAME_TOKENS):
+        if fetch is None:
+            from .ai import fetch_names as fetch
+        self.fetch = fetch
+        self.batch = batch
+        self.capacity = capacity
+        self.low_water = low_water
+        self.name_tokens = name_tokens
+        self._pools = {}        # key -> deque of names
+        self._refills = {}      # key -> (Future, priority) of the refill in progress
+        self._lock = threading.RLock()   # a refill that fails at once calls _done re-entrantly
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dnd-gen-names")
+        # Interactive refills never wait for a worker behind bulk ones
+        self._urgent = ThreadPoolExecutor(max_workers=workers,
+                                          thread_name_prefix="dnd-gen-names-urgent")
+        self.served = 0
+        self.cold = 0
+        self.refilled = 0
+
+    def _fill(self, key, session, priority):
+        names = self.fetch(*key, self.batch, session, priority)
+        with self._lock:
+            pool = self._pools.setdefault(key, deque(maxlen=self.capacity))
+            seen = set(pool)
+            fresh = [n for n in dict.fromkeys(names) if n not in seen]
+            pool.extend(fresh)
+            self.refilled += 1
+        return len(fresh)
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._refills.get(key, (None,))[0] is future:
+                del self._refills[key]
+
+    def refill(self, race, char_class, gender, session=None, priority=BULK):
+        """Start a refill for the key, or join the one in progress.
+
+        A refill in progress at a lower priority is not joined: a new one is
+        started at `priority`, and both add their names when they land.
+        Returns a Future of the number of names added.
+        """
+        key = (race, char_class, gender)
+        with self._lock:
+            current = self._refills.get(key)
+            if current is not None and current[1] <= priority:
+                return current[0]
+            executor = self._executor if priority >= BULK else self._urgent
+            future = executor.submit(self._fill, key, session, priority)
+            self._refills[key] = (future, priority)
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def warm(self, race, char_class, gender):
+        """Refill in the background if the pool is below its low-water mark."""
+        if self.size(race, char_class, gender) < self.low_water:
+            self.refill(race, char_class, gender)
+
+    def size(self, race, char_class, gender):
+        with self._lock:
+            return len(self._pools.get((race, char_class, gender), ()))
+
+    def get_nowait(self, race, char_class, gender):
+        """Pop a pooled name, or return None if the pool is empty.
+
+        Taking a name that leaves the pool below its low-water mark starts a
+        background refill; filling an empty pool is left to the caller.
+        """
+        key = (race, char_class, gender)
+        with self._lock:
+            pool = self._pools.get(key)
+            name = pool.popleft() if pool else None
+            left = len(pool) if pool else 0
+            if name is not None:
+                self.served += 1
+        if name is not None and left < self.low_water:
+            self.refill(*key)
+        return name
+
+    def get(self, race, char_class, gender, session=None, priority=INTERACTIVE):
+        """Return a name, waiting for a refill at `priority` when the pool is cold.
+
+        The name is charged to `session`, and `BudgetExceeded` is raised
+        when its budget cannot cover it. Raises whatever the refill raised
+        (API errors).
+        """
+        gateway = get_gateway()
+        gateway.check_budget(session, self.name_tokens)
+        while (name := self.get_nowait(race, char_class, gender)) is None:
+            self.cold += 1
+            added = self.refill(race, char_class, gender, priority=priority).result()
+            # Another refill may have landed the same names first
+            if not added and not self.size(race, char_class, gender):
+                raise ValueError("the completion contained no usable names")
+        gateway.charge(session, self.name_tokens)
+        return name
+
+    async def aget(self, race, char_class, gender, session=None, priority=INTERACTIVE):
+        """Async `get`: awaits the refill without blocking the event loop."""
+        gateway = get_gateway()
+        gateway.check_budget(session, self.name_tokens)
+        while (name := self.get_nowait(race, char_class, gender)) is None:
+            self.cold += 1
+            future = self.refill(race, char_class, gender, priority=priority)
+            added = await asyncio.wrap_future(future)
+            if not added and not self.size(race, char_class, gender):
+                raise ValueError("the completion contained no usable names")
+        gateway.charge(session, self.name_tokens)
+        return name
+
+    def stats(self):
+        with self._lock:
+            return {
+                "served": self.served,
+                "cold": self.cold,
+                "refills": self.refilled,
+                "pooled": sum(len(p) for p in self._pools.values()),
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_name_pool():
+    """Return the process-wide name pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = NamePool()
+    return _pool
+
+def set_name_pool(pool):
+    """Replace the process-wide name pool."""
+    global _pool
+    with _pool_lock:
+        _pool = pool
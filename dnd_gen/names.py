@@ -0,0 +1,354 @@
+"""Offline, race-flavoured names from character-level Markov chains.
+
+Every race has a first-name and a last-name chain trained on the bundled
+corpus in ``data/names``. All chains are compiled into one binary table of
+flat arrays (``data/names.bin``): a state's transitions are laid out as a run
+of slots in proportion to their weights, so a single gather advances
+thousands of names by a letter at once. The table is memory-mapped on first
+use. Rebuild it after editing a corpus with ``python -m dnd_gen.names``.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from . import seeding
+from .rules import RACES
+
+DATA_DIR = Path(__file__).parent / "data"
+CORPUS_DIR = DATA_DIR / "names"
+TABLE_PATH = DATA_DIR / "names.bin"
+BLENDS = {"Half-Elf": ("Elf", "Human")}   # races trained on other races' corpora
+PARTS = ("first", "last")
+ORDER = 3       # letters of context per state
+CONTEXT_WEIGHT = 4  # full-context counts against those of the shorter context
+MIN_LEN = 3
+MAX_LEN = 20    # letters per sample; see also each model's corpus limit
+MAGIC = b"DNDNAMES"
+VERSION = 1
+
+# name -> dtype of each array in the table. A state owns `total` consecutive
+# slots from `base`, one per unit of transition weight, so a uniform draw
+# picks the next letter with a single lookup.
+ARRAYS = {
+    "start": np.int32,    # model -> initial state
+    "limit": np.uint8,    # model -> longest name in its corpus
+    "base": np.int32,     # state -> its first slot
+    "total": np.int32,    # state -> its number of slots
+    "symbol": np.uint8,   # slot -> ASCII letter, 0 ends the name
+    "next": np.int32,     # slot -> state after the letter
+}
+
+def corpus_files(corpus_dir=CORPUS_DIR):
+    return sorted(Path(corpus_dir).glob("*.txt"))
+
+def corpus_digest(corpus_dir=CORPUS_DIR):
+    """Hash of the corpus files, stored in the table to detect a stale build."""
+    digest = hashlib.sha256()
+    for path in corpus_files(corpus_dir):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def read_corpus(race, corpus_dir=CORPUS_DIR):
+    """Return ``{"first": [...], "last": [...]}`` lowercase training names for `race`."""
+    parts = {part: [] for part in PARTS}
+    for source in BLENDS.get(race, (race,)):
+        part = None
+        text = (Path(corpus_dir) / f"{source.lower()}.txt").read_text(encoding="utf-8")
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("["):
+                part = line.strip("[]")
+            elif not line.isascii():
+                raise ValueError(f"{source} corpus: {line!r} is not ASCII")
+            else:
+                parts[part].append(line.lower())
+    return parts
+
+def _counts(names, order):
+    """Letter counts ``{context: {letter: count}}`` for `order`-letter contexts.
+
+    "^" pads the start of a name and "" ends it.
+    """
+    counts = {}
+    for name in names:
+        context = "^" * order
+        for letter in [*name, ""]:
+            following = counts.setdefault(context, {})
+            following[letter] = following.get(letter, 0) + 1
+            context = (context + letter)[-order:]
+    return counts
+
+def _chain(names, order):
+    """Transition weights ``{context: {letter: weight}}`` for one model.
+
+    Each context mixes its own counts (weighted by `CONTEXT_WEIGHT`) with
+    those of its one-letter-shorter suffix. The shorter context lets a
+    small corpus recombine into new names, and the longer one keeps them
+    sounding like the corpus. Only contexts reachable from the start are
+    kept.
+    """
+    long, short = _counts(names, order), _counts(names, order - 1)
+    chain = {}
+    todo = ["^" * order]
+    while todo:
+        context = todo.pop()
+        if context in chain:
+            continue
+        weights = {letter: CONTEXT_WEIGHT * count
+                   for letter, count in long.get(context, {}).items()}
+        for letter, count in short[context[1:]].items():
+            weights[letter] = weights.get(letter, 0) + count
+        chain[context] = weights
+        todo += [(context + letter)[-order:] for letter in weights if letter]
+    return chain
+
+def compile_tables(corpus_dir=CORPUS_DIR, order=ORDER):
+    """Train every race's chains and return the binary table as bytes."""
+    if order < 2:
+        raise ValueError("order must be at least 2")
+    columns = {name: [] for name in ARRAYS}
+    for race in RACES:
+        corpus = read_corpus(race, corpus_dir)
+        for part in PARTS:
+            chain = _chain(corpus[part], order)
+            first = len(columns["total"])
+            index = {context: first + i for i, context in enumerate(chain)}
+            columns["start"].append(index["^" * order])
+            columns["limit"].append(min(MAX_LEN, max(map(len, corpus[part]))))
+            for context, following in chain.items():
+                columns["base"].append(len(columns["symbol"]))
+                columns["total"].append(sum(following.values()))
+                for letter, count in sorted(following.items()):
+                    columns["symbol"] += [ord(letter) if letter else 0] * count
+                    columns["next"] += [index[(context + letter)[-order:]] if letter else 0] * count
+
+    header = {"version": VERSION, "order": order, "races": RACES, "parts": list(PARTS),
+              "digest": corpus_digest(corpus_dir), "arrays": {}}
+    blobs = []
+    offset = 0
+    for name, dtype in ARRAYS.items():
+        blob = np.asarray(columns[name], dtype=dtype).tobytes()
+        header["arrays"][name] = [offset, len(columns[name])]
+        blobs.append(blob + b"\0" * (-len(blob) % 8))   # keep every array 8-byte aligned
+        offset += len(blobs[-1])
+    meta = json.dumps(header).encode()
+    meta += b" " * (-(len(MAGIC) + 4 + len(meta)) % 8)
+    return b"".join([MAGIC, struct.pack("<I", len(meta)), meta, *blobs])
+
+def build(path=TABLE_PATH, corpus_dir=CORPUS_DIR, order=ORDER):
+    """Compile the corpora and write the table to `path`; returns its size in bytes."""
+    data = compile_tables(corpus_dir, order)
+    Path(path).write_bytes(data)
+    return len(data)
+
+class MarkovNames:
+    """Samples names from a compiled table; the arrays are views over `buffer`.
+
+    With `unique` set, `generate` and `generate_for` never return a name this
+    instance has returned before (see `forget`).
+    """
+
+    def __init__(self, buffer):
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a compiled name table")
+        (size,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buffer[start:start + size]))
+        if self.header["version"] != VERSION or self.header["races"] != RACES:
+            raise ValueError("name table is out of date; rebuild it with python -m dnd_gen.names")
+        data = start + size
+        for name, dtype in ARRAYS.items():
+            offset, count = self.header["arrays"][name]
+            setattr(self, name, np.frombuffer(buffer, dtype=dtype, count=count, offset=data + offset))
+        self.buffer = buffer
+        # Python-level indexing of memoryviews is several times faster than of arrays
+        self._views = tuple(memoryview(getattr(self, name))
+                            for name in ("base", "total", "symbol", "next"))
+        self._seen = set()
+        self._pending = {}      # race -> names pre-drawn for `name`
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path=TABLE_PATH):
+        """Memory-map a compiled table."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _sample(self, models, uniform):
+        """Draw one capitalized name per model index; returns (bytes array, usable mask).
+
+        ``uniform(step, live)`` returns a float in [0, 1) for each row still
+        spelling its name at letter `step`.
+        """
+        n = len(models)
+        letters = np.zeros((n, MAX_LEN), dtype=np.uint8)
+        live = np.arange(n)
+        state = self.start[models]
+        for step in range(MAX_LEN):
+            slot = self.base[state] + (uniform(step, live) * self.total[state]).astype(np.int32)
+            symbol = self.symbol[slot]
+            letters[live, step] = symbol
+            going = symbol != 0
+            live, state = live[going], self.next[slot[going]]
+            if not len(live):
+                break
+        length = np.count_nonzero(letters, axis=1)
+        usable = (length >= MIN_LEN) & (length <= self.limit[models])
+        usable[live] = False    # still going after MAX_LEN letters
+        initial = letters[:, 0]
+        initial[initial >= ord("a")] -= 32      # capitalize
+        return letters.view(f"S{MAX_LEN}").ravel(), usable
+
+    def generate_for(self, race_idx, rng=None, unique=False, seeds=None):
+        """Return one "First Last" name per entry of `race_idx` (indices into ``RACES``).
+
+        With `seeds` (one per entry) each name is drawn from its own seed's
+        stream (see `dnd_gen.seeding`) instead of from `rng`, so the same seed
+        and race always give the same name, unless `unique` has to skip it.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        race_idx = np.asarray(race_idx, dtype=np.intp)
+        out = [None] * len(race_idx)
+        filled = np.zeros(len(race_idx), dtype=bool)
+        todo = np.arange(len(race_idx))
+        stalled = 0
+        attempt = 0
+        while len(todo):
+            # First and last names in one pass: rows [0, k) and [k, 2k)
+            k = len(todo)
+            if seeds is None:
+                uniform = lambda step, live: rng.random(len(live))
+            else:
+                # Attempt a of a name reads MAX_LEN draws for the first name, then the last
+                rows = np.tile(np.asarray(seeds, dtype=np.uint64)[todo], 2)
+                first = seeding.NAMES + 2 * attempt * MAX_LEN + np.repeat([0, MAX_LEN], k)
+                uniform = lambda step, live: seeding.uniforms_at(rows[live], first[live] + step)
+            attempt += 1
+            names, usable = self._sample(np.concatenate([race_idx[todo] * 2, race_idx[todo] * 2 + 1]), uniform)
+            ok = usable[:k] & usable[k:]
+            done = todo[ok].tolist()
+            full = [f"{a.decode()} {b.decode()}"
+                    for a, b in zip(names[:k][ok].tolist(), names[k:][ok].tolist())]
+            if unique:
+                kept = []
+                with self._lock:
+                    for i, name in zip(done, full):
+                        if name not in self._seen:
+                            self._seen.add(name)
+                            kept.append((i, name))
+                done, full = [i for i, _ in kept], [name for _, name in kept]
+            for i, name in zip(done, full):
+                out[i] = name
+            filled[done] = True
+            stalled = 0 if done else stalled + 1
+            if stalled == 10:
+                raise RuntimeError("ran out of unique names")
+            todo = todo[~filled[todo]]
+        return out
+
+    def _sample_seeded(self, model, seed, position):
+        """`_sample` for one model and seed in plain Python; the same draws give the same name."""
+        base, total, symbols, following = self._views
+        state = int(self.start[model])
+        letters = bytearray()
+        for step in range(MAX_LEN):
+            slot = base[state] + int(seeding.uniform_at(seed, position + step) * total[state])
+            symbol = symbols[slot]
+            if not symbol:
+                break
+            letters.append(symbol)
+            state = following[slot]
+        else:
+            return None     # still going after MAX_LEN letters
+        if not MIN_LEN <= len(letters) <= self.limit[model]:
+            return None
+        if letters[0] >= ord("a"):
+            letters[0] -= 32
+        return letters.decode()
+
+    def seeded_name(self, race_idx, seed):
+        """What ``generate_for([race_idx], seeds=[seed])`` returns, without NumPy overhead."""
+        for attempt in range(1000):
+            position = seeding.NAMES + 2 * attempt * MAX_LEN
+            first = self._sample_seeded(2 * race_idx, seed, position)
+            last = self._sample_seeded(2 * race_idx + 1, seed, position + MAX_LEN)
+            if first and last:
+                return f"{first} {last}"
+        raise RuntimeError("no usable name in 1000 attempts")
+
+    def generate(self, race, n, rng=None, unique=False):
+        """Return `n` names for `race`."""
+        return self.generate_for(np.full(n, RACES.index(race)), rng, unique)
+
+    def name(self, race):
+        """One name for `race`, served from a small pre-drawn batch."""
+        with self._lock:
+            pending = self._pending.get(race)
+            if pending:
+                return pending.pop()
+        pending = self.generate(race, 256)
+        name = pending.pop()
+        with self._lock:
+            self._pending[race] = pending
+        return name
+
+    def forget(self):
+        """Allow names already handed out with `unique` to come up again."""
+        with self._lock:
+            self._seen.clear()
+
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_name_generator():
+    """Return the process-wide generator, mapping the bundled table on first use.
+
+    A missing table, or one built from different corpora, is compiled in
+    memory instead.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                try:
+                    generator = MarkovNames.open()
+                    if corpus_files() and generator.header["digest"] != corpus_digest():
+                        raise ValueError("stale name table")
+                except (OSError, ValueError):
+                    generator = MarkovNames(compile_tables())
+                _generator = generator
+    return _generator
+
+def random_name(race, seed=None):
+    """A procedural name for `race`, offline; the same `seed` always gives the same name."""
+    if seed is not None:
+        return get_name_generator().seeded_name(RACES.index(race), seed)
+    return get_name_generator().name(race)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the name corpora into the binary table.")
+    parser.add_argument("-o", "--output", default=TABLE_PATH, help=f"default: {TABLE_PATH}")
+    parser.add_argument("--order", type=int, default=ORDER, help="letters of context per state")
+    parser.add_argument("--sample", type=int, default=0, metavar="N",
+                        help="print N sample names per race afterwards")
+    args = parser.parse_args(argv)
+    size = build(args.output, order=args.order)
+    print(f"wrote {args.output} ({size:,} bytes)")
+    if args.sample:
+        with open(args.output, "rb") as f:
+            generator = MarkovNames(f.read())
+        for race in RACES:
+            print(f"{race}: {', '.join(generator.generate(race, args.sample))}")
+    return 0
+
+if __name__ == "__main__":
+    main()
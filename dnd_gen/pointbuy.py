@@ -0,0 +1,105 @@
+"""Precomputed point-buy allocations and an exact class optimizer.
+
+Every way to spend exactly 27 points over scores 8–15 is enumerated once at
+import (12,282 rows), so queries are a vectorized mask and the class/race
+optimizer is a single argmax that is then memoized per (class, race, extras).
+"""
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from .batch import LINEAGE_ASI_VECTORS
+from .rules import (
+    ABILITIES, CLASS_PRIORITY, POINT_BUY_BUDGET, POINT_COST, RACE_CHOICES, lineage_index,
+    racial_vector,
+)
+
+# ---------- Allocation index ----------
+_SCORES = np.arange(8, 16, dtype=np.int8)
+_COSTS = np.array([POINT_COST[int(s)] for s in _SCORES], dtype=np.int16)
+
+def _build_index():
+    grid = np.indices((len(_SCORES),) * len(ABILITIES)).reshape(len(ABILITIES), -1).T
+    spent = _COSTS[grid].sum(axis=1)
+    return _SCORES[grid[spent == POINT_BUY_BUDGET]]
+
+ALLOCATIONS = _build_index()   # (k, 6) int8, ABILITIES order
+ALLOCATIONS.setflags(write=False)
+
+def find_allocations(min_scores=None, max_scores=None):
+    """Return every full 27-point allocation within the given per-ability bounds.
+
+    ``find_allocations({"Dexterity": 15, "Constitution": 14})`` lists all
+    spreads with DEX ≥ 15 and CON ≥ 14, as dicts in ``ABILITIES`` order.
+    """
+    mask = np.ones(len(ALLOCATIONS), dtype=bool)
+    for bounds, op in ((min_scores, np.greater_equal), (max_scores, np.less_equal)):
+        for ability, value in (bounds or {}).items():
+            mask &= op(ALLOCATIONS[:, ABILITIES.index(ability)], value)
+    return [dict(zip(ABILITIES, row)) for row in ALLOCATIONS[mask].tolist()]
+
+# ---------- Class-weighted optimizer ----------
+PRIMARY_WEIGHT = 3.0
+SECONDARY_WEIGHT = 2.0
+CON_WEIGHT = 1.0        # everyone wants hit points
+DUMP_WEIGHT = 0.25
+
+def class_weights(char_class):
+    """Per-ability weights (ABILITIES order) from the class priorities."""
+    priorities = CLASS_PRIORITY.get(char_class, [])
+    weights = np.full(len(ABILITIES), DUMP_WEIGHT)
+    weights[ABILITIES.index("Constitution")] = CON_WEIGHT
+    for ability, weight in zip(priorities, (PRIMARY_WEIGHT, SECONDARY_WEIGHT)):
+        weights[ABILITIES.index(ability)] = weight
+    return weights
+
+def ability_values(final, weights):
+    """Per-ability terms of the class score; the ASI planner maximizes the same sum.
+
+    Modifiers dominate; the raw score only breaks ties so odd points land on
+    the abilities that matter most.
+    """
+    final = np.asarray(final, dtype=np.int16)
+    return (((final - 10) // 2) * 1000 + final) * weights
+
+def _score(final, weights):
+    return ability_values(final, weights).sum(axis=-1)
+
+@lru_cache(maxsize=None)
+def _best(char_class, race, half_elf_extras, subrace):
+    weights = class_weights(char_class)
+    if race is None:
+        candidates = [(None, np.zeros(len(ABILITIES), dtype=np.int8))]
+    elif race in RACE_CHOICES and half_elf_extras is None:
+        # Pick the +1/+1 pair as part of the optimization
+        choice = RACE_CHOICES[race]
+        candidates = [(list(pair), np.array(racial_vector(race, list(pair), subrace), dtype=np.int8))
+                      for pair in combinations(choice.options, choice.count)]
+    elif race in RACE_CHOICES:
+        candidates = [(list(half_elf_extras),
+                       np.array(racial_vector(race, list(half_elf_extras), subrace), dtype=np.int8))]
+    else:
+        candidates = [(None, LINEAGE_ASI_VECTORS[lineage_index(race, subrace)])]
+
+    best = None
+    for extras, vector in candidates:
+        scores = _score(ALLOCATIONS + vector, weights)
+        i = int(np.argmax(scores))
+        if best is None or scores[i] > best[0]:
+            best = (scores[i], i, extras)
+    _, i, extras = best
+    return dict(zip(ABILITIES, ALLOCATIONS[i].tolist())), extras
+
+def optimize_point_buy(char_class, race=None, half_elf_extras=None, subrace=None):
+    """Return ``(base_stats, half_elf_extras)`` maximizing the class score.
+
+    Racial bonuses are included when `race` (and `subrace`) is given. For a
+    Half-Elf without `half_elf_extras` the best +1/+1 pair is chosen too;
+    otherwise the extras returned are the ones passed in (or None for other
+    races).
+    """
+    if half_elf_extras is not None:
+        half_elf_extras = tuple(half_elf_extras) if len(half_elf_extras) == 2 else None
+    stats, extras = _best(char_class, race, half_elf_extras, subrace)
+    return dict(stats), extras
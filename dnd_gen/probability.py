@@ -0,0 +1,122 @@
+"""Exact distributions for ability-score generation methods.
+
+Distributions are NumPy probability vectors indexed by value (``pmf[v]`` is
+P(X = v)), computed by dynamic programming and convolution rather than
+sampling, and memoized per rule. `monte_carlo_pmf` covers custom rules that
+have no closed form.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from .rules import ABILITIES, apply_racial_asi, lineage_index
+
+class RollRule(NamedTuple):
+    """Roll `dice` d`sides`, keep the highest `keep`; faces below `min_face` are rerolled."""
+    dice: int = 4
+    sides: int = 6
+    keep: int = 3
+    min_face: int = 1
+
+STANDARD = RollRule()
+
+@lru_cache(maxsize=None)
+def _score_pmf(rule):
+    faces = range(rule.min_face, rule.sides + 1)
+    p_face = 1.0 / len(faces)
+    # State: the `keep` highest faces seen so far (sorted), with their probability
+    states = {(): 1.0}
+    for _ in range(rule.dice):
+        nxt = {}
+        for kept, p in states.items():
+            for face in faces:
+                new = tuple(sorted(kept + (face,), reverse=True)[:rule.keep])
+                nxt[new] = nxt.get(new, 0.0) + p * p_face
+        states = nxt
+    pmf = np.zeros(rule.keep * rule.sides + 1)
+    for kept, p in states.items():
+        pmf[sum(kept)] += p
+    pmf.setflags(write=False)
+    return pmf
+
+def score_pmf(rule=STANDARD):
+    """Exact distribution of a single ability score under `rule`."""
+    return _score_pmf(rule)
+
+@lru_cache(maxsize=None)
+def _total_pmf(rule, count):
+    pmf = np.ones(1)
+    for _ in range(count):
+        pmf = np.convolve(pmf, _score_pmf(rule))
+    pmf.setflags(write=False)
+    return pmf
+
+def total_pmf(rule=STANDARD, count=len(ABILITIES)):
+    """Exact distribution of the sum of `count` independent scores."""
+    return _total_pmf(rule, count)
+
+def modifier(score):
+    return (score - 10) // 2
+
+@lru_cache(maxsize=None)
+def _modifier_pmfs(rule, race, half_elf_extras, subrace):
+    zero = {a: 0 for a in ABILITIES}
+    bonus = apply_racial_asi(zero, race, list(half_elf_extras) if half_elf_extras else None, subrace)
+    pmf = _score_pmf(rule)
+    scores = np.arange(len(pmf))
+    out = {}
+    for ability in ABILITIES:
+        mods = modifier(scores + bonus[ability])
+        dist = {}
+        for m, p in zip(mods.tolist(), pmf.tolist()):
+            if p:
+                dist[m] = dist.get(m, 0.0) + p
+        out[ability] = dict(sorted(dist.items()))
+    return out
+
+def modifier_distribution(rule=STANDARD, race=None, half_elf_extras=None, subrace=None):
+    """Exact modifier distribution per ability, after `apply_racial_asi` for `race`.
+
+    Returns ``{ability: {modifier: probability}}``.
+    """
+    if race is not None:
+        lineage_index(race, subrace)    # raises for an unknown race or subrace
+    extras = tuple(half_elf_extras) if half_elf_extras else None
+    return {a: dict(d) for a, d in _modifier_pmfs(rule, race, extras, subrace).items()}
+
+def percentile(value, pmf):
+    """Mid-rank percentile (0–100) of `value` within `pmf`: P(X < v) + ½·P(X = v)."""
+    value = int(value)
+    if value < 0:
+        return 0.0
+    if value >= len(pmf):
+        return 100.0
+    below = float(pmf[:value].sum())
+    return 100.0 * (below + 0.5 * float(pmf[value]))
+
+def array_percentile(stats, rule=STANDARD):
+    """Percentile of a six-score array's total against rolling it under `rule`."""
+    return percentile(sum(stats.values()), total_pmf(rule, len(stats)))
+
+# ---------- Monte Carlo fallback ----------
+_mc_cache = {}
+
+def monte_carlo_pmf(sampler, key, n=1_000_000, rng=None):
+    """Empirical pmf for custom rules with no exact form, memoized by `key`.
+
+    `sampler(rng, n)` must return `n` non-negative integer outcomes (one NumPy
+    call, not a Python loop), e.g. a whole array total or a single score.
+    """
+    if key not in _mc_cache:
+        rng = rng if rng is not None else np.random.default_rng()
+        samples = np.asarray(sampler(rng, n), dtype=np.int64).ravel()
+        pmf = np.bincount(samples) / samples.size
+        pmf.setflags(write=False)
+        _mc_cache[key] = pmf
+    return _mc_cache[key]
+
+def sample_scores(rule, rng, n):
+    """Vectorized sampler for `rule`, usable with `monte_carlo_pmf`."""
+    dice = rng.integers(rule.min_face, rule.sides + 1, size=(n, rule.dice))
+    return np.sort(dice, axis=1)[:, rule.dice - rule.keep:].sum(axis=1)
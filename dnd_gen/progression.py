@@ -0,0 +1,177 @@
+"""Level-by-level progression with a cheap snapshot per level.
+
+`Progression` advances a character one level at a time and applies only
+what changes on the way: the ASIs the class earns at the new level (from
+its ASI schedule), the modifiers of the abilities they raise and the
+proficiency bonus when it steps up. Every level is kept as an immutable
+`LevelSnapshot` that shares everything unchanged with the level before
+(the score and modifier tuples are the very same objects), so a full
+1..20 timeline costs a handful of small tuples. Asking for a level that
+has already been reached is a lookup; a later one resumes from the last
+snapshot instead of starting over.
+
+With ``spend="optimal"`` every unspent ASI is spent at the level it is
+earned, as `dnd_gen.asiplan.plan_asis` would spend it then; with
+``spend=None`` ASIs are banked. `progress_batch` does the same for whole
+NumPy batches from `dnd_gen.batch.generate_characters`.
+"""
+import numpy as np
+
+from .asiplan import plan_asis, plan_increments
+from .batch import ASI_SLOT_TABLE
+from .character import Character
+from .probability import modifier
+from .rules import ABILITIES, MAX_LEVEL, PROFICIENCY_BONUS, asi_slots_available
+
+SPEND_POLICIES = ("optimal", None)
+
+class LevelSnapshot:
+    """A character's state at one level; read-only.
+
+    `scores` are the final scores in ``ABILITIES`` order and `modifiers`
+    their modifiers. `asis` lists the ASIs applied on reaching this level
+    as ``(first, amount, second)``, and `previous` is the snapshot before.
+    """
+    __slots__ = ("level", "scores", "modifiers", "proficiency_bonus", "asis_earned",
+                 "asis_spent", "asis", "previous")
+
+    def __init__(self, level, scores, modifiers, proficiency_bonus, asis_earned, asis_spent,
+                 asis=(), previous=None):
+        self.level = level
+        self.scores = scores
+        self.modifiers = modifiers
+        self.proficiency_bonus = proficiency_bonus
+        self.asis_earned = asis_earned
+        self.asis_spent = asis_spent
+        self.asis = asis
+        self.previous = previous
+
+    @property
+    def stats(self):
+        return dict(zip(ABILITIES, self.scores))
+
+    @property
+    def unspent(self):
+        return self.asis_earned - self.asis_spent
+
+    def __repr__(self):
+        return (f"LevelSnapshot(level {self.level}, {self.scores}, "
+                f"{self.asis_spent}/{self.asis_earned} ASIs)")
+
+class Progression:
+    """Advances `char` from its level to ``MAX_LEVEL``, one snapshot per level.
+
+    `asis_spent` says how many of the ASIs `char` has earned are already in
+    its final scores. `char` itself is never changed; `character_at` builds
+    the character at any level reached.
+    """
+
+    def __init__(self, char, asis_spent=0, spend="optimal"):
+        if spend not in SPEND_POLICIES:
+            raise ValueError(f"Unknown spend policy: {spend!r} (expected 'optimal' or None)")
+        self.char = char
+        self.spend = spend
+        scores = char.scores[len(ABILITIES):]
+        self.start = char.level
+        self._snapshots = [LevelSnapshot(
+            char.level, scores, tuple(modifier(s) for s in scores),
+            PROFICIENCY_BONUS[char.level], asi_slots_available(char.char_class, char.level),
+            asis_spent)]
+
+    @property
+    def current(self):
+        """The snapshot of the highest level reached so far."""
+        return self._snapshots[-1]
+
+    def advance(self):
+        """Go up one level, applying only what changes; returns the new snapshot."""
+        prev = self._snapshots[-1]
+        level = prev.level + 1
+        if level > MAX_LEVEL:
+            raise ValueError(f"Already at the maximum level ({MAX_LEVEL})")
+        earned = asi_slots_available(self.char.char_class, level)
+        scores, modifiers, spent, asis = prev.scores, prev.modifiers, prev.asis_spent, ()
+        if self.spend == "optimal" and earned > spent:
+            plan = plan_asis(dict(zip(ABILITIES, scores)), self.char.char_class, level, spent)
+            if plan:
+                raised = list(scores)
+                for _, first, amount, second in plan:
+                    raised[ABILITIES.index(first)] += amount
+                    if second is not None:
+                        raised[ABILITIES.index(second)] += 1
+                # Only the modifiers of raised abilities are recomputed
+                modifiers = tuple(m if r == s else modifier(r)
+                                  for m, r, s in zip(modifiers, raised, scores))
+                scores = tuple(raised)
+                spent += len(plan)
+                asis = tuple(asi[1:] for asi in plan)
+        snapshot = LevelSnapshot(level, scores, modifiers, PROFICIENCY_BONUS[level], earned, spent,
+                                 asis, prev)
+        self._snapshots.append(snapshot)
+        return snapshot
+
+    def at(self, level):
+        """The snapshot at `level`, advancing from the last one reached if needed."""
+        if not self.start <= level <= MAX_LEVEL:
+            raise ValueError(f"level must be between {self.start} and {MAX_LEVEL}, got {level}")
+        while self._snapshots[-1].level < level:
+            self.advance()
+        return self._snapshots[level - self.start]
+
+    def timeline(self, to_level=MAX_LEVEL):
+        """Snapshots from the starting level through `to_level`."""
+        self.at(to_level)
+        return self._snapshots[:to_level - self.start + 1]
+
+    def character_at(self, level):
+        """A new `Character` as it stands at `level` (the progression's `char` is untouched)."""
+        snapshot = self.at(level)
+        c = self.char
+        return Character.from_packed(c.name, c.race, c.char_class, c.background, c.alignment,
+                                     level, c.scores[:len(ABILITIES)] + snapshot.scores,
+                                     c.backstory, c.apply_racial, c.seed, c.subrace)
+
+def timeline(char, to_level=MAX_LEVEL, asis_spent=0, spend="optimal"):
+    """`char` at every level from its own through `to_level`, as snapshots."""
+    return Progression(char, asis_spent, spend).timeline(to_level)
+
+def progress_batch(final_stats, class_idx, level=1, to_level=MAX_LEVEL, spent=0, spend="optimal"):
+    """Advance a whole batch from `level` to `to_level`, one level at a time.
+
+    `final_stats` is ``(n, 6)`` and `class_idx` indexes ``CLASSES`` (as in
+    `generate_characters` output); `spent` is the ASIs already in the
+    scores, per row or for all. Returns a dict with ``level`` (the levels
+    covered) and, one entry per level, ``final_stats`` and ``modifiers``
+    ``(n, 6)`` int8 arrays and ``asis_spent``. A level at which no row
+    changes shares the previous level's arrays instead of copying them, so
+    every array returned is read-only; copy one to change it.
+    """
+    if spend not in SPEND_POLICIES:
+        raise ValueError(f"Unknown spend policy: {spend!r} (expected 'optimal' or None)")
+    if not 1 <= level <= to_level <= MAX_LEVEL:
+        raise ValueError(f"expected 1 <= level <= to_level <= {MAX_LEVEL}")
+    scores = np.array(final_stats, dtype=np.int8).reshape(-1, len(ABILITIES))
+    class_idx = np.broadcast_to(np.asarray(class_idx, dtype=np.intp), (len(scores),))
+    spent = np.broadcast_to(np.asarray(spent, dtype=np.uint8), (len(scores),)).copy()
+    modifiers = (scores - 10) // 2
+    out = {"level": np.arange(level, to_level + 1), "final_stats": [scores],
+           "modifiers": [modifiers], "asis_spent": [spent]}
+    for lvl in range(level + 1, to_level + 1):
+        earned = ASI_SLOT_TABLE[class_idx, lvl]
+        rows = np.flatnonzero(earned > spent) if spend == "optimal" else ()
+        if len(rows):
+            increments = plan_increments(scores[rows], class_idx[rows], earned[rows] - spent[rows])
+            scores = scores.copy()
+            scores[rows] += increments
+            modifiers = modifiers.copy()
+            modifiers[rows] = (scores[rows] - 10) // 2
+            spent = spent.copy()
+            # As in the app, an ASI the 20 cap leaves no room for stays unspent
+            spent[rows] += (increments.sum(axis=1) // 2).astype(np.uint8)
+        out["final_stats"].append(scores)
+        out["modifiers"].append(modifiers)
+        out["asis_spent"].append(spent)
+    for arrays in out.values():
+        for array in arrays if isinstance(arrays, list) else (arrays,):
+            array.setflags(write=False)
+    return out
@@ -0,0 +1,349 @@
+"""Deadlines, retries, hedged requests and a circuit breaker for LLM calls.
+
+Every completion made by `dnd_gen.ai` runs under one process-wide
+`Resilience` policy:
+
+* the whole call, the wait for a gateway slot and retries included, has
+  to finish within `slo` seconds, and each attempt gets at most `timeout`
+  of what is left;
+* transient failures (timeouts, dropped connections, 429s and 5xx) are
+  retried with full-jitter exponential backoff while time remains;
+* with hedging on, an attempt still running after the recent p95 latency
+  gets a duplicate request, and whichever answers first wins;
+* consecutive transient failures open a `CircuitBreaker`, and while it is
+  open calls fail at once with `CircuitOpen`, so the helpers serve their
+  local fallbacks immediately instead of waiting on a sick provider.
+  After `cooldown` seconds one probe call is let through to test it.
+
+Calls that cannot be completed in time raise a `ProviderUnavailable`
+subclass; the AI helpers answer those with offline text.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .metrics import CIRCUIT_OPENED, LLM_HEDGES, LLM_RETRIES
+
+class ProviderUnavailable(RuntimeError):
+    """The provider could not answer within the policy; use local text instead."""
+    reason = "unavailable"
+
+class CircuitOpen(ProviderUnavailable):
+    """Recent calls failed and the circuit breaker is open."""
+    reason = "circuit"
+
+class DeadlineExceeded(ProviderUnavailable):
+    """The call's SLO ran out before an attempt succeeded."""
+    reason = "deadline"
+
+def is_transient(exc):
+    """True for failures worth retrying: timeouts, connection errors, 408/409/429 and 5xx."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        from openai import APIConnectionError, APIStatusError
+    except ImportError:
+        return False
+    if isinstance(exc, APIConnectionError):      # APITimeoutError included
+        return True
+    return isinstance(exc, APIStatusError) and (exc.status_code in (408, 409, 429)
+                                                or exc.status_code >= 500)
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive transient failures, for `cooldown` seconds.
+
+    Once the cooldown has passed the breaker is half-open: one probe call
+    at a time (per `cooldown`) is allowed, and its outcome closes the
+    breaker or opens it again.
+    """
+
+    def __init__(self, failures=5, cooldown=30.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._streak = 0
+        self._opened_at = None
+        self._probe_at = None
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half-open"
+
+    def check(self):
+        """Raise `CircuitOpen` unless a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self._opened_at >= self.cooldown and (
+                    self._probe_at is None or now - self._probe_at >= self.cooldown):
+                self._probe_at = now
+                return
+        raise CircuitOpen("the AI provider is failing; using local text for now")
+
+    def success(self):
+        with self._lock:
+            self._streak = 0
+            self._opened_at = self._probe_at = None
+
+    def failure(self):
+        with self._lock:
+            self._streak += 1
+            if self._probe_at is not None or (self._opened_at is None
+                                              and self._streak >= self.failures):
+                self._opened_at = time.monotonic()
+                self._probe_at = None
+                self.opened += 1
+                CIRCUIT_OPENED.inc()
+
+    def reset(self):
+        self.success()
+
+class LatencyWindow:
+    """The last `size` successful attempt latencies, for the hedging threshold."""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q, min_samples=20):
+        """The `q` quantile of the window, or None with fewer than `min_samples`."""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Resilience:
+    """Deadline, retry, hedging and circuit-breaker policy for upstream calls.
+
+    `timeout` caps each attempt and `slo` the whole call (seconds).
+    `retries` extra attempts follow transient failures after a full-jitter
+    backoff of up to ``backoff * 2**n`` (at most `max_backoff`) seconds.
+    `hedge` is None (off), a quantile of recent latencies such as 0.95, or
+    a fixed delay in seconds (1 or more); until enough latencies are known a
+    quantile falls back to `hedge_delay`. Blocking hedged calls run their
+    attempts on a pool of `workers` threads, two per call the default
+    gateway lets run at once, so an attempt never queues for a thread.
+    """
+
+    def __init__(self, timeout=10.0, slo=20.0, retries=2, backoff=0.25, max_backoff=2.0,
+                 hedge=None, hedge_delay=2.0, breaker=None, workers=32):
+        self.timeout = timeout
+        self.slo = slo
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.latencies = LatencyWindow()
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def begin(self):
+        """Start a call: check the breaker and return its absolute deadline."""
+        self.breaker.check()
+        return time.monotonic() + self.slo
+
+    def _hedge_after(self):
+        if self.hedge is None:
+            return None
+        if self.hedge >= 1:
+            return self.hedge
+        threshold = self.latencies.quantile(self.hedge)
+        return self.hedge_delay if threshold is None else threshold
+
+    def _sleep_for(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _outcome(self, exc, started):
+        """Book one attempt with the breaker; returns whether to retry it."""
+        if exc is None or not is_transient(exc):
+            # Any answer, even a 400, shows the provider is up
+            if exc is None:
+                self.latencies.add(time.monotonic() - started)
+            self.breaker.success()
+            return False
+        self.breaker.failure()
+        return True
+
+    # ---------- Blocking ----------
+    def call(self, attempt, deadline=None, op="", hedge=True, on_retry=None):
+        """Run ``attempt(timeout)`` under the policy and return its result.
+
+        `deadline` is the absolute ``time.monotonic()`` from `begin` (a new
+        one when None). `on_retry()` runs before every extra request, retry
+        or hedge, e.g. to count it against the rate limits.
+        """
+        deadline = self.begin() if deadline is None else deadline
+        for n in range(self.retries + 1):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            started = time.monotonic()
+            try:
+                result = self._race(attempt, min(self.timeout, left), op, on_retry, hedge)
+            except Exception as e:
+                if not self._outcome(e, started):
+                    raise
+                error = e
+            else:
+                self._outcome(None, started)
+                return result
+            if n == self.retries:
+                raise ProviderUnavailable(f"the AI provider failed {n + 1} times: {error}") from error
+            pause = self._sleep_for(n)
+            if time.monotonic() + pause >= deadline:
+                break
+            time.sleep(pause)
+            self.breaker.check()
+            LLM_RETRIES.inc(op=op)
+            if on_retry is not None:
+                on_retry()
+        raise DeadlineExceeded(f"no answer from the AI provider within {self.slo:g}s")
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="dnd-gen-hedge")
+        return self._pool
+
+    def _race(self, attempt, timeout, op, on_retry, hedge):
+        delay = self._hedge_after() if hedge else None
+        if delay is None or delay >= timeout:
+            return attempt(timeout)
+        ends = time.monotonic() + timeout
+        pool = self._executor()
+        first = pool.submit(attempt, timeout)
+        if wait([first], timeout=delay).done:
+            return first.result()
+        LLM_HEDGES.inc(op=op)
+        if on_retry is not None:
+            on_retry()
+        pending = {first, pool.submit(attempt, timeout - delay)}
+        while True:
+            done, pending = wait(pending, timeout=max(0.0, ends - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"no answer within {timeout:g}s")
+            for future in done:
+                if future.exception() is None or not pending:
+                    # The loser runs out on its own; its timeout bounds it
+                    return future.result()
+
+    # ---------- Async ----------
+    async def acall(self, attempt, deadline=None, op="", hedge=True, on_retry=None):
+        """Async `call`: ``await attempt(timeout)``, each attempt cut off at its timeout."""
+        deadline = self.begin() if deadline is None else deadline
+        for n in range(self.retries + 1):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            started = time.monotonic()
+            try:
+                result = await self._arace(attempt, min(self.timeout, left), op, on_retry, hedge)
+            except Exception as e:
+                if not self._outcome(e, started):
+                    raise
+                error = e
+            else:
+                self._outcome(None, started)
+                return result
+            if n == self.retries:
+                raise ProviderUnavailable(f"the AI provider failed {n + 1} times: {error}") from error
+            pause = self._sleep_for(n)
+            if time.monotonic() + pause >= deadline:
+                break
+            await asyncio.sleep(pause)
+            self.breaker.check()
+            LLM_RETRIES.inc(op=op)
+            if on_retry is not None:
+                on_retry()
+        raise DeadlineExceeded(f"no answer from the AI provider within {self.slo:g}s")
+
+    async def _arace(self, attempt, timeout, op, on_retry, hedge):
+        delay = self._hedge_after() if hedge else None
+        first = asyncio.ensure_future(asyncio.wait_for(attempt(timeout), timeout))
+        if delay is None or delay >= timeout:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        LLM_HEDGES.inc(op=op)
+        if on_retry is not None:
+            on_retry()
+        pending = {first, asyncio.ensure_future(asyncio.wait_for(attempt(timeout - delay),
+                                                                 timeout - delay))}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {"circuit": self.breaker.state, "opened": self.breaker.opened,
+                "p95_s": self.latencies.quantile(0.95)}
+
+_resilience = None
+_resilience_lock = threading.Lock()
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+def _env_hedge(value):
+    """None (off), a quantile (``p95`` or ``0.95``; ``on`` means p95) or a delay of 1 s or more."""
+    value = (value or "").strip().lower()
+    if value in ("", "0", "off", "no", "false"):
+        return None
+    if value in ("on", "yes", "true"):
+        return 0.95
+    if value.startswith("p"):
+        return float(value[1:]) / 100
+    return float(value)
+
+def get_resilience():
+    """Return the process-wide policy, creating it on first use.
+
+    ``DND_AI_TIMEOUT`` (seconds per attempt, default 10), ``DND_AI_SLO``
+    (seconds per call, default 20), ``DND_AI_RETRIES`` (default 2) and
+    ``DND_AI_HEDGE`` (``p95`` or another quantile such as ``0.9``, or a
+    delay of 1 second or more; off by default) configure it.
+    """
+    global _resilience
+    if _resilience is None:
+        with _resilience_lock:
+            if _resilience is None:
+                _resilience = Resilience(timeout=_env_float("DND_AI_TIMEOUT", 10.0),
+                                         slo=_env_float("DND_AI_SLO", 20.0),
+                                         retries=int(_env_float("DND_AI_RETRIES", 2)),
+                                         hedge=_env_hedge(os.getenv("DND_AI_HEDGE")))
+    return _resilience
+
+def set_resilience(resilience):
+    """Replace the process-wide policy."""
+    global _resilience
+    with _resilience_lock:
+        _resilience = resilience
@@ -0,0 +1,169 @@
+"""PHB rule tables and the pure helpers built on them.
+
+The rules live in ``data/rules.json`` and are compiled once at import into
+flat, read-only tables: every race and subrace (a *lineage*) becomes a row
+of six ability modifiers, and every class a table of ASIs earned by each
+level. The helpers below are lookups into those tables, and `dnd_gen.batch`
+turns the same rows into NumPy arrays for whole batches. The dicts the app
+has always used (``RACE_ASI``, ``ASI_LEVELS``, ``CLASS_PRIORITY``, ...) are
+derived from the same file.
+"""
+import json
+from collections import namedtuple
+from pathlib import Path
+
+RULES_PATH = Path(__file__).parent / "data" / "rules.json"
+
+# A race's "+`amount` to `count` abilities of your choice", e.g. the Half-Elf's
+Choice = namedtuple("Choice", "count amount options default")
+
+def _load(path=RULES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+_RULES = _load()
+
+# -----------------------------
+# Character options
+# -----------------------------
+ABILITIES = list(_RULES["abilities"])
+RACES = list(_RULES["races"])
+CLASSES = list(_RULES["classes"])
+BACKGROUNDS = list(_RULES["backgrounds"])
+ALIGNMENTS = list(_RULES["alignments"])
+PRONOUNS = _RULES["pronouns"]
+GENDERS = list(PRONOUNS)
+
+# ---------- Racial ASIs ----------
+def _bonus_items(asi):
+    """``(ability, bonus)`` pairs of one rules entry; ``"all"`` means every ability."""
+    items = {}
+    for ability, value in asi.items():
+        for a in (ABILITIES if ability == "all" else [ability]):
+            if a not in ABILITIES:
+                raise ValueError(f"{RULES_PATH.name}: unknown ability {a!r}")
+            items[a] = items.get(a, 0) + value
+    return tuple(items.items())
+
+def _choice(spec):
+    if spec is None:
+        return None
+    options = tuple(a for a in ABILITIES if a not in spec.get("exclude", ()))
+    return Choice(spec["count"], spec["amount"], options, tuple(spec["default"]))
+
+SUBRACES = {race: list(entry.get("subraces", {})) for race, entry in _RULES["races"].items()}
+RACE_CHOICES = {race: _choice(entry["choice"]) for race, entry in _RULES["races"].items()
+                if "choice" in entry}
+
+# (race, subrace) -> (fixed bonus pairs, Choice or None). A subrace adds its
+# bonuses to its race's; subrace None is the race alone.
+def _compile_bonuses(races):
+    bonuses = {}
+    for race, entry in races.items():
+        base = _bonus_items(entry["asi"])
+        bonuses[race, None] = (base, RACE_CHOICES.get(race))
+        for subrace, sub in entry.get("subraces", {}).items():
+            bonuses[race, subrace] = (base + _bonus_items(sub["asi"]), RACE_CHOICES.get(race))
+    return bonuses
+
+_BONUSES = _compile_bonuses(_RULES["races"])
+
+# Every race first (in RACES order, so a race's index is its lineage index),
+# then the subraces
+LINEAGES = tuple([(race, None) for race in RACES] +
+                 [(race, sub) for race in RACES for sub in SUBRACES[race]])
+LINEAGE_INDEX = {lineage: i for i, lineage in enumerate(LINEAGES)}
+
+def lineage_index(race, subrace=None):
+    """Row of (`race`, `subrace`) in ``LINEAGES``/``LINEAGE_ASI``."""
+    try:
+        return LINEAGE_INDEX[race, subrace]
+    except KeyError:
+        if race not in SUBRACES:
+            raise ValueError(f"Unknown race: {race!r}") from None
+        raise ValueError(f"{subrace!r} is not a subrace of {race}") from None
+
+def apply_racial_asi(stats, race, half_elf_extras=None, subrace=None):
+    """Return a *new* dict with PHB racial (and `subrace`) ASIs applied.
+
+    A race with a choice (the Half-Elf's +1 to two abilities) takes it from
+    `half_elf_extras`, or from the rules' default without a full set. An
+    unknown race adds nothing.
+    """
+    out = stats.copy()
+    entry = _BONUSES.get((race, subrace))
+    if entry is None:
+        if subrace is not None and race in SUBRACES:
+            raise ValueError(f"{subrace!r} is not a subrace of {race}")
+        return out
+    items, choice = entry
+    for ability, value in items:
+        out[ability] = out.get(ability, 0) + value
+    if choice is not None:
+        if not half_elf_extras or len(half_elf_extras) != choice.count:
+            half_elf_extras = choice.default
+        for ability in half_elf_extras:
+            out[ability] = out.get(ability, 0) + choice.amount
+    return out
+
+def racial_vector(race, half_elf_extras=None, subrace=None):
+    """`apply_racial_asi` of all zeros, as a list in ``ABILITIES`` order."""
+    bonus = apply_racial_asi(dict.fromkeys(ABILITIES, 0), race, half_elf_extras, subrace)
+    return [bonus[a] for a in ABILITIES]
+
+# One row per lineage, the default choice included
+LINEAGE_ASI = tuple(tuple(racial_vector(race, None, sub)) for race, sub in LINEAGES)
+
+# ---------- Ability‑Score‑Improvement (ASI) tables ----------
+MAX_LEVEL = _RULES["max_level"]
+
+def _cumulative(levels):
+    """ASIs earned by each level 0..MAX_LEVEL."""
+    earned = [0] * (MAX_LEVEL + 1)
+    for lvl in levels:
+        for i in range(lvl, MAX_LEVEL + 1):
+            earned[i] += 1
+    return tuple(earned)
+
+_CLASS_ASI_LEVELS = {cls: tuple(sorted(entry.get("asi_levels", _RULES["asi_levels"])))
+                     for cls, entry in _RULES["classes"].items()}
+_DEFAULT_SLOTS = _cumulative(_RULES["asi_levels"])
+_SLOTS = {cls: _cumulative(levels) for cls, levels in _CLASS_ASI_LEVELS.items()}
+ASI_SLOTS = tuple(_SLOTS[cls] for cls in CLASSES)   # [class index][level]
+
+def asi_slots_available(cls: str, lvl: int) -> int:
+    """Return how many ASI opportunities `cls` has earned up to `lvl`."""
+    return _SLOTS.get(cls, _DEFAULT_SLOTS)[min(max(int(lvl), 0), MAX_LEVEL)]
+
+def asi_levels(cls):
+    """The levels at which `cls` gains an ASI, ascending."""
+    return _CLASS_ASI_LEVELS.get(cls, tuple(_RULES["asi_levels"]))
+
+def _by_level(steps):
+    """Per-level values 0..MAX_LEVEL from ``{"level": value}`` steps."""
+    steps = sorted((int(lvl), value) for lvl, value in steps.items())
+    return tuple(next(value for lvl, value in reversed(steps) if lvl <= max(i, steps[0][0]))
+                 for i in range(MAX_LEVEL + 1))
+
+PROFICIENCY_BONUS = _by_level(_RULES["proficiency_bonus"])   # [level]
+
+def proficiency_bonus(lvl):
+    return PROFICIENCY_BONUS[min(max(int(lvl), 0), MAX_LEVEL)]
+
+# ---------- Point buy ----------
+POINT_BUY_BUDGET = _RULES["point_buy"]["budget"]
+POINT_COST = {int(score): cost for score, cost in _RULES["point_buy"]["cost"].items()}
+
+def point_buy_spent(stats):
+    """Return the point-buy cost of `stats` (every score must be 8–15)."""
+    return sum(POINT_COST[val] for val in stats.values())
+
+# ---------- Class guidance ----------
+CLASS_PRIORITY = {cls: list(entry["priority"]) for cls, entry in _RULES["classes"].items()}
+CLASS_RECOMMENDATIONS = {cls: entry["recommendation"] for cls, entry in _RULES["classes"].items()}
+
+# ---------- The classic dict views ----------
+ASI_LEVELS = {"default": list(_RULES["asi_levels"]),
+              **{cls: list(entry["asi_levels"]) for cls, entry in _RULES["classes"].items()
+                 if "asi_levels" in entry}}
+RACE_ASI = {race: dict(_BONUSES[race, None][0]) for race in RACES}   # fixed bonuses only
@@ -0,0 +1,147 @@
+"""Headless character creation and the sheet formats."""
+from itertools import islice
+
+import numpy as np
+
+from . import seeding
+from .ai import fallback_backstory, generate_many
+from .character import Character
+from .gateway import BULK
+from .render import render
+from .rules import (
+    ABILITIES, ALIGNMENTS, BACKGROUNDS, GENDERS, PRONOUNS, apply_racial_asi,
+)
+
+BATCH_CHUNK = 10_000   # rows per generate_characters call
+TEXT_CHUNK = 64        # characters per generate_many fan-out
+
+def create_character(race, char_class, background, alignment, gender, level=1,
+                     stats=None, apply_racial=True, half_elf_extras=None,
+                     name=None, ai_name=False, seed=None, subrace=None):
+    """Build a full `Character` (``.to_dict()`` gives the classic sheet dict).
+
+    `stats` defaults to a 4d6-drop-lowest roll. Without a `name` one is drawn
+    from the race's offline name model, or generated alongside the backstory
+    when `ai_name` is set. The roll and the offline name come from `seed` (a
+    fresh one when None), which the character keeps.
+    """
+    from .names import random_name
+
+    seed = seeding.new_seed() if seed is None else seed
+    if stats is None:
+        stats = dict(zip(ABILITIES, seeding.roll_scores([seed])[0].tolist()))
+    base_stats = dict(stats)
+    final_stats = (apply_racial_asi(base_stats, race, half_elf_extras, subrace) if apply_racial
+                   else base_stats)
+
+    if name is None and not ai_name:
+        name = random_name(race, seed)
+    [(name, backstory)] = generate_many([{
+        "name": name, "race": race, "char_class": char_class, "gender": gender,
+        "background": background, "alignment": alignment, "pronoun": PRONOUNS[gender],
+    }])
+
+    return Character(name, race, char_class, background, alignment, level,
+                     base_stats, final_stats, backstory, apply_racial, seed, subrace)
+
+def iter_characters(n, race=None, char_class=None, method="roll", level=1,
+                    apply_racial=True, use_ai=False, unique_names=False, spend_asis=False,
+                    seed=None, subrace=None):
+    """Yield `n` random Characters lazily, in constant memory.
+
+    Stats come from `generate_characters` in chunks; background, alignment
+    and gender are picked per character. Names and backstories are offline
+    unless `use_ai` is set, in which case they are generated `TEXT_CHUNK`
+    characters at a time through `generate_many` at bulk priority, so they
+    never hold up interactive requests. Offline names are drawn a chunk at a
+    time from the race name models; `unique_names` rules out repeats within
+    the run. `spend_asis` spends every earned ASI with the optimal planner.
+
+    Every chunk deals its characters' seeds from its own stream spawned off
+    `seed`, so a run with the same `seed` and options repeats exactly, and
+    `character_from_seed` rebuilds any single character (offline text).
+    """
+    return iter_chunks(chunk_plan(n, seed), race, char_class, method, level,
+                       apply_racial, use_ai, unique_names, spend_asis, subrace)
+
+def chunk_plan(n, seed=None):
+    """``[(stream, size), ...]``: the spawned stream and size of each chunk of a run."""
+    sizes = [min(BATCH_CHUNK, n - start) for start in range(0, n, BATCH_CHUNK)]
+    return list(zip(seeding.spawn(seed, len(sizes)), sizes))
+
+def iter_chunks(chunks, race=None, char_class=None, method="roll", level=1,
+                apply_racial=True, use_ai=False, unique_names=False, spend_asis=False,
+                subrace=None):
+    """Yield the characters of some chunks of a `chunk_plan`, as `iter_characters` would.
+
+    Runs split into consecutive slices of the plan (e.g. one per worker
+    process) together yield exactly the characters of the whole run.
+    """
+    from .names import MarkovNames, get_name_generator
+
+    # A private generator keeps the uniqueness check to this run
+    names = MarkovNames(get_name_generator().buffer) if unique_names else get_name_generator()
+    options = {"race": race, "char_class": char_class, "method": method, "level": level,
+               "apply_racial": apply_racial, "spend_asis": spend_asis, "subrace": subrace}
+    for stream, size in chunks:
+        yield from _seeded_characters(seeding.character_seeds(stream, size), options,
+                                      names, use_ai, unique_names)
+
+def character_from_seed(seed, race=None, char_class=None, method="roll", level=1,
+                        apply_racial=True, spend_asis=False, use_ai=False, subrace=None):
+    """Rebuild the character `iter_characters` made from `seed` with these options.
+
+    Everything but AI text comes out bit for bit the same.
+    """
+    from .names import get_name_generator
+    options = {"race": race, "char_class": char_class, "method": method, "level": level,
+               "apply_racial": apply_racial, "spend_asis": spend_asis, "subrace": subrace}
+    return next(_seeded_characters([seed], options, get_name_generator(), use_ai, False))
+
+def _seeded_characters(seeds, options, names, use_ai, unique_names):
+    from .batch import generate_characters, iter_rows
+
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    batch = generate_characters(len(seeds), seeds=seeds, **options)
+    rows = iter_rows(batch)
+    offline = iter(() if use_ai else
+                   names.generate_for(batch["race"], unique=unique_names, seeds=seeds))
+    picks = zip(seeding.choose(seeds, seeding.GENDER, len(GENDERS)).tolist(),
+                seeding.choose(seeds, seeding.BACKGROUND, len(BACKGROUNDS)).tolist(),
+                seeding.choose(seeds, seeding.ALIGNMENT, len(ALIGNMENTS)).tolist(),
+                seeds.tolist())
+    apply_racial = options["apply_racial"]
+    while chunk := list(islice(rows, TEXT_CHUNK)):
+        specs = []
+        for row, (gender, background, alignment, seed) in zip(chunk, picks):
+            gender = GENDERS[gender]
+            specs.append({
+                "name": None if use_ai else next(offline),
+                "race": row["race"], "char_class": row["class"], "gender": gender,
+                "background": BACKGROUNDS[background],
+                "alignment": ALIGNMENTS[alignment],
+                "pronoun": PRONOUNS[gender],
+                "seed": seed,
+            })
+        if use_ai:
+            texts = generate_many(specs, priority=BULK)
+        else:
+            texts = [(spec["name"], fallback_backstory(
+                spec["name"], spec["race"], spec["char_class"], spec["background"],
+                spec["alignment"], spec["pronoun"])) for spec in specs]
+        for row, spec, (name, backstory) in zip(chunk, specs, texts):
+            yield Character(name, row["race"], row["class"], spec["background"],
+                            spec["alignment"], row["level"], row["base_stats"],
+                            row["final_stats"], backstory, apply_racial, spec["seed"],
+                            options["subrace"])
+
+def sheet_text(char):
+    """Return the downloadable ``.txt`` sheet for a `Character`."""
+    return render(char, "txt")
+
+def sheet_markdown(char):
+    """Return the sheet as a Markdown document."""
+    return render(char, "md")
+
+def sheet_filename(char, ext="txt"):
+    return f"{char.name.replace(' ', '_')}_sheet.{ext}"
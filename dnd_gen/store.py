@@ -0,0 +1,272 @@
+"""Persistent SQLite store of generated characters.
+
+The database runs in WAL mode, so the browser keeps reading while a bulk
+insert is writing, and characters go in with batched ``executemany``
+calls. The scores are kept as one 12-byte blob (base then final, in
+``ABILITIES`` order), as in `Character` itself. Browsing is keyset-paginated
+(``WHERE id < ? ORDER BY id DESC``): with an index on each filter column
+ending in ``id``, a page costs the same at row 10 as at row 1,000,000.
+Seeds are indexed too, so replaying a stored seed (`find_seed`) skips
+generation and any API calls. A row also records the creation inputs a
+`Character` does not keep (gender, racial ability picks and how it was
+named), so a replay only matches the same choices. Each row can name an
+`owner` (the app passes its user's token) so that one shared database
+lists every user's characters separately.
+"""
+import os
+import sqlite3
+import threading
+import time
+from itertools import islice
+
+from .character import Character
+
+DEFAULT_PATH = "dnd_characters.db"
+INSERT_BATCH = 5_000
+FILTERS = {"race": "race", "char_class": "class", "level": "level", "alignment": "alignment",
+           "owner": "owner"}
+_FIELDS = {**FILTERS, "name": "name", "background": "background", "apply_racial": "apply_racial",
+           "subrace": "subrace", "gender": "gender", "racial_choices": "racial_choices",
+           "name_mode": "name_mode"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    name TEXT NOT NULL,
+    race TEXT NOT NULL,
+    class TEXT NOT NULL,
+    background TEXT NOT NULL,
+    alignment TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    apply_racial INTEGER NOT NULL,
+    scores BLOB NOT NULL,
+    asis_spent INTEGER NOT NULL DEFAULT 0,
+    backstory TEXT,
+    seed INTEGER,
+    subrace TEXT,
+    owner TEXT,
+    gender TEXT,
+    racial_choices TEXT,
+    name_mode TEXT
+);
+CREATE INDEX IF NOT EXISTS characters_race ON characters (race, id);
+CREATE INDEX IF NOT EXISTS characters_class ON characters (class, id);
+CREATE INDEX IF NOT EXISTS characters_level ON characters (level, id);
+CREATE INDEX IF NOT EXISTS characters_alignment ON characters (alignment, id);
+"""
+_LATER_INDEXES = """
+CREATE INDEX IF NOT EXISTS characters_seed ON characters (seed);
+CREATE INDEX IF NOT EXISTS characters_owner ON characters (owner, id);
+"""
+_COLUMNS = ("created, name, race, class, background, alignment, level, apply_racial, scores, "
+            "asis_spent, backstory, seed, subrace, owner, gender, racial_choices, name_mode")
+_INSERT = f"INSERT INTO characters ({_COLUMNS}) VALUES ({', '.join('?' * 17)})"
+_SUMMARY = ("id", "name", "race", "class", "level", "alignment", "created")
+
+def racial_choices_key(choices):
+    """The stored form of racial ability picks such as a Half-Elf's: sorted, or None."""
+    return ",".join(sorted(choices)) if choices else None
+
+def _row(char, asis_spent=0, created=None, owner=None, gender=None, racial_choices=None,
+         name_mode=None):
+    return (time.time() if created is None else created, char.name, char.race, char.char_class,
+            char.background, char.alignment, char.level, int(char.apply_racial),
+            char.packed_scores, asis_spent, char.backstory, char.seed, char.subrace, owner,
+            gender, racial_choices_key(racial_choices), name_mode)
+
+class CharacterStore:
+    """Characters saved to the SQLite database at `path`.
+
+    One connection writes and another reads, each behind its own lock, so
+    the object can be shared between threads (Streamlit sessions). Counts
+    are cached per filter until this store next writes.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = str(path)
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._counts = {}       # (where, params) -> COUNT(*), cleared on every write
+        self._version = 0       # bumped on every write
+        self._db = self._connect()
+        with self._db:
+            self._db.executescript(_SCHEMA)
+            # Stores made before characters carried seeds, subraces, owners or inputs
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(characters)")}
+            for column, kind in (("seed", "INTEGER"), ("subrace", "TEXT"), ("owner", "TEXT"),
+                                 ("gender", "TEXT"), ("racial_choices", "TEXT"),
+                                 ("name_mode", "TEXT")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE characters ADD COLUMN {column} {kind}")
+            self._db.executescript(_LATER_INDEXES)
+        # An in-memory database exists only on its own connection
+        self._reader = self._db if self.path == ":memory:" else self._connect()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def close(self):
+        if self._reader is not self._db:
+            self._reader.close()
+        self._db.close()
+
+    # ---------- Writing ----------
+    def _changed(self):
+        """Forget cached counts once a write has committed."""
+        self._version += 1
+        self._counts.clear()
+
+    def add(self, char, asis_spent=0, owner=None, gender=None, racial_choices=None,
+            name_mode=None):
+        """Insert one `Character`, saved for `owner`; returns its id.
+
+        `gender`, `racial_choices` (e.g. a Half-Elf's two +1 abilities) and
+        `name_mode` are the inputs it was made with, for `find_seed`.
+        """
+        with self._write_lock:
+            with self._db:
+                cur = self._db.execute(_INSERT, _row(char, asis_spent, owner=owner, gender=gender,
+                                                     racial_choices=racial_choices,
+                                                     name_mode=name_mode))
+            self._changed()
+        return cur.lastrowid
+
+    def add_many(self, characters, batch=INSERT_BATCH, owner=None):
+        """Insert an iterable of Characters `batch` rows per transaction; returns the count.
+
+        The iterable is consumed lazily, so a generator of millions of
+        characters is stored in constant memory.
+        """
+        characters = iter(characters)
+        total = 0
+        while rows := [_row(c, owner=owner) for c in islice(characters, batch)]:
+            with self._write_lock:
+                with self._db:
+                    self._db.executemany(_INSERT, rows)
+                self._changed()
+            total += len(rows)
+        return total
+
+    def update(self, char_id, char, asis_spent=0):
+        """Overwrite a stored character (after ASIs or a finished backstory)."""
+        with self._write_lock:
+            with self._db:
+                self._db.execute(
+                    "UPDATE characters SET name = ?, level = ?, scores = ?, asis_spent = ?, "
+                    "backstory = ? WHERE id = ?",
+                    (char.name, char.level, char.packed_scores, asis_spent, char.backstory,
+                     char_id))
+            self._changed()     # the level may have changed
+
+    def delete(self, char_id):
+        with self._write_lock:
+            with self._db:
+                self._db.execute("DELETE FROM characters WHERE id = ?", (char_id,))
+            self._changed()
+
+    # ---------- Reading ----------
+    @staticmethod
+    def _where(filters, before=None):
+        clauses, params = [], []
+        for key, value in filters.items():
+            if key not in FILTERS:
+                raise TypeError(f"unknown filter {key!r} (expected one of {', '.join(FILTERS)})")
+            if value is not None:
+                clauses.append(f"{FILTERS[key]} = ?")
+                params.append(value)
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def get(self, char_id):
+        """Return ``(Character, asis_spent)`` for `char_id`, or None."""
+        row = self._load("id = ?", (char_id,))
+        return row and row[1:]
+
+    def find_seed(self, seed, **match):
+        """The newest stored ``(id, Character, asis_spent)`` made from `seed`, or None.
+
+        `match` narrows it to characters with these attribute values (e.g.
+        ``race="Elf"``, ``gender="Female"``), since the same seed with other
+        options is another character. A character whose backstory never
+        finished streaming is not a match.
+        """
+        if "racial_choices" in match:
+            match["racial_choices"] = racial_choices_key(match["racial_choices"])
+        # IS rather than =, so that subrace=None matches a NULL column
+        where = (["seed = ?", "backstory IS NOT NULL"]
+                 + [f"{_FIELDS[key]} IS ?" for key in match])
+        return self._load(" AND ".join(where) + " ORDER BY id DESC LIMIT 1",
+                          (seed, *match.values()))
+
+    def _load(self, where, params):
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT id, name, race, class, background, alignment, level, scores, backstory, "
+                f"apply_racial, seed, subrace, asis_spent FROM characters WHERE {where}",
+                params).fetchone()
+        if row is None:
+            return None
+        char_id, *fields, spent = row
+        return char_id, Character.from_packed(*fields), spent
+
+    def page(self, before=None, limit=50, **filters):
+        """One page of summaries, newest first, and the cursor for the next page.
+
+        `filters` are exact matches on ``race``, ``char_class``, ``level``,
+        ``alignment`` and ``owner`` (None means any). Each summary is a dict with ``id``,
+        ``name``, ``race``, ``class``, ``level``, ``alignment`` and
+        ``created``. Pass the returned cursor as `before` to continue; it is
+        None on the last page.
+        """
+        where, params = self._where(filters, before)
+        with self._read_lock:
+            rows = self._reader.execute(
+                f"SELECT {', '.join(_SUMMARY)} FROM characters{where} ORDER BY id DESC LIMIT ?",
+                (*params, limit + 1)).fetchall()
+        cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [dict(zip(_SUMMARY, row)) for row in rows[:limit]], cursor
+
+    def count(self, **filters):
+        """Rows matching `filters` (as in `page`), cached until the next write."""
+        where, params = self._where(filters)
+        key = (where, tuple(params))
+        count = self._counts.get(key)
+        if count is None:
+            version = self._version
+            with self._read_lock:
+                count = self._reader.execute(f"SELECT COUNT(*) FROM characters{where}",
+                                             params).fetchone()[0]
+            if version == self._version:    # no write raced the count
+                self._counts[key] = count
+        return count
+
+    def __len__(self):
+        return self.count()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_character_store(path=None):
+    """Return the process-wide store, opening it on first use.
+
+    The database is `path`, else ``DND_STORE_PATH``, else ``dnd_characters.db``
+    in the working directory; only the first call decides.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CharacterStore(path or os.getenv("DND_STORE_PATH") or DEFAULT_PATH)
+    return _store
+
+def set_character_store(store):
+    """Replace the process-wide store."""
+    global _store
+    with _store_lock:
+        _store = store
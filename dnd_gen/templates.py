@@ -0,0 +1,199 @@
+"""Backstory templates reused across characters that differ only in name and pronouns.
+
+In reuse mode a generated backstory is stored as a *template*: the name is
+swapped for `NAME_SLOT`/`FIRST_NAME_SLOT` and the character's own pronouns
+for ``{subj}``, ``{obj}`` and ``{poss}`` slots (``{Subj}`` and so on at the
+start of a sentence), the keys of a ``PRONOUNS`` entry. Templates are
+indexed by race, class, background and alignment, and `personalize` fills
+one in for a new character without a completion.
+
+He/him and she/her stories are interchangeable. They/them stories are
+reused only for they/them, since their verbs agree differently ("they
+were", "he was"). A she/her story's "her" is read as the object when the
+next word is a preposition, article or the like and as the possessive
+otherwise; stories with an independent "his" or "hers" are not kept as
+templates, because the slots cannot tell it apart.
+"""
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .cache import fill_name, strip_name
+from .metrics import BACKSTORY_TEMPLATES
+
+PRONOUN_SLOTS = ("subj", "obj", "poss")
+
+# Words after which "her" is the object ("taught her to", "gave her a")
+_OBJECT_CUES = frozenset("""
+    a an the to and or but nor as at by for from in into of off on onto out over with without
+    about above across against along among around behind below beneath beside between beyond
+    during except inside like near past since through throughout toward towards under upon
+    within up down away back again when while until before after that this these those so if
+    than too ever once all alone everything nothing something anything
+""".split())
+_FORMS = {
+    "he": {"he": "subj", "him": "obj", "his": "poss", "himself": "obj"},
+    "she": {"she": "subj", "her": None, "herself": "obj"},
+}
+# An independent possessive ("the choice was his") has no slot
+_UNSAFE = {
+    "he": re.compile(r"\bhis\b(?=\s*(?:[^\w\s]|$))", re.IGNORECASE),
+    "she": re.compile(r"\bhers\b", re.IGNORECASE),
+}
+_WORD = re.compile(r"\b(?:he|him|his|himself|she|her|herself)\b", re.IGNORECASE)
+_NEXT_WORD = re.compile(r"\s+([A-Za-z]+)")
+
+def pronoun_group(pronoun):
+    """Pronoun sets whose templates are interchangeable share a group."""
+    subj = pronoun["subj"].lower()
+    if subj in _FORMS:
+        return "he/she"
+    return "/".join(pronoun[slot].lower() for slot in PRONOUN_SLOTS)
+
+def template_key(race, char_class, background, alignment, pronoun):
+    return ("backstory", race, char_class, background, alignment, pronoun_group(pronoun))
+
+def _slot(word, slot):
+    return "{" + (slot.capitalize() if word[0].isupper() else slot) + "}"
+
+def make_template(story, name, pronoun):
+    """`story` with the name and the character's pronouns slotted, or None if unsafe.
+
+    `name` None means the story already uses the name slots.
+    """
+    text = strip_name(story, name) if name else story
+    subj = pronoun["subj"].lower()
+    if subj not in _FORMS:
+        return text
+    if _UNSAFE[subj].search(text):
+        return None
+    forms = _FORMS[subj]
+
+    def swap(match):
+        word = match.group(0)
+        lower = word.lower()
+        if lower not in forms:
+            return word
+        slot = forms[lower]
+        if slot is None:    # "her": object or possessive, by the word after it
+            after = _NEXT_WORD.match(text, match.end())
+            slot = "obj" if after is None or after.group(1).lower() in _OBJECT_CUES else "poss"
+        return _slot(word, slot) + ("self" if lower.endswith("self") else "")
+    return _WORD.sub(swap, text)
+
+def personalize(template, name, pronoun):
+    """Fill `template`'s pronoun slots from `pronoun` and its name slots with `name`.
+
+    With `name` None the name slots are left for later.
+    """
+    for slot in PRONOUN_SLOTS:
+        value = pronoun[slot].lower()
+        template = (template.replace("{" + slot + "}", value)
+                    .replace("{" + slot.capitalize() + "}", value.capitalize()))
+    return fill_name(template, name) if name else template
+
+class TemplateBank:
+    """Backstory templates per attribute key, reused instead of fresh completions.
+
+    `reuse` is the fraction of draws answered from a stored template (0
+    turns reuse mode off). The rest, and every draw for a key with no live
+    template, return None and the caller writes a fresh story and `add`s
+    it, so each key keeps gaining new variants. Freshness: a template
+    retires after `max_uses` reuses (None for no limit) or `ttl` seconds,
+    and each key keeps its newest `size`. Draws pick the least-used live
+    template.
+    """
+
+    def __init__(self, reuse=0.0, max_uses=25, ttl=7 * 24 * 3600, size=8, max_keys=4096):
+        if not 0 <= reuse <= 1:
+            raise ValueError(f"reuse must be between 0 and 1, got {reuse!r}")
+        self.reuse = reuse
+        self.max_uses = max_uses
+        self.ttl = ttl
+        self.size = size
+        self.max_keys = max_keys
+        self.reused = 0
+        self.fresh = 0
+        self._bank = OrderedDict()   # key -> [[created, uses, template], ...]
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        now = time.time()
+        entries = [e for e in self._bank.get(key, ())
+                   if now - e[0] < self.ttl and (self.max_uses is None or e[1] < self.max_uses)]
+        if entries:
+            self._bank[key] = entries
+            self._bank.move_to_end(key)
+        else:
+            self._bank.pop(key, None)
+        return entries
+
+    def draw(self, key):
+        """A template to personalize for `key`, or None to write a fresh story."""
+        if not self.reuse:
+            return None
+        with self._lock:
+            entries = self._live(key)
+            if not entries or random.random() >= self.reuse:
+                self.fresh += 1
+                BACKSTORY_TEMPLATES.inc(outcome="fresh")
+                return None
+            fewest = min(e[1] for e in entries)
+            entry = random.choice([e for e in entries if e[1] == fewest])
+            entry[1] += 1
+            self.reused += 1
+        BACKSTORY_TEMPLATES.inc(outcome="reused")
+        return entry[2]
+
+    def add(self, key, template):
+        if not self.reuse or template is None:
+            return
+        with self._lock:
+            entries = self._live(key)
+            entries.append([time.time(), 0, template])
+            self._bank[key] = entries[-self.size:]
+            self._bank.move_to_end(key)
+            while len(self._bank) > self.max_keys:
+                self._bank.popitem(last=False)
+
+    def stats(self):
+        total = self.reused + self.fresh
+        return {
+            "reused": self.reused,
+            "fresh": self.fresh,
+            "reuse_rate": self.reused / total if total else 0.0,
+            "keys": len(self._bank),
+            "templates": sum(len(entries) for entries in self._bank.values()),
+        }
+
+_bank = None
+_bank_lock = threading.Lock()
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+def get_template_bank():
+    """Return the process-wide bank, creating it on first use.
+
+    ``DND_AI_REUSE`` sets the reuse ratio (off by default), and
+    ``DND_AI_REUSE_MAX_USES`` and ``DND_AI_REUSE_TTL`` (seconds) the
+    freshness policy.
+    """
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = TemplateBank(reuse=_env_float("DND_AI_REUSE", 0.0),
+                                     max_uses=int(_env_float("DND_AI_REUSE_MAX_USES", 25)),
+                                     ttl=_env_float("DND_AI_REUSE_TTL", 7 * 24 * 3600))
+    return _bank
+
+def set_template_bank(bank):
+    """Replace the process-wide bank (``TemplateBank(reuse=0)`` turns reuse mode off)."""
+    global _bank
+    with _bank_lock:
+        _bank = bank
@@ -1,11 +1,33 @@
 import os
-import random
-import streamlit as st
-from openai import OpenAI
-
-
+import time
+import uuid
 import streamlit as st
 
+from dnd_gen import ai, metrics
+from dnd_gen.ai import BackstoryInterrupted, generate_many, generate_race_name_ai, stream_backstory
+from dnd_gen.asiplan import plan_asis
+from dnd_gen.cache import get_response_cache
+from dnd_gen.character import ASIError, Character
+from dnd_gen.pointbuy import optimize_point_buy
+from dnd_gen.probability import array_percentile
+from dnd_gen.progression import Progression
+from dnd_gen.rules import (
+    ABILITIES, ALIGNMENTS, BACKGROUNDS, CLASS_PRIORITY, CLASS_RECOMMENDATIONS, CLASSES,
+    GENDERS, MAX_LEVEL, POINT_BUY_BUDGET, POINT_COST, PRONOUNS, RACE_CHOICES, RACES, SUBRACES,
+    apply_racial_asi, asi_levels, asi_slots_available, point_buy_spent,
+)
+from dnd_gen.export import FORMATS as EXPORT_FORMATS, export_filename, iter_export
+from dnd_gen.gateway import get_gateway
+from dnd_gen.metrics import ASI_APPLIED, ASI_SECONDS, CHARACTERS, CREATE_SECONDS, RERUN_SECONDS
+from dnd_gen.namepool import get_name_pool
+from dnd_gen.names import random_name
+from dnd_gen.render import SHEET_FORMATS, render
+from dnd_gen.resilience import get_resilience
+from dnd_gen.seeding import new_seed, roll_scores
+from dnd_gen.sheet import iter_characters, sheet_filename
+from dnd_gen.store import get_character_store
+
+script_start = time.perf_counter()
 
 st.markdown("""
 <style>
@@ -23,141 +45,60 @@ header {visibility: hidden;}
 # -----------------------------
 st.set_page_config("🧙 D&D Generator", layout="centered")
 
+def secret(name):
+    """Read `name` from Streamlit secrets, then the environment; a missing secrets file is fine."""
+    try:
+        value = st.secrets.get(name)
+    except FileNotFoundError:
+        value = None
+    return value or os.getenv(name)
+
 # Load API key from Streamlit secrets or environment variable
-OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
-AI_ENABLED = bool(OPENAI_API_KEY)
+OPENAI_API_KEY = secret("OPENAI_API_KEY")
+ai.configure(api_key=OPENAI_API_KEY, base_url=secret("OPENAI_BASE_URL"))
+AI_ENABLED = ai.ai_enabled()
+get_response_cache(secret("DND_CACHE_PATH"))
+STORE = get_character_store(secret("DND_STORE_PATH"))
+
+@st.cache_resource
+def metrics_exporter(port, json_path):
+    """Start the /metrics endpoint and/or the JSON dump once per server process."""
+    if port:
+        metrics.serve(int(port))
+    if json_path:
+        metrics.dump_json_every(json_path)
+    return True
+
+if secret("DND_METRICS_PORT") or secret("DND_METRICS_JSON"):
+    metrics_exporter(secret("DND_METRICS_PORT"), secret("DND_METRICS_JSON"))
+
+@st.cache_resource
+def rule_tables():
+    """Static lookups derived from the rules, built once per server process."""
+    return {
+        "asi_schedule": {cls: list(asi_levels(cls)) for cls in CLASSES},
+        "class_priority": dict(CLASS_PRIORITY),
+        "class_recommendations": dict(CLASS_RECOMMENDATIONS),
+        "second_options": {a: ["—"] + [b for b in ABILITIES if b != a] for a in ABILITIES},
+        "half_elf_choices": list(RACE_CHOICES["Half-Elf"].options),
+        "subraces": {race: ["—"] + subs for race, subs in SUBRACES.items()},
+    }
 
-client = OpenAI(api_key=OPENAI_API_KEY) if AI_ENABLED else None
+TABLES = rule_tables()
 
 # ----------------- Streamlit session state -----------------
 if "sheet" not in st.session_state:
-    st.session_state.sheet = {}        # full character sheet lives here
+    st.session_state.sheet = None      # the current Character lives here
 if "asi_spent" not in st.session_state:
     st.session_state.asi_spent = 0     # ASIs the user has already applied
-
-# -----------------------------
-# Constants & helpers
-# -----------------------------
-ABILITIES = ["Strength", "Dexterity", "Constitution", "Intelligence", "Wisdom", "Charisma"]
-# ---------- Ability‑Score‑Improvement (ASI) tables ----------
-ASI_LEVELS = {
-    "default": [4, 8, 12, 16, 19],
-    "Fighter": [4, 6, 8, 12, 14, 16, 19],
-    "Rogue":   [4, 8, 10, 12, 16, 19],
-}
-
-def asi_slots_available(cls: str, lvl: int) -> int:
-    """Return how many ASI opportunities `cls` has earned up to `lvl`."""
-    tbl = ASI_LEVELS.get(cls, ASI_LEVELS["default"])
-    return sum(1 for x in tbl if x <= lvl)
-
-# PHB-style racial ASIs (simplified, no subraces)
-RACE_ASI = {
-    "Dragonborn": {"Strength": 2, "Charisma": 1},
-    "Dwarf": {"Constitution": 2},
-    "Elf": {"Dexterity": 2},
-    "Gnome": {"Intelligence": 2},
-    "Half-Elf": {"Charisma": 2},  # +1 to two other abilities handled separately
-    "Half-Orc": {"Strength": 2, "Constitution": 1},
-    "Halfling": {"Dexterity": 2},
-    "Human": "ALL_PLUS_ONE",       # +1 to every ability
-    "Tiefling": {"Charisma": 2, "Intelligence": 1},
-}
-
-def apply_racial_asi(stats, race, half_elf_extras=None):
-    """Return a *new* dict with PHB racial ASIs applied."""
-    out = stats.copy()
-    bonus = RACE_ASI.get(race)
-
-    if bonus is None:
-        return out
-
-    if bonus == "ALL_PLUS_ONE":
-        for a in ABILITIES:
-            out[a] += 1
-        return out
-
-    # fixed bonuses first
-    for k, v in bonus.items():
-        out[k] = out.get(k, 0) + v
-
-    # Half-Elf: +2 CHA already in mapping, add +1 to two others
-    if race == "Half-Elf":
-        if not half_elf_extras or len(half_elf_extras) != 2:
-            half_elf_extras = ["Dexterity", "Constitution"]  # sensible default
-        # Enforce exactly 2 choices
-        half_elf_extras = half_elf_extras[:2]
-        for a in half_elf_extras:
-            out[a] = out.get(a, 0) + 1
-
-    return out
-
-def generate_name():
-    first_names = ["Arin", "Belra", "Cedric", "Dora", "Elryn", "Faelar", "Gorin", "Hilda", "Isen", "Jora"]
-    last_names = ["Stoneheart", "Ravenshadow", "Ironfist", "Moonwhisper", "Stormblade", "Duskbane", "Lightbringer"]
-    return f"{random.choice(first_names)} {random.choice(last_names)}"
-
-def roll_stat():
-    rolls = sorted([random.randint(1, 6) for _ in range(4)], reverse=True)
-    return sum(rolls[:3])
-
-def generate_race_name_ai(race, char_class, gender):
-    # Fallback if no key
-    if not AI_ENABLED:
-        return generate_name()
-
-    race_styles = {
-        "Dragonborn": "powerful, draconic names, often harsh and guttural",
-        "Dwarf": "gritty, earthy Dwarven names that sound sturdy and traditional",
-        "Elf": "elegant, melodic Elvish names with lyrical qualities",
-        "Gnome": "quirky, playful names with a touch of cleverness or whimsy",
-        "Half-Elf": "a blend of Elvish elegance and Human familiarity",
-        "Half-Orc": "rough, strong-sounding names with Orcish grit and Human influence",
-        "Halfling": "cheerful, simple names with a rural, friendly tone",
-        "Human": "classic medieval fantasy names with cultural variety",
-        "Tiefling": "mysterious, dark names, often with infernal or celestial flair"
-    }
-    style = race_styles.get(race, "fantasy names")
-    prompt = (
-        f"Generate a unique first and last name for a {gender.lower()} {race} {char_class} "
-        f"in D&D. Use {style}. Only return the name."
-    )
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=1.0,
-            max_tokens=20,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"(AI Name Error: {e})"
-
-def generate_backstory(name, race, char_class, background, alignment, pronoun):
-    # Fallback if no key
-    if not AI_ENABLED:
-        return (
-            f"{name} is a {alignment.lower()} {race} {char_class} who grew up as a "
-            f"{background.lower()}. {pronoun['subj']} seeks adventure to prove "
-            f"{pronoun['poss']} worth to the world."
-        )
-
-    prompt = (
-        f"Write a short D&D backstory for this character:\n"
-        f"Name: {name}\nRace: {race}\nClass: {char_class}\n"
-        f"Background: {background}\nAlignment: {alignment}\n"
-        f"Pronouns: {pronoun['subj']}/{pronoun['obj']}/{pronoun['poss']}"
-    )
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.8,
-            max_tokens=300,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"(Backstory Error: {e})"
+if "ai_session" not in st.session_state:
+    st.session_state.ai_session = uuid.uuid4().hex   # token budget is charged per session
+if "sheet_id" not in st.session_state:
+    st.session_state.sheet_id = None   # row of the current Character in the store
+if "owner" not in st.session_state:
+    # "My Characters" lists this owner's rows only; the token rides in the URL so a reload keeps it
+    st.session_state.owner = st.query_params.get("owner") or uuid.uuid4().hex
+    st.query_params["owner"] = st.session_state.owner
 
 
 # -----------------------------
@@ -167,16 +108,17 @@ st.title("🧙 D&D Character Generator")
 
 if not AI_ENABLED:
     st.info("⚠️ No OPENAI_API_KEY found. AI name & backstory will use simple fallbacks.")
-
-races = ["Dragonborn", "Dwarf", "Elf", "Gnome", "Half-Elf", "Half-Orc", "Halfling", "Human", "Tiefling"]
-classes = ["Barbarian", "Bard", "Cleric", "Druid", "Fighter", "Monk", "Paladin", "Ranger", "Rogue",
-           "Sorcerer", "Warlock", "Wizard", "Artificer", "Blood Hunter"]
-backgrounds = ["Acolyte", "Charlatan", "Criminal", "Entertainer", "Folk Hero",
-               "Guild Artisan", "Hermit", "Noble", "Outlander", "Sage",
-               "Sailor", "Soldier", "Urchin"]
-alignments = ["Lawful Good", "Neutral Good", "Chaotic Good",
-              "Lawful Neutral", "True Neutral", "Chaotic Neutral",
-              "Lawful Evil", "Neutral Evil", "Chaotic Evil"]
+else:
+    cache_stats = get_response_cache().stats()
+    st.sidebar.caption(
+        f"🗄️ AI cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate)"
+    )
+    tokens_left = get_gateway().remaining(st.session_state.ai_session)
+    if tokens_left is not None:
+        st.sidebar.caption(f"🪙 AI tokens left this session: {tokens_left:,}")
+    if get_resilience().breaker.state != "closed":
+        st.sidebar.warning("⚡ The AI provider is failing; names and backstories use offline text for now.")
 
 # Radio labels (constants so string compares never break)
 ROLL     = "🎲 Roll randomly"
@@ -190,26 +132,24 @@ POINTBUY = "🎯 Interactive Point Buy"
 level = st.slider("📈 Choose Character Level", 1, 20, 1)
 
 # Show ASI availability for selected class and level
-selected_class = st.selectbox("🛡️ Pick Class", classes)
+selected_class = st.selectbox("🛡️ Pick Class", CLASSES)
 asi_available = asi_slots_available(selected_class, level)
 if asi_available > 0:
     st.info(f"📈 At level {level}, your {selected_class} will have **{asi_available}** Ability Score Improvement(s) available.")
 else:
     st.info(f"📈 At level {level}, your {selected_class} has no ASIs yet (first ASI typically at level 4).")
 
-genders = ["Male", "Female", "Non-binary"]
-pronouns_map = {
-    "Male": {"subj": "He", "obj": "him", "poss": "his"},
-    "Female": {"subj": "She", "obj": "her", "poss": "her"},
-    "Non-binary": {"subj": "They", "obj": "them", "poss": "their"},
-}
-
-race = st.selectbox("🧬 Pick Race", races)
+race = st.selectbox("🧬 Pick Race", RACES)
+subrace = None
+if SUBRACES[race]:
+    subrace = st.selectbox("🌿 Pick Subrace", TABLES["subraces"][race], key=f"subrace_{race}",
+                           help="Adds the subrace's PHB bonuses on top of the race's.")
+    subrace = None if subrace == "—" else subrace
 char_class = selected_class  # Use the class we already selected above
-background = st.selectbox("📜 Pick Background", backgrounds)
-alignment = st.selectbox("⚖️ Pick Alignment", alignments)
-gender = st.radio("🧑‍🤝‍🧑 Pick Gender", genders)
-pronoun = pronouns_map[gender]
+background = st.selectbox("📜 Pick Background", BACKGROUNDS)
+alignment = st.selectbox("⚖️ Pick Alignment", ALIGNMENTS)
+gender = st.radio("🧑‍🤝‍🧑 Pick Gender", GENDERS)
+pronoun = PRONOUNS[gender]
 
 # ---- Racial ASIs toggle ----
 apply_racial = st.checkbox(
@@ -223,8 +163,7 @@ if apply_racial and race == "Half-Elf":
     st.caption("Half-Elf gets +2 CHA and +1 to two other abilities of your choice.")
     half_elf_extras = st.multiselect(
         "Pick two abilities for your Half-Elf +1 bonuses",
-        [a for a in ABILITIES if a != "Charisma"],  # Exclude Charisma since it already gets +2
-        default=[],
+        TABLES["half_elf_choices"],  # Excludes Charisma since it already gets +2
         max_selections=2,  # Enforce maximum of 2 selections
         key="half_elf_extra_asis"
     )
@@ -235,12 +174,28 @@ stat_input_method = st.radio(
     help="🎲 Random rolls: chance-based.\n✍️ Manual: full control.\n🎚️ Sliders: visual adjustment.\n🎯 Interactive Point Buy: real-time point allocation with 27 points."
 )
 
-name_option = st.radio("🔮 Choose Name", ["Random from list", "AI-generated", "Enter manually"])
+name_option = st.radio("🔮 Choose Name", ["Random (offline)", "AI-generated", "Enter manually"], key="name_option")
+if AI_ENABLED and name_option == "AI-generated":
+    # Fill this race/class/gender's name pool while the user is still choosing
+    get_name_pool().warm(race, char_class, gender)
+
+stream_story = AI_ENABLED and st.checkbox(
+    "⚡ Stream backstory as it is written",
+    value=True,
+    help="Show the backstory word by word instead of waiting for the full text.",
+    key="stream_story"
+)
 
 manual_name = ""
 if name_option == "Enter manually":
     manual_name = st.text_input("Enter character name", placeholder="Your character's name")
 
+seed_text = st.text_input(
+    "🌱 Seed", placeholder="Leave blank for a new character", key="seed",
+    help="The same seed and choices give the same rolls and offline name. "
+         "A seed saved in My Characters is reloaded as is, AI text included."
+)
+
 # Render manual/sliders widgets NOW so they are visible pre-button
 manual_or_slider_values = {}
 if stat_input_method == MANUAL:
@@ -256,120 +211,122 @@ elif stat_input_method == SLIDERS:
             f"{stat}", min_value=1, max_value=20, value=10, key=f"slider_{stat}"
         )
 elif stat_input_method == POINTBUY:
-    st.markdown("### 🤖 Interactive Point Buy System")
-    st.write("**Point Buy Rules:** Start with 8 in each ability. You have 27 points to spend.")
-    
-    # Initialize point buy values in session state if not exists
-    if 'pointbuy_values' not in st.session_state:
-        st.session_state.pointbuy_values = {stat: 8 for stat in ABILITIES}
-    
-    point_cost = {8: 0, 9: 1, 10: 2, 11: 3, 12: 4, 13: 5, 14: 7, 15: 9}
-    reverse_cost = {v: k for k, v in point_cost.items()}  # For finding valid values
-    total_points = 27
-    
-    # Create sliders for each ability
-    col1, col2 = st.columns(2)
-    abilities_left = ABILITIES[:3]
-    abilities_right = ABILITIES[3:]
-    
-    with col1:
-        for stat in abilities_left:
-            st.session_state.pointbuy_values[stat] = st.slider(
-                f"{stat}", 
-                min_value=8, 
-                max_value=15, 
-                value=st.session_state.pointbuy_values[stat],
-                key=f"pointbuy_{stat}",
-                help=f"Cost: {point_cost[st.session_state.pointbuy_values[stat]]} points"
-            )
-    
-    with col2:
-        for stat in abilities_right:
-            st.session_state.pointbuy_values[stat] = st.slider(
-                f"{stat}", 
-                min_value=8, 
-                max_value=15, 
-                value=st.session_state.pointbuy_values[stat],
-                key=f"pointbuy_{stat}",
-                help=f"Cost: {point_cost[st.session_state.pointbuy_values[stat]]} points"
-            )
-    
-    # Calculate and display points
-    spent_points = sum(point_cost[val] for val in st.session_state.pointbuy_values.values())
-    remaining_points = total_points - spent_points
-    
-    # Display point status
-    if remaining_points > 0:
-        st.success(f"✅ **Points Spent:** {spent_points}/27 | **Remaining:** {remaining_points}")
-    elif remaining_points == 0:
-        st.success(f"✅ **Perfect!** All 27 points spent: {spent_points}/27")
-    else:
-        st.error(f"❌ **Over Budget!** You've spent {spent_points}/27 points (over by {abs(remaining_points)})")
-    
-    # Show cost breakdown
-    with st.expander("📊 Point Cost Breakdown"):
+    @st.fragment
+    def point_buy_panel(char_class, race, subrace, apply_racial, half_elf_extras):
+        """Point-buy sliders and budget; moving a slider reruns only this panel."""
+        st.markdown("### 🤖 Interactive Point Buy System")
+        st.write("**Point Buy Rules:** Start with 8 in each ability. You have 27 points to spend.")
+
+        # Initialize point buy values in session state if not exists
+        if 'pointbuy_values' not in st.session_state:
+            st.session_state.pointbuy_values = {stat: 8 for stat in ABILITIES}
         for stat in ABILITIES:
-            cost = point_cost[st.session_state.pointbuy_values[stat]]
-            st.write(f"**{stat}:** {st.session_state.pointbuy_values[stat]} (costs {cost} points)")
-    
-    # Class recommendations
-    class_priority = {
-        "Barbarian": ["Strength", "Constitution"],
-        "Bard": ["Charisma", "Dexterity"],
-        "Cleric": ["Wisdom", "Constitution"],
-        "Druid": ["Wisdom", "Intelligence"],
-        "Fighter": ["Strength", "Dexterity"],
-        "Monk": ["Dexterity", "Wisdom"],
-        "Paladin": ["Charisma", "Strength"],
-        "Ranger": ["Dexterity", "Wisdom"],
-        "Rogue": ["Dexterity", "Intelligence"],
-        "Sorcerer": ["Charisma", "Constitution"],
-        "Warlock": ["Charisma", "Wisdom"],
-        "Wizard": ["Intelligence", "Dexterity"],
-        "Artificer": ["Intelligence", "Constitution"],
-        "Blood Hunter": ["Strength", "Intelligence"],
-    }
-    
-    if char_class in class_priority:
-        recommended = class_priority[char_class]
-        st.info(f"💡 **{char_class} Recommendation:** Prioritize {' and '.join(recommended)}")
-    
-    # Auto-optimize button
-    if st.button("🎯 Auto-Optimize for Class"):
-        priorities = class_priority.get(char_class, [])
-        new_values = {s: 8 for s in ABILITIES}
-        allocated = 0
-        
-        # Set priority stats to 15
-        for stat in priorities:
-            if allocated + point_cost[15] <= total_points:
-                new_values[stat] = 15
-                allocated += point_cost[15]
-        
-        # Distribute remaining points to other stats
-        remaining_abilities = [s for s in ABILITIES if s not in priorities]
-        for stat in remaining_abilities:
-            cost_to_10 = point_cost[10] - point_cost[new_values[stat]]
-            if allocated + cost_to_10 <= total_points:
-                new_values[stat] = 10
-                allocated += cost_to_10
-        
-        st.session_state.pointbuy_values = new_values
-        st.rerun()
+            st.session_state.setdefault(f"pointbuy_{stat}", st.session_state.pointbuy_values[stat])
+
+        # Create sliders for each ability
+        col1, col2 = st.columns(2)
+        abilities_left = ABILITIES[:3]
+        abilities_right = ABILITIES[3:]
+
+        with col1:
+            for stat in abilities_left:
+                st.session_state.pointbuy_values[stat] = st.slider(
+                    f"{stat}", 
+                    min_value=8, 
+                    max_value=15, 
+                    key=f"pointbuy_{stat}",
+                    help=f"Cost: {POINT_COST[st.session_state.pointbuy_values[stat]]} points"
+                )
+
+        with col2:
+            for stat in abilities_right:
+                st.session_state.pointbuy_values[stat] = st.slider(
+                    f"{stat}", 
+                    min_value=8, 
+                    max_value=15, 
+                    key=f"pointbuy_{stat}",
+                    help=f"Cost: {POINT_COST[st.session_state.pointbuy_values[stat]]} points"
+                )
+
+        # Calculate and display points
+        spent_points = point_buy_spent(st.session_state.pointbuy_values)
+        remaining_points = POINT_BUY_BUDGET - spent_points
+
+        # Display point status
+        if remaining_points > 0:
+            st.success(f"✅ **Points Spent:** {spent_points}/27 | **Remaining:** {remaining_points}")
+        elif remaining_points == 0:
+            st.success(f"✅ **Perfect!** All 27 points spent: {spent_points}/27")
+        else:
+            st.error(f"❌ **Over Budget!** You've spent {spent_points}/27 points (over by {abs(remaining_points)})")
+
+        # Show cost breakdown
+        with st.expander("📊 Point Cost Breakdown"):
+            for stat in ABILITIES:
+                cost = POINT_COST[st.session_state.pointbuy_values[stat]]
+                st.write(f"**{stat}:** {st.session_state.pointbuy_values[stat]} (costs {cost} points)")
+
+        # Class recommendations
+        if char_class in TABLES["class_priority"]:
+            recommended = TABLES["class_priority"][char_class]
+            st.info(f"💡 **{char_class} Recommendation:** Prioritize {' and '.join(recommended)}")
+
+        # Auto-optimize button: exact best spread for the class, after racial bonuses
+        def auto_optimize():
+            stats, extras = optimize_point_buy(
+                char_class, race if apply_racial else None, half_elf_extras or None,
+                subrace if apply_racial else None
+            )
+            st.session_state.pointbuy_values = stats
+            for stat, val in stats.items():
+                st.session_state[f"pointbuy_{stat}"] = val
+            if extras and extras != half_elf_extras:
+                st.session_state.half_elf_extra_asis = extras
+                st.session_state.pointbuy_full_rerun = True
+
+        st.button(
+            "🎯 Auto-Optimize for Class",
+            on_click=auto_optimize,
+            help="Picks the best full 27-point spread for your class, counting racial bonuses."
+        )
+
+        # The Half-Elf picks live outside this fragment, so redraw the whole page
+        if st.session_state.pop("pointbuy_full_rerun", False):
+            st.rerun()
+
+    point_buy_panel(char_class, race, subrace, apply_racial, half_elf_extras)
 
 # -----------------------------
 # Create Character
 # -----------------------------
-if st.button("🎲 Create Character"):
+if st.button("🎲 Create Character", key="create_character"):
+    create_start = time.perf_counter()
     # Reset ASI tracking when creating new character
     st.session_state.asi_spent = 0
+
+    try:
+        seed = int(seed_text) if seed_text.strip() else new_seed()
+    except ValueError:
+        st.error("❌ The seed must be a whole number.")
+        st.stop()
+
+    # A seed already in the store with the same choices needs no generation at all
+    stored = None
+    if seed_text.strip() and stat_input_method == ROLL and name_option != "Enter manually":
+        stored = STORE.find_seed(seed, race=race, subrace=subrace, char_class=char_class,
+                                 background=background, alignment=alignment, level=level,
+                                 apply_racial=int(apply_racial), gender=gender,
+                                 racial_choices=half_elf_extras, name_mode=name_option,
+                                 owner=st.session_state.owner)
+    if stored is not None:
+        st.session_state.sheet_id, st.session_state.sheet, st.session_state.asi_spent = stored
+        st.rerun()
     
     # -------- Ability scores (base) --------
     stats = {}
 
     if stat_input_method == ROLL:
-        for stat in ABILITIES:
-            stats[stat] = roll_stat()
+        stats = dict(zip(ABILITIES, roll_scores([seed])[0].tolist()))
 
     elif stat_input_method == MANUAL:
         stats = manual_or_slider_values.copy()
@@ -382,8 +339,7 @@ if st.button("🎲 Create Character"):
         stats = st.session_state.pointbuy_values.copy()
         
         # Validate point buy is within budget
-        point_cost = {8: 0, 9: 1, 10: 2, 11: 3, 12: 4, 13: 5, 14: 7, 15: 9}
-        spent_points = sum(point_cost[val] for val in stats.values())
+        spent_points = point_buy_spent(stats)
         if spent_points > 27:
             st.error(f"❌ Point buy exceeds 27 points ({spent_points}). Please adjust your scores.")
             st.stop()
@@ -403,63 +359,127 @@ if st.button("🎲 Create Character"):
     base_stats = stats.copy()
 
     # Apply racial ASIs
-    final_stats = apply_racial_asi(base_stats, race, half_elf_extras) if apply_racial else base_stats
+    final_stats = (apply_racial_asi(base_stats, race, half_elf_extras, subrace) if apply_racial
+                   else base_stats)
 
-    # -------- Name --------
-    if name_option == "Random from list":
-        name = generate_name()
+    # -------- Name & Backstory --------
+    if name_option == "Random (offline)":
+        name = random_name(race, seed)
     elif name_option == "AI-generated":
-        with st.spinner("Summoning name..."):
-            name = generate_race_name_ai(race, char_class, gender)
+        name = None  # generated alongside the backstory
     else:
         name = manual_name if manual_name else "Unnamed Character"
 
-    # -------- Backstory --------
-    with st.spinner("Writing backstory..."):
-        backstory = generate_backstory(name, race, char_class, background, alignment, pronoun)
+    if stream_story:
+        # Only the name blocks here; the backstory streams into its expander below
+        if name is None:
+            with st.spinner("Summoning name..."):
+                name = generate_race_name_ai(race, char_class, gender,
+                                             session=st.session_state.ai_session)
+        backstory = None
+        st.session_state.backstory_pending = {
+            "name": name, "race": race, "char_class": char_class, "background": background,
+            "alignment": alignment, "pronoun": pronoun, "session": st.session_state.ai_session,
+        }
+    else:
+        spinner_text = "Summoning name & writing backstory..." if name is None else "Writing backstory..."
+        with st.spinner(spinner_text):
+            [(name, backstory)] = generate_many([{
+                "name": name, "race": race, "char_class": char_class, "gender": gender,
+                "background": background, "alignment": alignment, "pronoun": pronoun,
+            }], session=st.session_state.ai_session)
 
     # Store character in session state
-    st.session_state.sheet = {
-        "name": name,
-        "race": race,
-        "class": char_class,
-        "background": background,
-        "alignment": alignment,
-        "level": level,
-        "base_stats": base_stats,
-        "final_stats": final_stats.copy(),  # Make a copy to allow modifications
-        "backstory": backstory,
-        "apply_racial": apply_racial
-    }
+    st.session_state.sheet = Character(
+        name, race, char_class, background, alignment, level,
+        base_stats, final_stats, backstory, apply_racial, seed, subrace
+    )
+    st.session_state.sheet_id = STORE.add(st.session_state.sheet, owner=st.session_state.owner,
+                                          gender=gender, racial_choices=half_elf_extras,
+                                          name_mode=name_option)
+    # A streamed backstory is timed separately, as it is written
+    CREATE_SECONDS.observe(time.perf_counter() - create_start, names=name_option)
+    CHARACTERS.inc(names=name_option)
 
 # ================= Character Sheet Display =================
-char = st.session_state.sheet
-if char:
+@st.fragment
+def asi_choice(char):
+    """ASI pickers and preview; changing a picker reruns only this block."""
+    final = char.final_stats
+    st.markdown("#### 🎯 Allocate Your ASI")
+
+    # Show current ability scores for reference
+    st.write("**Current Ability Scores:**")
+    score_display = " | ".join([f"{stat[:3]}: {final[stat]}" for stat in ABILITIES])
+    st.code(score_display)
+
+    # Strategy guidance
+    st.markdown("**💡 ASI Strategy Tips:**")
+
+    if char.char_class in TABLES["class_recommendations"]:
+        st.info(f"**{char.char_class} Recommendation:** {TABLES['class_recommendations'][char.char_class]}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.selectbox(
+            "🎯 Primary ability to improve", 
+            ABILITIES, 
+            key="asi_stat1",
+            help="Choose the ability score you want to improve"
+        )
+        st.selectbox(
+            "📊 Improvement amount", 
+            [1, 2], 
+            key="asi_val1",
+            help="Choose +1 or +2. If you choose +2, you cannot improve a second ability."
+        )
+
+    with col2:
+        second_options = TABLES["second_options"][st.session_state.get("asi_stat1", ABILITIES[0])]
+        st.selectbox(
+            "🎯 Second ability (+1 only)", 
+            second_options, 
+            key="asi_stat2",
+            help="Optional: Choose a second ability to get +1 (only if primary gets +1)"
+        )
+
+        # Show preview of changes
+        s1 = st.session_state.get("asi_stat1", ABILITIES[0])
+        v1 = st.session_state.get("asi_val1", 1)
+        s2 = st.session_state.get("asi_stat2", "—")
+
+        st.write("**Preview of changes:**")
+        if s2 != "—" and v1 == 1:
+            st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
+            st.write(f"• {s2}: {final[s2]} → {final[s2] + 1}")
+        elif v1 == 2:
+            st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
+        else:
+            st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
+
+@st.fragment
+def sheet_display(char):
+    """The character sheet; applying an ASI reruns the sheet, not the inputs above it."""
     # -------- Character Header --------
-    st.subheader(f"🧝 {char['name']}")
-    st.write(f"**Level**: {char['level']} | **Race**: {char['race']} | **Class**: {char['class']} | **Background**: {char['background']} | **Alignment**: {char['alignment']}")
+    st.subheader(f"🧝 {char.name}")
+    st.markdown(render(char, "md", "header"))
+    if char.seed is not None:
+        st.caption(f"🌱 Seed: `{char.seed}`")
 
     # -------- Ability Scores --------
     st.markdown("### 💪 Ability Scores")
-    label_base  = "Base ability scores (before lineage bonuses)"
-    label_final = "Final ability scores (after lineage bonuses)"
-    
-    if char.get('apply_racial', True):
-        st.write(f"**{label_base}:**")
-        for stat, val in char['base_stats'].items():
-            st.write(f"{stat}: {val}")
-
-        st.write(f"**{label_final}:**")
-        for stat, val in char['final_stats'].items():
-            st.write(f"{stat}: {val}")
-    else:
-        for stat, val in char['base_stats'].items():
-            st.write(f"{stat}: {val}")
+    # The same compiled table as the Markdown download (Base and Final after lineage bonuses)
+    st.markdown(render(char, "md", "scores"))
+
+    base_total = sum(char.base_stats.values())
+    st.caption(
+        f"🎲 Base total {base_total} beats about {array_percentile(char.base_stats):.0f}% "
+        f"of 4d6-drop-lowest arrays."
+    )
 
     # ================= Level‑up ASI panel =================
-    asi_cap  = asi_slots_available(char["class"], char["level"])
+    asi_cap  = asi_slots_available(char.char_class, char.level)
     unspent  = asi_cap - st.session_state.asi_spent
-    final    = char["final_stats"]
 
     # Show ASI information
     st.markdown("### 📈 Ability Score Improvements (ASIs)")
@@ -480,134 +500,82 @@ if char:
         """)
     
     # Display ASI progression for this class
-    asi_levels = ASI_LEVELS.get(char["class"], ASI_LEVELS["default"])
     asi_info = []
-    for level_threshold in sorted(asi_levels):
-        if level_threshold <= char["level"]:
+    for level_threshold in TABLES["asi_schedule"][char.char_class]:
+        if level_threshold <= char.level:
             asi_info.append(f"**Level {level_threshold}** ✅")
         else:
             asi_info.append(f"Level {level_threshold} ⏳")
     
-    st.write(f"**ASI Schedule for {char['class']}:** {' | '.join(asi_info)}")
+    st.write(f"**ASI Schedule for {char.char_class}:** {' | '.join(asi_info)}")
     
     # Current ASI status
     if asi_cap == 0:
         st.info("🕐 **No ASIs available yet.** Your first ASI will come at level 4.")
     else:
         if unspent > 0:
-            st.success(f"🎯 **You have {unspent} unspent ASI(s)** out of {asi_cap} total available at level {char['level']}.")
+            st.success(f"🎯 **You have {unspent} unspent ASI(s)** out of {asi_cap} total available at level {char.level}.")
         else:
-            st.info(f"✅ **All {asi_cap} ASI(s) have been allocated** for level {char['level']}.")
+            st.info(f"✅ **All {asi_cap} ASI(s) have been allocated** for level {char.level}.")
 
     if unspent > 0:
-        st.markdown("#### 🎯 Allocate Your ASI")
-        
-        # Show current ability scores for reference
-        st.write("**Current Ability Scores:**")
-        score_display = " | ".join([f"{stat[:3]}: {final[stat]}" for stat in ABILITIES])
-        st.code(score_display)
-        
-        # Strategy guidance
-        st.markdown("**💡 ASI Strategy Tips:**")
-        class_recommendations = {
-            "Barbarian": "Prioritize **Strength** (damage) and **Constitution** (survivability).",
-            "Bard": "Focus on **Charisma** (spellcasting) and **Dexterity** (AC/initiative).",
-            "Cleric": "Boost **Wisdom** (spellcasting) and **Constitution** (concentration).",
-            "Druid": "Improve **Wisdom** (spells) and **Constitution** (Wild Shape HP).",
-            "Fighter": "Enhance **Strength/Dexterity** (attacks) and **Constitution** (survivability).",
-            "Monk": "Focus on **Dexterity** (AC/attacks) and **Wisdom** (AC/saves).",
-            "Paladin": "Boost **Strength** (attacks) and **Charisma** (spells/aura).",
-            "Ranger": "Prioritize **Dexterity** (attacks) and **Wisdom** (spells).",
-            "Rogue": "Max **Dexterity** first (attacks/AC), then **Constitution**.",
-            "Sorcerer": "Focus on **Charisma** (spells) and **Constitution** (concentration).",
-            "Warlock": "Boost **Charisma** (spells) and **Constitution** (survivability).",
-            "Wizard": "Prioritize **Intelligence** (spells) and **Constitution** (concentration).",
-            "Artificer": "Focus on **Intelligence** (spells) and **Constitution** (survivability).",
-            "Blood Hunter": "Balance **Strength/Dexterity** and **Constitution** (for blood curses)."
-        }
-        
-        if char["class"] in class_recommendations:
-            st.info(f"**{char['class']} Recommendation:** {class_recommendations[char['class']]}")
-
-        col1, col2 = st.columns(2)
-        with col1:
-            st.selectbox(
-                "🎯 Primary ability to improve", 
-                ABILITIES, 
-                key="asi_stat1",
-                help="Choose the ability score you want to improve"
-            )
-            improvement_val = st.selectbox(
-                "📊 Improvement amount", 
-                [1, 2], 
-                key="asi_val1",
-                help="Choose +1 or +2. If you choose +2, you cannot improve a second ability."
-            )
-        
-        with col2:
-            second_options = ["—"] + [stat for stat in ABILITIES if stat != st.session_state.get("asi_stat1", "")]
-            st.selectbox(
-                "🎯 Second ability (+1 only)", 
-                second_options, 
-                key="asi_stat2",
-                help="Optional: Choose a second ability to get +1 (only if primary gets +1)"
-            )
-            
-            # Show preview of changes
-            s1 = st.session_state.get("asi_stat1", ABILITIES[0])
-            v1 = st.session_state.get("asi_val1", 1)
-            s2 = st.session_state.get("asi_stat2", "—")
-            
-            st.write("**Preview of changes:**")
-            if s2 != "—" and v1 == 1:
-                st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
-                st.write(f"• {s2}: {final[s2]} → {final[s2] + 1}")
-            elif v1 == 2:
-                st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
-            else:
-                st.write(f"• {s1}: {final[s1]} → {final[s1] + v1}")
+        asi_choice(char)
 
         def apply_asi():
             s1 = st.session_state.asi_stat1
             v1 = st.session_state.asi_val1
             s2 = st.session_state.asi_stat2
             
-            # Validation checks with helpful error messages
-            if final[s1] + v1 > 20:
-                st.error(f"❌ **Cannot improve {s1}:** Would exceed maximum of 20 (currently {final[s1]}).")
-                return
-            if s2 != "—" and v1 == 2:
-                st.error("❌ **Invalid combination:** If you add +2 to one ability, you cannot improve a second ability.")
+            before = char.final_stats
+            try:
+                with ASI_SECONDS.time(mode="manual"):
+                    char.apply_asi(s1, v1, None if s2 == "—" else s2)
+            except ASIError as e:
+                ASI_APPLIED.inc(mode="manual", outcome="error")
+                st.session_state.asi_message = ("error", f"❌ {e}")
                 return
-            if s2 != "—" and final[s2] + 1 > 20:
-                st.error(f"❌ **Cannot improve {s2}:** Would exceed maximum of 20 (currently {final[s2]}).")
-                return
-            if s2 != "—" and s1 == s2:
-                st.error("❌ **Cannot apply bonuses to the same ability twice in one ASI.**")
-                return
-                
-            # Apply the improvements
-            old_s1 = final[s1]
-            final[s1] += v1
-            improvement_text = f"**{s1}:** {old_s1} → {final[s1]}"
-            
+            ASI_APPLIED.inc(mode="manual", outcome="ok")
+            after = char.final_stats
+
+            improvement_text = f"**{s1}:** {before[s1]} → {after[s1]}"
             if s2 != "—":
-                old_s2 = final[s2]
-                final[s2] += 1
-                improvement_text += f" | **{s2}:** {old_s2} → {final[s2]}"
+                improvement_text += f" | **{s2}:** {before[s2]} → {after[s2]}"
             
             st.session_state.asi_spent += 1
+            STORE.update(st.session_state.sheet_id, char, st.session_state.asi_spent)
             remaining_asis = unspent - 1
             
             success_msg = f"✅ **ASI Applied!** {improvement_text}"
             if remaining_asis > 0:
                 success_msg += f"\n\n🎯 You have **{remaining_asis} more ASI(s)** to allocate."
             else:
-                success_msg += f"\n\n🎉 **All ASIs allocated!** Your character is complete for level {char['level']}."
+                success_msg += f"\n\n🎉 **All ASIs allocated!** Your character is complete for level {char.level}."
                 
-            st.success(success_msg)
+            st.session_state.asi_message = ("success", success_msg)
 
         st.button("🚀 Apply ASI", on_click=apply_asi, type="primary")
+
+        # Best use of every remaining ASI for this class, applied in one go
+        plan = plan_asis(char.final_stats, char.char_class, char.level, st.session_state.asi_spent)
+        if plan:
+            steps = [f"Lv {lvl}: +2 {first[:3]}" if second is None
+                     else f"Lv {lvl}: +1 {first[:3]} / +1 {second[:3]}"
+                     for lvl, first, amount, second in plan]
+            st.caption("✨ **Optimal plan:** " + " · ".join(steps))
+
+            def apply_plan():
+                before = char.final_stats
+                with ASI_SECONDS.time(mode="plan"):
+                    char.apply_asis(plan)
+                ASI_APPLIED.inc(len(plan), mode="plan", outcome="ok")
+                after = char.final_stats
+                st.session_state.asi_spent += len(plan)
+                STORE.update(st.session_state.sheet_id, char, st.session_state.asi_spent)
+                changes = " | ".join(f"**{a}:** {before[a]} → {after[a]}"
+                                     for a in ABILITIES if after[a] != before[a])
+                st.session_state.asi_message = ("success", f"✅ **{len(plan)} ASI(s) Applied!** {changes}")
+
+            st.button("✨ Apply optimal ASIs", on_click=apply_plan)
         
         # Warning about permanence
         st.caption("⚠️ **Note:** ASI improvements are permanent and cannot be undone. Choose carefully!")
@@ -617,36 +585,165 @@ if char:
     else:
         st.info("🕐 **No ASIs available yet.** Your first ASI will typically come at level 4.")
 
+    # Result of the last Apply ASI click (set by the callback, shown once)
+    if "asi_message" in st.session_state:
+        kind, message = st.session_state.pop("asi_message")
+        getattr(st, kind)(message)
+
+    # -------- Level progression --------
+    if char.level < MAX_LEVEL:
+        def level_up():
+            # One level at a time: only that level's ASIs and proficiency step are new
+            reached = Progression(char, st.session_state.asi_spent, spend=None).advance()
+            char.level = reached.level
+            STORE.update(st.session_state.sheet_id, char, st.session_state.asi_spent)
+            news = [f"⬆️ **Level {reached.level}!**"]
+            if reached.asis_earned > reached.previous.asis_earned:
+                news.append("🎯 A new ASI is ready to allocate.")
+            if reached.proficiency_bonus > reached.previous.proficiency_bonus:
+                news.append(f"Proficiency bonus is now +{reached.proficiency_bonus}.")
+            st.session_state.asi_message = ("success", " ".join(news))
+
+        st.button("⬆️ Level up", on_click=level_up)
+
+    with st.expander(f"🗺️ Progression to level {MAX_LEVEL}", expanded=False):
+        st.caption("Every remaining ASI spent as the optimal plan would spend it, level by level.")
+        st.dataframe(
+            [{"Level": snap.level, "Prof.": f"+{snap.proficiency_bonus}",
+              **{a[:3]: f"{s} ({m:+d})" for a, s, m in zip(ABILITIES, snap.scores, snap.modifiers)},
+              "ASIs": " · ".join(f"+2 {first[:3]}" if second is None
+                                 else f"+1 {first[:3]} / +1 {second[:3]}"
+                                 for first, amount, second in snap.asis)}
+             for snap in Progression(char, st.session_state.asi_spent).timeline()],
+            hide_index=True, width="stretch")
+
     # -------- Backstory in Expander --------
     with st.expander("📜 Backstory", expanded=True):
-        st.write(char['backstory'])
+        if char.backstory is None:
+            pending = st.session_state.backstory_pending
+            streamed = st.empty()
+            try:
+                with streamed.container():
+                    char.backstory = st.write_stream(stream_backstory(**pending))
+            except BackstoryInterrupted as e:
+                # Replace the half-written story rather than keeping it
+                char.backstory = e.fallback
+                streamed.write(char.backstory)
+                st.caption("⚠️ The AI backstory broke off midway; this one was written offline.")
+            del st.session_state.backstory_pending
+            STORE.update(st.session_state.sheet_id, char, st.session_state.asi_spent)
+        else:
+            st.write(char.backstory)
 
     # -------- Download --------
-    txt = f"""D&D Character Sheet (PHB Only)
---------------------
-Name: {char['name']}
-Race: {char['race']}
-Class: {char['class']}
-Background: {char['background']}
-Alignment: {char['alignment']}
-Level: {char['level']}
-
-Ability Scores (base – before lineage bonuses):
-"""
-    for stat, score in char['base_stats'].items():
-        txt += f"    {stat}: {score}\n"
-
-    if char.get('apply_racial', True):
-        txt += "\nAbility Scores (final – after lineage bonuses):\n"
-        for stat, score in char['final_stats'].items():
-            txt += f"    {stat}: {score}\n"
-
-    txt += f"\nBackstory:\n{char['backstory']}\n"
-    txt += "\nNote: This character was created using only options from the official Player's Handbook (PHB).\n"
-
-    st.download_button(
-        label="📄 Download Character Sheet (.txt)",
-        data=txt,
-        file_name=f"{char['name'].replace(' ', '_')}_sheet.txt",
-        mime="text/plain"
-    )
\ No newline at end of file
+    download = st.columns([3, 1])
+    sheet_format = download[1].selectbox("Format", list(SHEET_FORMATS), key="sheet_format",
+                                         label_visibility="collapsed")
+    ext, mime = SHEET_FORMATS[sheet_format]
+    download[0].download_button(
+        label=f"📄 Download Character Sheet (.{ext})",
+        data=render(char, sheet_format),
+        file_name=sheet_filename(char, ext),
+        mime=mime
+    )
+
+if st.session_state.sheet is not None:
+    sheet_display(st.session_state.sheet)
+
+# ================= Saved characters =================
+BROWSE_PAGE = 25
+
+@st.fragment
+def character_browser():
+    """Keyset-paginated list of stored characters; paging reruns only this block."""
+    cols = st.columns(4)
+    filters = {
+        "race": cols[0].selectbox("Race", ["Any"] + RACES, key="browse_race"),
+        "char_class": cols[1].selectbox("Class", ["Any"] + CLASSES, key="browse_class"),
+        "level": cols[2].selectbox("Level", ["Any"] + list(range(1, 21)), key="browse_level"),
+        "alignment": cols[3].selectbox("Alignment", ["Any"] + ALIGNMENTS, key="browse_alignment"),
+    }
+    filters = {k: None if v == "Any" else v for k, v in filters.items()}
+    filters["owner"] = st.session_state.owner
+
+    # Cursors of the pages visited so far; new filters start again from the top
+    if st.session_state.get("browse_filters") != filters:
+        st.session_state.browse_filters = filters
+        st.session_state.browse_cursors = [None]
+    cursors = st.session_state.browse_cursors
+    rows, next_cursor = STORE.page(cursors[-1], BROWSE_PAGE, **filters)
+
+    if not rows:
+        st.caption("No saved characters match.")
+        return
+    st.caption(f"Page {len(cursors)} · {STORE.count(**filters):,} saved characters match")
+    st.dataframe(
+        [{"Name": r["name"], "Race": r["race"], "Class": r["class"], "Level": r["level"],
+          "Alignment": r["alignment"]} for r in rows],
+        hide_index=True, width="stretch",
+    )
+
+    nav = st.columns([1, 1, 3, 1])
+    nav[0].button("◀ Newer", disabled=len(cursors) == 1, key="browse_newer", on_click=cursors.pop)
+    nav[1].button("Older ▶", disabled=next_cursor is None, key="browse_older",
+                  on_click=cursors.append, args=(next_cursor,))
+    picked = nav[2].selectbox(
+        "Character", rows, key="browse_pick", label_visibility="collapsed",
+        format_func=lambda r: f"{r['name']} ({r['race']} {r['class']} {r['level']})",
+    )
+    if nav[3].button("Open", key="browse_open"):
+        loaded = STORE.get(picked["id"])
+        if loaded is not None:
+            char, st.session_state.asi_spent = loaded
+            if char.backstory is None:     # saved before its backstory finished streaming
+                char.backstory = ""
+            st.session_state.sheet = char
+            st.session_state.sheet_id = picked["id"]
+            st.rerun()
+
+with st.expander("🗂️ My Characters"):
+    character_browser()
+
+# ================= Bulk NPC export =================
+BULK_APP_MAX = 10_000    # the app builds the file in memory; larger runs belong to `dnd-gen`
+
+with st.expander("📦 Bulk NPC Export"):
+    st.caption("Generate many random NPCs (offline names and backstories) and download them in one file. "
+               f"Up to {BULK_APP_MAX:,} here; use `dnd-gen generate` or `dnd-gen bulk` for more.")
+    bulk_cols = st.columns(2)
+    with bulk_cols[0]:
+        bulk_count = st.number_input("How many NPCs?", min_value=1, max_value=BULK_APP_MAX, value=1_000, step=500)
+        bulk_race = st.selectbox("Race", ["Any"] + RACES, key="bulk_race")
+    with bulk_cols[1]:
+        bulk_format = st.selectbox(
+            "Format", list(EXPORT_FORMATS), key="bulk_format",
+            format_func=lambda f: {"jsonl": "JSON Lines", "csv": "CSV",
+                                   "zip-txt": "ZIP of .txt sheets", "zip-md": "ZIP of Markdown sheets",
+                                   "zip-html": "ZIP of HTML sheets", "zip-json": "ZIP of JSON sheets"}[f]
+        )
+        bulk_class = st.selectbox("Class", ["Any"] + CLASSES, key="bulk_class")
+    bulk_options = (bulk_count, bulk_race, bulk_class, bulk_format)
+
+    if st.button("⚙️ Prepare export"):
+        npcs = iter_characters(
+            bulk_count,
+            race=None if bulk_race == "Any" else bulk_race,
+            char_class=None if bulk_class == "Any" else bulk_class,
+        )
+        with st.spinner(f"Generating {bulk_count:,} NPCs..."):
+            # st.download_button needs the whole file (about 0.5 MB per 1,000 NPCs);
+            # it is built once here and kept until the options change
+            st.session_state.bulk_export = (bulk_options, b"".join(iter_export(npcs, bulk_format)))
+
+    prepared = st.session_state.get("bulk_export")
+    if prepared is not None and prepared[0] != bulk_options:
+        del st.session_state.bulk_export
+    elif prepared is not None:
+        st.download_button(
+            label=f"📥 Download {bulk_count:,} NPCs",
+            data=prepared[1],
+            file_name=export_filename(bulk_format, "npcs"),
+            mime=EXPORT_FORMATS[bulk_format][1],
+        )
+
+RERUN_SECONDS.observe(time.perf_counter() - script_start)
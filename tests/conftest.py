@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from dnd_gen import ai
+from dnd_gen.cache import ResponseCache, get_response_cache, set_response_cache
+from dnd_gen.gateway import LLMGateway, get_gateway, set_gateway
+from dnd_gen.namepool import NamePool, get_name_pool, set_name_pool
+from dnd_gen.resilience import Resilience, get_resilience, set_resilience
+from dnd_gen.templates import TemplateBank, get_template_bank, set_template_bank
+
+SINGLETONS = (
+    (get_response_cache, set_response_cache, lambda: ResponseCache(max_size=0)),
+    (get_gateway, set_gateway, lambda: LLMGateway(rpm=None, tpm=None)),
+    (get_name_pool, set_name_pool, NamePool),
+    (get_resilience, set_resilience, lambda: Resilience(backoff=0.01, max_backoff=0.01)),
+    (get_template_bank, set_template_bank, TemplateBank),
+)
+
+@pytest.fixture
+def ai_state():
+    """Fresh process-wide AI singletons (no cache, no limits), restored afterwards."""
+    saved = [get() for get, _, _ in SINGLETONS]
+    key, base_url = ai._api_key, ai._base_url
+    for _, set_, make in SINGLETONS:
+        set_(make())
+    yield
+    ai.configure(key, base_url)
+    for (_, set_, _), value in zip(SINGLETONS, saved):
+        set_(value)
+
+@pytest.fixture
+def offline(ai_state):
+    ai.configure(api_key=None)
+
+@pytest.fixture
+def fake_openai(ai_state):
+    with FakeOpenAIServer(latency=0.01, token_interval=0.001) as server:
+        ai.configure(api_key="fake-key", base_url=server.base_url)
+        yield server
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from dnd_gen import ai
+from dnd_gen.cache import NAME_SLOT, ResponseCache, set_response_cache
+from dnd_gen.gateway import get_gateway
+from dnd_gen.rules import PRONOUNS
+
+SPEC = {"race": "Elf", "char_class": "Wizard", "background": "Sage",
+        "alignment": "True Neutral", "gender": "Female", "pronoun": PRONOUNS["Female"]}
+
+def _specs(n, named=True):
+    return [dict(SPEC, name=f"Hero {i}") if named else dict(SPEC) for i in range(n)]
+
+def test_generate_many_falls_back_offline_without_a_key(offline):
+    pairs = ai.generate_many(_specs(3) + _specs(1, named=False))
+    assert [name for name, _ in pairs[:3]] == ["Hero 0", "Hero 1", "Hero 2"]
+    assert pairs[3][0]
+    for name, story in pairs:
+        assert name in story
+
+def test_agenerate_many_falls_back_offline_without_a_key(offline):
+    pairs = asyncio.run(ai.agenerate_many(_specs(2)))
+    assert [name for name, _ in pairs] == ["Hero 0", "Hero 1"]
+    assert all(name in story for name, story in pairs)
+
+def test_agenerate_many_opens_its_own_client(fake_openai):
+    pairs = asyncio.run(ai.agenerate_many(_specs(2) + _specs(2, named=False)))
+    assert [name for name, _ in pairs[:2]] == ["Hero 0", "Hero 1"]
+    for name, story in pairs:
+        assert name and name in story and NAME_SLOT not in story
+
+def test_generate_many_runs_the_specs_concurrently(fake_openai):
+    fake_openai.httpd.latency = 0.2
+    started = time.monotonic()
+    pairs = ai.generate_many(_specs(8))
+    assert time.monotonic() - started < 1.0
+    assert [name for name, _ in pairs] == [f"Hero {i}" for i in range(8)]
+    assert fake_openai.stats["requests"] == 8
+
+# ---------- Streaming ----------
+STORY_ARGS = ("Tova", "Dwarf", "Cleric", "Acolyte", "Neutral Good", PRONOUNS["Female"])
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))],
+                           usage=None)
+
+def _stub_client(stream):
+    create = lambda **kwargs: stream()     # noqa: E731
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+def test_stream_yields_the_whole_story(fake_openai):
+    set_response_cache(ResponseCache(variants=1))
+    story = "".join(ai.stream_backstory(*STORY_ARGS))
+    assert "Tova" in story and len(story.split()) > 20
+    assert ai._stored_backstory(*STORY_ARGS) == story
+
+def test_stream_without_a_key_yields_the_offline_story(offline):
+    assert "".join(ai.stream_backstory(*STORY_ARGS)) == ai.fallback_backstory(*STORY_ARGS)
+
+def test_a_stream_that_fails_before_any_text_yields_the_offline_story(fake_openai, monkeypatch):
+    def stream():
+        raise ValueError("bad request")
+    monkeypatch.setattr(ai, "get_client", lambda: _stub_client(stream))
+    assert "".join(ai.stream_backstory(*STORY_ARGS)) == ai.fallback_backstory(*STORY_ARGS)
+
+def test_a_stream_that_breaks_midway_is_never_kept(fake_openai, monkeypatch):
+    def stream():
+        yield _chunk("Tova was ")
+        yield _chunk("born ")
+        raise ConnectionError("reset by peer")
+    monkeypatch.setattr(ai, "get_client", lambda: _stub_client(stream))
+    set_response_cache(ResponseCache(variants=1))
+    shown = []
+    with pytest.raises(ai.BackstoryInterrupted) as info:
+        for part in ai.stream_backstory(*STORY_ARGS):
+            shown.append(part)
+    assert shown == ["Tova was ", "born "]
+    assert info.value.partial == "Tova was born "
+    assert info.value.fallback == ai.fallback_backstory(*STORY_ARGS)
+    assert ai._stored_backstory(*STORY_ARGS) is None
+    assert get_gateway().stats()["in_flight"] == 0
+
+def test_a_slow_consumer_is_not_counted_as_latency(fake_openai, monkeypatch):
+    observed = []
+    monkeypatch.setattr(ai, "_observe", lambda op, start, ok=True, usage=None:
+                        observed.append(time.perf_counter() - start))
+    for _ in ai.stream_backstory(*STORY_ARGS):
+        time.sleep(0.01)
+    assert len(observed) == 1 and observed[0] < 0.2
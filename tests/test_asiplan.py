@@ -0,0 +1,62 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from dnd_gen.asiplan import CLASS_WEIGHTS, increments_to_asis, plan_asis, plan_increments
+from dnd_gen.character import MAX_SCORE, Character
+from dnd_gen.pointbuy import ability_values
+from dnd_gen.rules import ABILITIES, CLASSES, asi_slots_available
+
+def _brute_force(scores, class_idx, slots):
+    """The best class score over every even split of up to ``2 * slots`` points."""
+    weights = CLASS_WEIGHTS[class_idx]
+    rooms = [range(min(2 * slots, MAX_SCORE - s) + 1) for s in scores]
+    return max(ability_values(np.add(scores, inc), weights).sum()
+               for inc in product(*rooms) if sum(inc) % 2 == 0 and sum(inc) <= 2 * slots)
+
+def _score(scores, class_idx, increments):
+    return ability_values(np.add(scores, increments), CLASS_WEIGHTS[class_idx]).sum()
+
+@pytest.mark.parametrize("slots", [1, 2, 3])
+def test_batch_plans_match_brute_force(slots):
+    rng = np.random.default_rng(slots)
+    scores = rng.integers(3, 21, size=(60, len(ABILITIES)))
+    scores[:10] = rng.integers(17, 21, size=(10, len(ABILITIES)))   # little room under the cap
+    classes = rng.integers(0, len(CLASSES), size=len(scores))
+    increments = plan_increments(scores, classes, slots)
+    assert ((scores + increments) <= MAX_SCORE).all()
+    assert (increments.sum(axis=1) <= 2 * slots).all()
+    assert (increments.sum(axis=1) % 2 == 0).all()
+    for row, c, inc in zip(scores.tolist(), classes.tolist(), increments):
+        assert _score(row, c, inc) == _brute_force(row, c, slots)
+
+def test_per_row_slots():
+    scores = np.full((3, len(ABILITIES)), 10)
+    increments = plan_increments(scores, 0, [0, 1, 2])
+    assert increments.sum(axis=1).tolist() == [0, 2, 4]
+
+def test_increments_deal_out_as_real_asis():
+    asis = increments_to_asis([3, 0, 1, 0, 2, 0])
+    assert sorted(asis, key=str) == sorted([("Strength", 2, None), ("Wisdom", 2, None),
+                                            ("Strength", 1, "Constitution")], key=str)
+
+def test_plan_asis_applies_to_a_character():
+    stats = {"Strength": 15, "Dexterity": 14, "Constitution": 13,
+             "Intelligence": 12, "Wisdom": 10, "Charisma": 8}
+    char = Character("Arin", "Human", "Fighter", "Soldier", "Lawful Good", 12, stats)
+    plan = plan_asis(char.final_stats, "Fighter", 12)
+    assert len(plan) == asi_slots_available("Fighter", 12)
+    char.apply_asis(plan)
+    raised = [char.final(a) - stats[a] for a in ABILITIES]
+    assert sum(raised) == 2 * len(plan)
+    assert _score([stats[a] for a in ABILITIES], CLASSES.index("Fighter"), raised) == \
+        _brute_force([stats[a] for a in ABILITIES], CLASSES.index("Fighter"), len(plan))
+
+def test_spent_asis_are_not_planned_again():
+    stats = dict.fromkeys(ABILITIES, 10)
+    assert plan_asis(stats, "Wizard", 8, spent=asi_slots_available("Wizard", 8)) == []
+    assert len(plan_asis(stats, "Wizard", 8, spent=1)) == asi_slots_available("Wizard", 8) - 1
+
+def test_capped_scores_leave_asis_unspent():
+    assert plan_asis(dict.fromkeys(ABILITIES, MAX_SCORE), "Rogue", 20) == []
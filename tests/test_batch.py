@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from dnd_gen import seeding
+from dnd_gen.batch import LINEAGE_ASI_VECTORS, generate_characters
+from dnd_gen.dice import roll_stat
+from dnd_gen.pointbuy import optimize_point_buy
+from dnd_gen.probability import score_pmf
+from dnd_gen.rules import ABILITIES, CLASSES, RACES, apply_racial_asi, lineage_index
+
+N = 200_000
+
+def _frequencies(scores):
+    return np.bincount(np.asarray(scores).ravel(), minlength=19)[:19] / np.size(scores)
+
+def test_rolls_match_the_scalar_path_and_the_exact_distribution():
+    batch = generate_characters(N // len(ABILITIES), rng=np.random.default_rng(1))
+    rng = random.Random(1)
+    scalar = [roll_stat(rng) for _ in range(N)]
+    exact = score_pmf()
+    for freq in (_frequencies(batch["base_stats"]), _frequencies(scalar)):
+        assert freq[:3].sum() == 0
+        assert np.abs(freq - exact).max() < 0.005
+
+def test_seeded_rolls_match_the_exact_distribution():
+    seeds = seeding.character_seeds(seeding.spawn(2, 1)[0], N // len(ABILITIES))
+    batch = generate_characters(len(seeds), seeds=seeds)
+    assert np.abs(_frequencies(batch["base_stats"]) - score_pmf()).max() < 0.005
+
+def test_racial_bonuses_match_apply_racial_asi():
+    batch = generate_characters(2_000, rng=np.random.default_rng(3))
+    for r, base, final in zip(batch["race"].tolist(), batch["base_stats"].tolist(),
+                              batch["final_stats"].tolist()):
+        expected = apply_racial_asi(dict(zip(ABILITIES, base)), RACES[r])
+        assert final == [expected[a] for a in ABILITIES]
+
+def test_subrace_adds_its_bonuses():
+    batch = generate_characters(100, race="Dwarf", subrace="Hill Dwarf",
+                                rng=np.random.default_rng(4))
+    vector = LINEAGE_ASI_VECTORS[lineage_index("Dwarf", "Hill Dwarf")]
+    assert (batch["final_stats"] == batch["base_stats"] + vector).all()
+    assert (batch["lineage"] == lineage_index("Dwarf", "Hill Dwarf")).all()
+
+def test_pointbuy_rows_match_the_scalar_optimizer():
+    batch = generate_characters(500, method="pointbuy", rng=np.random.default_rng(5))
+    for r, c, base in zip(batch["race"].tolist(), batch["class"].tolist(),
+                          batch["base_stats"].tolist()):
+        stats, _ = optimize_point_buy(CLASSES[c], RACES[r])
+        assert base == [stats[a] for a in ABILITIES]
+
+def test_unapplied_racial_bonuses_leave_final_equal_to_base():
+    batch = generate_characters(100, apply_racial=False, rng=np.random.default_rng(6))
+    assert (batch["final_stats"] == batch["base_stats"]).all()
+
+def test_unknown_method_and_orphan_subrace_are_refused():
+    with pytest.raises(ValueError):
+        generate_characters(1, method="standard-array")
+    with pytest.raises(ValueError):
+        generate_characters(1, subrace="Hill Dwarf")
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+import pytest
+
+from dnd_gen.bulk import generate_sharded
+from dnd_gen.export import write_export
+from dnd_gen.sheet import BATCH_CHUNK, iter_characters
+
+N = 2 * BATCH_CHUNK + 500
+
+def _expected(fmt, **options):
+    out = io.BytesIO()
+    write_export(iter_characters(N, seed=3, **options), out, fmt)
+    return out.getvalue()
+
+@pytest.mark.parametrize("fmt, options", [("jsonl", {}),
+                                          ("jsonl", {"race": "Elf", "spend_asis": True, "level": 8})])
+def test_shards_read_in_order_match_iter_characters(tmp_path, fmt, options):
+    seen = []
+    result = generate_sharded(N, tmp_path, fmt, workers=2, shard_size=BATCH_CHUNK, seed=3,
+                              progress=lambda done, n, elapsed: seen.append(done), **options)
+    assert [p.rsplit("/", 1)[1] for p in result["shards"]] == \
+        ["npcs-00000.jsonl", "npcs-00001.jsonl", "npcs-00002.jsonl"]
+    data = b"".join(open(p, "rb").read() for p in result["shards"])
+    assert data == _expected(fmt, **options)
+    assert result["count"] == N and result["bytes"] == len(data)
+    assert sorted(seen)[-1] == N and len(seen) == 3
+
+def test_csv_shards_each_have_a_header(tmp_path):
+    result = generate_sharded(N, tmp_path, "csv", workers=2, shard_size=BATCH_CHUNK, seed=3)
+    seeds = []
+    for path in result["shards"]:
+        with open(path, encoding="utf-8", newline="") as f:
+            seeds += [int(row["seed"]) for row in csv.DictReader(f)]
+    assert seeds == [c.seed for c in iter_characters(N, seed=3)]
+
+def test_bulk_is_offline_only(tmp_path):
+    with pytest.raises(ValueError):
+        generate_sharded(10, tmp_path, use_ai=True)
+    with pytest.raises(ValueError):
+        generate_sharded(10, tmp_path, "xlsx")
+
+def test_a_small_run_is_one_shard(tmp_path):
+    result = generate_sharded(7, tmp_path, seed=1)
+    [path] = result["shards"]
+    assert [json.loads(line)["seed"] for line in open(path)] == \
+        [c.seed for c in iter_characters(7, seed=1)]
@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from dnd_gen import cache as cache_module
+from dnd_gen.cache import ResponseCache, fill_name, strip_name
+
+KEY = ("backstory", "Elf", "Wizard")
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+def test_lookups_miss_until_every_variant_is_collected(clock):
+    cache = ResponseCache(variants=3)
+    for n in range(3):
+        assert cache.get(KEY) is None
+        cache.put(KEY, f"story {n}")
+    assert {cache.get(KEY) for _ in range(50)} == {"story 0", "story 1", "story 2"}
+    assert cache.stats()["hits"] == 50 and cache.stats()["misses"] == 3
+
+def test_new_variants_replace_the_oldest(clock):
+    cache = ResponseCache(variants=2)
+    for n in range(3):
+        clock.now += 1
+        cache.put(KEY, f"story {n}")
+    assert {cache.get(KEY) for _ in range(30)} == {"story 1", "story 2"}
+
+def test_variants_expire(clock):
+    cache = ResponseCache(variants=1, ttl=60)
+    cache.put(KEY, "story")
+    clock.now += 59
+    assert cache.get(KEY) == "story"
+    clock.now += 2
+    assert cache.get(KEY) is None
+    assert cache.stats()["size"] == 0
+
+def test_misses_do_not_evict_cached_responses(clock):
+    cache = ResponseCache(max_size=2, variants=1)
+    cache.put(KEY, "story")
+    for n in range(10):
+        cache.get(("backstory", "Orc", str(n)))
+    assert cache.get(KEY) == "story"
+
+def test_least_recently_used_keys_are_evicted(clock):
+    cache = ResponseCache(max_size=2, variants=1)
+    for n in range(3):
+        cache.put(("k", n), str(n))
+    assert cache.get(("k", 0)) is None
+    assert cache.get(("k", 2)) == "2"
+
+def test_a_zero_size_cache_keeps_nothing(clock):
+    cache = ResponseCache(max_size=0, variants=1)
+    cache.put(KEY, "story")
+    assert cache.get(KEY) is None
+
+def test_disk_tier_keeps_one_row_per_slot(clock, tmp_path):
+    path = tmp_path / "cache.db"
+    cache = ResponseCache(variants=3, path=str(path))
+    for n in range(5):
+        clock.now += 1
+        cache.put(KEY, f"story {n}")
+    rows = sqlite3.connect(path).execute(
+        "SELECT slot, value FROM variants ORDER BY slot").fetchall()
+    assert rows == [(0, "story 3"), (1, "story 4"), (2, "story 2")]
+
+    reopened = ResponseCache(variants=3, path=str(path))
+    assert {reopened.get(KEY) for _ in range(50)} == {"story 2", "story 3", "story 4"}
+
+def test_expired_rows_are_pruned(clock, tmp_path):
+    path = tmp_path / "cache.db"
+    cache = ResponseCache(variants=1, ttl=60, path=str(path), prune_every=2)
+    cache.put(("old",), "story")
+    clock.now += 61
+    cache.put(("new",), "story")
+    keys = sqlite3.connect(path).execute("SELECT key FROM variants").fetchall()
+    assert keys == [("new",)]
+
+def test_names_are_slotted_and_filled_back():
+    text = "Arin Stoneheart left home. Arin never looked back; Arinel did."
+    slotted = strip_name(text, "Arin Stoneheart")
+    assert "Arin" not in slotted.replace("Arinel", "")
+    assert fill_name(slotted, "Tova Ironfist") == \
+        "Tova Ironfist left home. Tova never looked back; Arinel did."
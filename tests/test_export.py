@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import zipfile
+from itertools import count
+from pathlib import Path
+
+import pytest
+
+from dnd_gen.export import FORMATS, iter_export, write_export
+from dnd_gen.render import render
+from dnd_gen.sheet import iter_characters
+from dnd_gen.store import set_character_store
+
+APP = Path(__file__).resolve().parent.parent / "dnd_generator_app.py"
+
+@pytest.fixture(scope="module")
+def npcs():
+    return list(iter_characters(300, seed=0))
+
+def _export(characters, fmt):
+    out = io.BytesIO()
+    written = write_export(characters, out, fmt)
+    assert written == len(out.getvalue())
+    return out.getvalue()
+
+def test_jsonl_has_one_sheet_dict_per_line(npcs):
+    lines = _export(npcs, "jsonl").decode().splitlines()
+    assert [json.loads(line) for line in lines] == [c.to_dict() for c in npcs]
+
+def test_csv_has_a_header_and_one_row_per_character(npcs):
+    rows = list(csv.DictReader(io.StringIO(_export(npcs, "csv").decode())))
+    assert [(r["name"], int(r["seed"])) for r in rows] == [(c.name, c.seed) for c in npcs]
+    assert rows[0]["backstory"] == npcs[0].backstory
+    assert _export([], "csv").decode().startswith("name,race,subrace,class")
+
+@pytest.mark.parametrize("fmt", [f for f in FORMATS if f.startswith("zip-")])
+def test_zip_holds_one_rendered_sheet_per_character(npcs, fmt):
+    with zipfile.ZipFile(io.BytesIO(_export(npcs[:20], fmt))) as zf:
+        names = zf.namelist()
+        assert len(names) == 20
+        assert zf.read(names[3]).decode() == render(npcs[3], fmt[len("zip-"):])
+
+def test_exports_stream_in_chunks():
+    def characters():
+        for char in iter_characters(5_000, seed=1):
+            next(consumed)
+            yield char
+
+    for fmt in ("jsonl", "csv", "zip-txt"):
+        consumed = count()
+        next(iter(iter_export(characters(), fmt)))
+        assert next(consumed) < 5_000
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        iter_export([], "xlsx")
+
+def test_app_builds_the_export_once_and_caps_its_size(tmp_path, monkeypatch):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.setenv("DND_STORE_PATH", str(tmp_path / "characters.db"))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    set_character_store(None)
+    try:
+        at = testing.AppTest.from_file(str(APP), default_timeout=60).run()
+        [bulk_count] = [n for n in at.number_input if n.label == "How many NPCs?"]
+        assert bulk_count.max == 10_000
+        bulk_count.set_value(50)
+        at.selectbox(key="bulk_format").set_value("jsonl")
+        [b for b in at.button if "Prepare" in b.label][0].click().run()
+        assert not at.exception
+        options, data = at.session_state.bulk_export
+        assert len(data.decode().splitlines()) == 50
+        at.run()
+        assert at.session_state.bulk_export[1] is data      # kept across reruns
+        at.selectbox(key="bulk_format").set_value("csv").run()
+        assert "bulk_export" not in at.session_state
+    finally:
+        set_character_store(None)
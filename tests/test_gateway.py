@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from dnd_gen.gateway import BULK, INTERACTIVE, BudgetExceeded, LLMGateway
+from dnd_gen.resilience import DeadlineExceeded
+
+def _until(condition, timeout=2.0):
+    ends = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < ends, "timed out"
+        time.sleep(0.005)
+
+def _usage(tokens):
+    return SimpleNamespace(usage=SimpleNamespace(total_tokens=tokens))
+
+def test_budget_refuses_requests_that_would_overshoot():
+    gateway = LLMGateway(rpm=None, tpm=None, session_budget=100)
+    gateway.call(lambda: _usage(70), 50, session="s")
+    assert gateway.remaining("s") == 30
+    with pytest.raises(BudgetExceeded):
+        gateway.call(lambda: _usage(1), 31, session="s")
+    gateway.call(lambda: _usage(30), 30, session="s")
+    assert gateway.remaining("s") == 0
+    with pytest.raises(BudgetExceeded):
+        gateway.check_budget("s", 1)
+    assert gateway.remaining("other") == 100
+    assert gateway.stats()["rejected"] == 2
+
+def test_no_budget_means_no_accounting():
+    gateway = LLMGateway(rpm=None, tpm=None)
+    gateway.charge("s", 10 ** 9)
+    gateway.check_budget("s", 10 ** 9)
+    assert gateway.remaining("s") is None
+    assert gateway.stats()["sessions"] == 0
+
+def test_idle_and_excess_sessions_are_forgotten():
+    gateway = LLMGateway(rpm=None, tpm=None, session_budget=100, session_ttl=0.05,
+                         max_sessions=2)
+    for session in "abc":
+        gateway.charge(session, 10)
+    assert gateway.stats()["sessions"] == 2
+    assert gateway.remaining("a") == 100
+    time.sleep(0.06)
+    assert gateway.remaining("c") == 100
+    assert gateway.stats()["sessions"] == 0
+
+def test_interactive_requests_go_ahead_of_bulk_ones():
+    gateway = LLMGateway(rpm=None, tpm=None, max_in_flight=1)
+    order = []
+
+    def request(name, priority):
+        gateway.call(lambda: order.append(name), 1, priority=priority)
+
+    with gateway.slot(1):
+        bulk = threading.Thread(target=request, args=("bulk", BULK))
+        bulk.start()
+        _until(lambda: gateway.stats()["queued"] == 1)
+        interactive = threading.Thread(target=request, args=("interactive", INTERACTIVE))
+        interactive.start()
+        _until(lambda: gateway.stats()["queued"] == 2)
+    bulk.join()
+    interactive.join()
+    assert order == ["interactive", "bulk"]
+
+def test_requests_are_paced_to_the_rate_limit():
+    gateway = LLMGateway(rpm=600, tpm=None)
+    started = time.monotonic()
+    for _ in range(4):
+        gateway.call(lambda: None, 1)
+    assert time.monotonic() - started >= 0.3 - 0.02
+
+def test_identical_requests_share_one_run():
+    gateway = LLMGateway(rpm=None, tpm=None)
+    release = threading.Event()
+    runs = []
+
+    def run():
+        runs.append(1)
+        release.wait()
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.call(run, 1, key="k")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    _until(lambda: gateway.stats()["coalesced"] == 4)
+    release.set()
+    for t in threads:
+        t.join()
+    assert runs == [1] and results == ["answer"] * 5
+
+def test_a_queued_call_gives_up_at_its_deadline_without_leaking_its_slot():
+    gateway = LLMGateway(rpm=None, tpm=None, max_in_flight=1)
+    with gateway.slot(1):
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            gateway.call(lambda: None, 1, deadline=started + 0.1)
+        assert time.monotonic() - started < 0.5
+    assert gateway.call(lambda: "ok", 1, deadline=time.monotonic() + 1) == "ok"
+    assert gateway.stats()["in_flight"] == 0
+
+def test_async_calls_share_the_gateway():
+    gateway = LLMGateway(rpm=None, tpm=None, max_in_flight=1, session_budget=100)
+
+    async def run():
+        await asyncio.sleep(0.01)
+        return _usage(40)
+
+    async def main():
+        await gateway.acall(run, 10, session="s")
+        with gateway.slot(1):
+            with pytest.raises(DeadlineExceeded):
+                await gateway.acall(run, 10, deadline=time.monotonic() + 0.05)
+        with pytest.raises(BudgetExceeded):
+            await gateway.acall(run, 61, session="s")
+
+    asyncio.run(main())
+    assert gateway.remaining("s") == 60
+    assert gateway.stats()["in_flight"] == 0
@@ -0,0 +1,100 @@
+import json
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from dnd_gen import metrics
+
+@pytest.fixture
+def enabled():
+    was = metrics.enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.enable(was)
+    metrics.reset()
+
+def _lines(name):
+    return [line for line in metrics.render().splitlines() if line.split("{")[0].startswith(name)]
+
+def test_disabled_metrics_record_nothing():
+    was = metrics.enabled()
+    metrics.enable(False)
+    try:
+        metrics.reset()
+        metrics.FALLBACKS.inc(op="backstory", reason="no_key")
+        metrics.LLM_SECONDS.observe(0.1, op="names")
+        assert _lines("dnd_gen_fallbacks_total") == []
+    finally:
+        metrics.enable(was)
+
+def test_counters_render_in_the_exposition_format(enabled):
+    metrics.FALLBACKS.inc(op="backstory", reason="no_key")
+    metrics.FALLBACKS.inc(3, op="race_name", reason='say "hi"\n')
+    text = metrics.render()
+    assert "# HELP dnd_gen_fallbacks_total Local text used instead of the API.\n" in text
+    assert "# TYPE dnd_gen_fallbacks_total counter\n" in text
+    assert _lines("dnd_gen_fallbacks_total") == [
+        'dnd_gen_fallbacks_total{op="backstory",reason="no_key"} 1',
+        'dnd_gen_fallbacks_total{op="race_name",reason="say \\"hi\\"\\n"} 3',
+    ]
+    metrics.CIRCUIT_OPENED.inc()
+    assert _lines("dnd_gen_circuit_opened_total") == ["dnd_gen_circuit_opened_total 1"]
+    assert text.endswith("\n")
+
+def test_histograms_render_cumulative_buckets(enabled):
+    for seconds in (0.003, 0.2, 0.2, 40.0):
+        metrics.LLM_SECONDS.observe(seconds, op="names")
+    lines = _lines("dnd_gen_llm_request_seconds")
+    buckets = {line.split('le="')[1].split('"')[0]: int(line.rsplit(" ", 1)[1])
+               for line in lines if "_bucket" in line}
+    assert list(buckets) == [*map(str, metrics.LATENCY_BUCKETS), "+Inf"]
+    assert (buckets["0.005"], buckets["0.1"], buckets["0.25"], buckets["30.0"],
+            buckets["+Inf"]) == (1, 1, 3, 3, 4)
+    assert 'dnd_gen_llm_request_seconds_count{op="names"} 4' in lines
+    [total] = [line for line in lines if "_sum" in line]
+    assert float(total.rsplit(" ", 1)[1]) == pytest.approx(40.403)
+    assert "# TYPE dnd_gen_llm_request_seconds histogram" in metrics.render()
+
+def test_timers_and_usage(enabled):
+    @metrics.timed(metrics.GENERATE_SECONDS, op="test")
+    def work():
+        return 42
+
+    assert work() == 42
+    with metrics.ASI_SECONDS.time(mode="manual"):
+        pass
+    metrics.record_usage("names", SimpleNamespace(prompt_tokens=30, completion_tokens=12))
+    text = metrics.render()
+    assert 'dnd_gen_generate_seconds_count{op="test"} 1' in text
+    assert 'dnd_gen_apply_asi_seconds_count{mode="manual"} 1' in text
+    assert 'dnd_gen_llm_tokens_total{op="names",type="completion"} 12' in text
+    snapshot = json.loads(json.dumps(metrics.snapshot()))
+    assert snapshot["dnd_gen_llm_tokens"]["names,prompt"] == 30
+    assert snapshot["dnd_gen_generate_seconds"]["test"]["count"] == 1
+
+def test_the_endpoint_serves_metrics(enabled):
+    server = metrics.serve(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        metrics.FALLBACKS.inc(op="backstory", reason="budget")
+        with urllib.request.urlopen(url + "/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'reason="budget"} 1' in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as info:
+            urllib.request.urlopen(url + "/other")
+        assert info.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_importing_the_package_leaves_http_server_alone():
+    code = "import sys, dnd_gen.ai, dnd_gen.metrics; print('http.server' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         check=True, cwd=Path(__file__).resolve().parent.parent)
+    assert out.stdout.strip() == "False"
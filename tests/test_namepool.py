@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from dnd_gen import ai
+from dnd_gen.gateway import BULK, INTERACTIVE, BudgetExceeded, LLMGateway, set_gateway
+from dnd_gen.namepool import NamePool, set_name_pool
+
+KEY = ("Elf", "Wizard", "Female")
+
+class Fetch:
+    """Stub `fetch` handing out numbered names; bulk refills wait for `release`."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, race, char_class, gender, count, session, priority):
+        self.calls.append(priority)
+        if priority >= BULK:
+            assert self.release.wait(5)
+        with self._lock:
+            start, self._next = self._next, self._next + count
+        return [f"{race} {n}" for n in range(start, start + count)]
+
+@pytest.fixture
+def fetch(ai_state):
+    return Fetch()
+
+def _until(condition, timeout=2.0):
+    ends = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < ends, "timed out"
+        time.sleep(0.005)
+
+def test_a_cold_pool_fills_once_and_serves_in_order(fetch):
+    pool = NamePool(fetch, batch=20, low_water=5)
+    assert [pool.get(*KEY) for _ in range(3)] == ["Elf 0", "Elf 1", "Elf 2"]
+    assert fetch.calls == [INTERACTIVE]
+    assert pool.stats()["cold"] == 1
+
+def test_a_low_pool_refills_in_the_background_at_bulk_priority(fetch):
+    pool = NamePool(fetch, batch=10, low_water=5)
+    names = [pool.get(*KEY) for _ in range(6)]       # the sixth leaves 4 behind
+    _until(lambda: pool.size(*KEY) == 14)
+    assert fetch.calls == [INTERACTIVE, BULK]
+    assert len(set(names)) == 6
+
+def test_refills_skip_duplicates_and_respect_capacity(ai_state):
+    pool = NamePool(lambda *args: ["Ann", "Bo", "Ann"] * 10, batch=3, capacity=2)
+    assert pool.refill(*KEY).result() == 2
+    assert pool.size(*KEY) == 2
+    assert pool.refill(*KEY).result() == 0
+
+def test_interactive_callers_do_not_wait_behind_a_bulk_refill(fetch):
+    fetch.release.clear()
+    pool = NamePool(fetch, batch=10, low_water=5)
+    bulk = pool.refill(*KEY)
+    started = time.monotonic()
+    assert pool.get(*KEY) is not None
+    assert time.monotonic() - started < 1.0
+    assert not bulk.done()
+    fetch.release.set()
+    assert bulk.result() == 10
+    assert fetch.calls == [BULK, INTERACTIVE]
+
+def test_a_refill_that_adds_nothing_is_fine_when_another_filled_the_pool(ai_state):
+    release = threading.Event()
+
+    def fetch(race, char_class, gender, count, session, priority):
+        if priority == INTERACTIVE:
+            release.wait(5)         # lands just after the bulk refill, with the same names
+        return ["Ann", "Bo"]
+
+    pool = NamePool(fetch, batch=2)
+    pool.refill(*KEY).add_done_callback(lambda f: release.set())
+    assert pool.get(*KEY) in ("Ann", "Bo")
+
+def test_an_empty_completion_still_raises(ai_state):
+    pool = NamePool(lambda *args: [], batch=5)
+    with pytest.raises(ValueError):
+        pool.get(*KEY)
+
+def test_names_are_charged_to_the_session(fetch):
+    set_gateway(LLMGateway(rpm=None, tpm=None, session_budget=25))
+    pool = NamePool(fetch, batch=10, name_tokens=10)
+    pool.get(*KEY, session="s")
+    asyncio.run(pool.aget(*KEY, session="s"))
+    with pytest.raises(BudgetExceeded):
+        pool.get(*KEY, session="s")
+    assert pool.get(*KEY, session="other") is not None
+
+def test_async_get_waits_for_a_cold_pool(fetch):
+    pool = NamePool(fetch, batch=4)
+    names = asyncio.run(asyncio.wait_for(pool.aget(*KEY), 5))
+    assert names == "Elf 0"
+
+def test_an_ai_name_is_served_while_a_bulk_refill_is_in_flight(fake_openai, monkeypatch):
+    # The urgent refill goes upstream on its own instead of joining the bulk request
+    fake_openai.httpd.latency = 0.3
+    monkeypatch.setattr(ai, "generate_name", lambda race: "offline")
+    pool = NamePool()
+    set_name_pool(pool)
+    bulk = pool.refill(*KEY)
+    _until(lambda: fake_openai.stats["requests"] == 1)
+    assert ai.generate_race_name_ai(*KEY) != "offline"
+    assert fake_openai.stats["requests"] == 2
+    bulk.result()
+    assert pool.size(*KEY) > pool.batch
@@ -0,0 +1,84 @@
+import re
+
+import numpy as np
+import pytest
+
+from dnd_gen import seeding
+from dnd_gen.names import (
+    ARRAYS, CONTEXT_WEIGHT, MAGIC, MAX_LEN, MIN_LEN, TABLE_PATH, MarkovNames, _chain,
+    build, compile_tables, read_corpus,
+)
+from dnd_gen.rules import RACES
+
+@pytest.fixture(scope="module")
+def table():
+    return compile_tables()
+
+@pytest.fixture(scope="module")
+def names(table):
+    return MarkovNames(table)
+
+def test_the_bundled_table_is_up_to_date(table):
+    assert TABLE_PATH.read_bytes() == table
+
+def test_a_built_table_maps_back_unchanged(table, tmp_path):
+    path = tmp_path / "names.bin"
+    assert build(path) == len(table)
+    mapped = MarkovNames.open(path)
+    in_memory = MarkovNames(table)
+    assert mapped.header == in_memory.header
+    for name in ARRAYS:
+        assert np.array_equal(getattr(mapped, name), getattr(in_memory, name))
+    seeds = np.arange(100, dtype=np.uint64)
+    races = np.arange(100) % len(RACES)
+    assert mapped.generate_for(races, seeds=seeds) == in_memory.generate_for(races, seeds=seeds)
+
+def test_bad_tables_are_refused(table):
+    with pytest.raises(ValueError):
+        MarkovNames(b"NOTNAMES" + table[len(MAGIC):])
+    stale = table.replace(b'"version": 1', b'"version": 0', 1)
+    with pytest.raises(ValueError):
+        MarkovNames(stale)
+
+def test_every_state_owns_a_consistent_run_of_slots(names):
+    assert (names.total > 0).all()
+    assert (names.base[1:] == names.base[:-1] + names.total[:-1]).all()
+    assert names.base[-1] + names.total[-1] == len(names.symbol)
+    letters = names.symbol[names.symbol != 0]
+    assert ((letters >= ord("a")) & (letters <= ord("z")) | (letters == ord("'"))
+            | (letters == ord("-"))).all()
+    assert (names.next >= 0).all() and (names.next < len(names.total)).all()
+    assert len(names.start) == len(names.limit) == 2 * len(RACES)
+
+def test_the_chain_mixes_in_the_shorter_context():
+    chain = _chain(["ana", "anna"], 2)
+    # After "^^": "a" both times, counted at both context lengths
+    assert chain["^^"] == {"a": CONTEXT_WEIGHT * 2 + 2}
+    # "an" is followed by "a" and "n"; the shorter context "n" by "a" twice and "n" once
+    assert chain["an"] == {"a": CONTEXT_WEIGHT + 2, "n": CONTEXT_WEIGHT + 1}
+    assert set(chain) == {"^^", "^a", "an", "na", "nn"}
+
+@pytest.mark.parametrize("race", RACES)
+def test_names_look_like_names(names, race):
+    corpus = read_corpus(race)
+    for name in names.generate(race, 200, rng=np.random.default_rng(0)):
+        first, last = name.split(" ")
+        for part, training in ((first, corpus["first"]), (last, corpus["last"])):
+            assert MIN_LEN <= len(part) <= min(MAX_LEN, max(map(len, training)))
+            assert re.fullmatch(r"[A-Z][a-z'-]*", part)
+
+def test_seeded_names_match_the_batch_path(names):
+    seeds = seeding.character_seeds(seeding.spawn(0, 1)[0], 300)
+    races = np.arange(300) % len(RACES)
+    batch = names.generate_for(races, seeds=seeds)
+    assert batch == [names.seeded_name(r, s) for r, s in zip(races.tolist(), seeds.tolist())]
+    assert batch == names.generate_for(races, seeds=seeds)
+
+def test_unique_names_never_repeat_until_forgotten(table):
+    names = MarkovNames(table)
+    first = names.generate("Halfling", 2_000, rng=np.random.default_rng(1), unique=True)
+    assert len(set(first)) == 2_000
+    again = names.generate("Halfling", 500, rng=np.random.default_rng(1), unique=True)
+    assert not set(first) & set(again)
+    names.forget()
+    assert names.generate("Halfling", 2_000, rng=np.random.default_rng(1), unique=True) == first
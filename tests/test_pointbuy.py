@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from dnd_gen.pointbuy import ALLOCATIONS, class_weights, find_allocations, optimize_point_buy
+from dnd_gen.rules import (
+    ABILITIES, CLASSES, POINT_BUY_BUDGET, RACES, SUBRACES, apply_racial_asi, point_buy_spent,
+    racial_vector,
+)
+
+def _value(final, char_class):
+    """The class score written out, for every row of `final` at once."""
+    final = np.asarray(final, dtype=int)
+    return ((((final - 10) // 2) * 1000 + final) * class_weights(char_class)).sum(axis=-1)
+
+def test_every_allocation_spends_exactly_27_points():
+    assert POINT_BUY_BUDGET == 27
+    assert len(ALLOCATIONS) == 12_282
+    assert len({tuple(row) for row in ALLOCATIONS.tolist()}) == len(ALLOCATIONS)
+    assert ALLOCATIONS.min() >= 8 and ALLOCATIONS.max() <= 15
+    for row in ALLOCATIONS.tolist():
+        assert point_buy_spent(dict(zip(ABILITIES, row))) == 27
+
+def test_find_allocations_respects_bounds():
+    found = find_allocations({"Dexterity": 15, "Constitution": 14}, {"Charisma": 8})
+    assert found
+    for stats in found:
+        assert stats["Dexterity"] >= 15 and stats["Constitution"] >= 14
+        assert stats["Charisma"] == 8
+        assert point_buy_spent(stats) == 27
+
+@pytest.mark.parametrize("char_class", CLASSES)
+@pytest.mark.parametrize("race", [None, *RACES])
+def test_optimizer_spends_27_points_on_the_best_allocation(char_class, race):
+    stats, extras = optimize_point_buy(char_class, race)
+    assert point_buy_spent(stats) == 27
+    final = apply_racial_asi(stats, race, extras) if race else stats
+    vector = np.zeros(len(ABILITIES), dtype=int) if race is None else racial_vector(race, extras)
+    best = _value(ALLOCATIONS.astype(int) + vector, char_class).max()
+    assert _value([final[a] for a in ABILITIES], char_class) == best
+
+def test_subraces_spend_27_points():
+    for race, subraces in SUBRACES.items():
+        for subrace in subraces:
+            stats, _ = optimize_point_buy("Wizard", race, subrace=subrace)
+            assert point_buy_spent(stats) == 27
+
+def test_half_elf_extras_are_kept_when_given():
+    _, extras = optimize_point_buy("Fighter", "Half-Elf", ["Strength", "Wisdom"])
+    assert list(extras) == ["Strength", "Wisdom"]
@@ -0,0 +1,65 @@
+from itertools import product
+
+import numpy as np
+import pytest
+
+from dnd_gen.probability import (
+    STANDARD, RollRule, array_percentile, modifier_distribution, monte_carlo_pmf, percentile,
+    sample_scores, score_pmf, total_pmf,
+)
+from dnd_gen.rules import ABILITIES
+
+def _enumerate(rule):
+    """The score distribution of `rule` by listing every roll."""
+    faces = range(rule.min_face, rule.sides + 1)
+    pmf = np.zeros(rule.keep * rule.sides + 1)
+    for roll in product(faces, repeat=rule.dice):
+        pmf[sum(sorted(roll)[rule.dice - rule.keep:])] += 1
+    return pmf / pmf.sum()
+
+@pytest.mark.parametrize("rule", [STANDARD, RollRule(min_face=2), RollRule(dice=3),
+                                  RollRule(dice=5, keep=3), RollRule(sides=8, keep=2)])
+def test_score_pmf_matches_enumeration(rule):
+    assert score_pmf(rule) == pytest.approx(_enumerate(rule), abs=1e-12)
+
+def test_known_4d6_drop_lowest_values():
+    pmf = score_pmf()
+    assert pmf[3] * 6 ** 4 == pytest.approx(1)
+    assert pmf[18] * 6 ** 4 == pytest.approx(21)
+    assert (pmf * np.arange(len(pmf))).sum() == pytest.approx(15869 / 1296)
+
+def test_total_is_the_sum_of_independent_scores():
+    total = total_pmf()
+    assert total.sum() == pytest.approx(1)
+    assert (total * np.arange(len(total))).sum() == pytest.approx(6 * 15869 / 1296)
+    assert total_pmf(count=2) == pytest.approx(np.convolve(score_pmf(), score_pmf()))
+
+def test_distributions_are_read_only():
+    with pytest.raises(ValueError):
+        score_pmf()[3] = 1.0
+
+def test_modifier_distribution_applies_racial_bonuses():
+    plain = modifier_distribution()
+    dwarf = modifier_distribution(race="Dwarf", subrace="Hill Dwarf")
+    assert set(plain) == set(ABILITIES)
+    for dist in plain.values():
+        assert sum(dist.values()) == pytest.approx(1)
+    assert min(plain["Constitution"]) == -4 and max(plain["Constitution"]) == 4
+    # Constitution +2: a 3 becomes a 5, modifier -3
+    assert min(dwarf["Constitution"]) == -3 and max(dwarf["Constitution"]) == 5
+    with pytest.raises(ValueError):
+        modifier_distribution(race="Dwarf", subrace="Wood Elf")
+
+def test_percentiles():
+    pmf = score_pmf()
+    assert percentile(2, pmf) == 0.0
+    assert percentile(19, pmf) == 100.0
+    assert percentile(18, pmf) == pytest.approx(100 * (1 - pmf[18] / 2))
+    assert array_percentile(dict.fromkeys(ABILITIES, 3)) < 0.01
+    assert array_percentile(dict.fromkeys(ABILITIES, 18)) > 99.99
+
+def test_monte_carlo_approaches_the_exact_pmf():
+    rule = RollRule(dice=5, keep=3)
+    pmf = monte_carlo_pmf(lambda rng, n: sample_scores(rule, rng, n), ("5d6k3", "test"),
+                          n=400_000, rng=np.random.default_rng(0))
+    assert np.abs(pmf - score_pmf(rule)[:len(pmf)]).max() < 0.005
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from dnd_gen.asiplan import plan_asis
+from dnd_gen.batch import generate_characters
+from dnd_gen.character import Character
+from dnd_gen.progression import Progression, progress_batch, timeline
+from dnd_gen.rules import (
+    ABILITIES, CLASSES, MAX_LEVEL, PROFICIENCY_BONUS, asi_levels, asi_slots_available,
+)
+
+STATS = {"Strength": 15, "Dexterity": 14, "Constitution": 13,
+         "Intelligence": 12, "Wisdom": 10, "Charisma": 8}
+
+def _novice(char_class="Fighter", level=1):
+    return Character("Arin", "Human", char_class, "Soldier", "Lawful Good", level, STATS)
+
+def test_unchanged_levels_share_their_snapshot_state():
+    snapshots = timeline(_novice())
+    assert [s.level for s in snapshots] == list(range(1, MAX_LEVEL + 1))
+    for prev, snap in zip(snapshots, snapshots[1:]):
+        assert snap.previous is prev
+        assert snap.proficiency_bonus == PROFICIENCY_BONUS[snap.level]
+        if snap.asis:
+            assert snap.scores != prev.scores
+        else:
+            assert snap.scores is prev.scores and snap.modifiers is prev.modifiers
+    assert {s.level for s in snapshots if s.asis} == set(asi_levels("Fighter"))
+
+def test_each_level_spends_what_the_planner_would():
+    progression = Progression(_novice())
+    for level in range(2, MAX_LEVEL + 1):
+        prev = progression.at(level - 1)
+        snap = progression.at(level)
+        plan = plan_asis(prev.stats, "Fighter", level, prev.asis_spent)
+        assert snap.asis == tuple(asi[1:] for asi in plan)
+        assert snap.asis_earned == asi_slots_available("Fighter", level)
+        assert snap.modifiers == tuple((s - 10) // 2 for s in snap.scores)
+
+def test_reached_levels_are_lookups():
+    progression = Progression(_novice())
+    eight = progression.at(8)
+    assert progression.at(8) is eight
+    assert progression.at(12).previous.previous.previous.previous is eight
+    with pytest.raises(ValueError):
+        progression.at(0)
+
+def test_banked_asis_stay_unspent():
+    final = timeline(_novice(), spend=None)[-1]
+    assert final.scores == tuple(STATS[a] for a in ABILITIES)
+    assert final.unspent == asi_slots_available("Fighter", MAX_LEVEL)
+
+def test_character_at_leaves_the_original_alone():
+    char = _novice()
+    progression = Progression(char)
+    later = progression.character_at(12)
+    assert later.level == 12 and char.level == 1
+    assert later.final_stats == progression.at(12).stats
+    assert later.base_stats == char.base_stats == STATS
+
+def test_starting_mid_career_counts_spent_asis():
+    char = _novice("Rogue", 10)
+    progression = Progression(char, asis_spent=asi_slots_available("Rogue", 10))
+    assert progression.at(11).asis == ()
+
+def test_batch_matches_the_scalar_progression():
+    batch = generate_characters(300, rng=np.random.default_rng(0))
+    out = progress_batch(batch["final_stats"], batch["class"])
+    assert out["level"].tolist() == list(range(1, MAX_LEVEL + 1))
+    for row in range(0, 300, 23):
+        char = Character("x", "Human", CLASSES[batch["class"][row]], "Sage", "True Neutral", 1,
+                         dict(zip(ABILITIES, batch["base_stats"][row].tolist())),
+                         dict(zip(ABILITIES, batch["final_stats"][row].tolist())))
+        for i, snap in enumerate(timeline(char)):
+            assert tuple(out["final_stats"][i][row].tolist()) == snap.scores
+            assert tuple(out["modifiers"][i][row].tolist()) == snap.modifiers
+            assert out["asis_spent"][i][row] == snap.asis_spent
+
+def test_batch_arrays_are_shared_and_read_only():
+    batch = generate_characters(50, char_class="Wizard", rng=np.random.default_rng(1))
+    out = progress_batch(batch["final_stats"], batch["class"])
+    assert out["final_stats"][1] is out["final_stats"][0]        # nothing at level 2
+    assert not np.shares_memory(out["final_stats"][0], batch["final_stats"])
+    for arrays in out.values():
+        for array in arrays if isinstance(arrays, list) else (arrays,):
+            with pytest.raises(ValueError):
+                array[...] = 0
+
+def test_batch_arguments_are_checked():
+    with pytest.raises(ValueError):
+        progress_batch(np.full((1, 6), 10), 0, level=5, to_level=4)
+    with pytest.raises(ValueError):
+        progress_batch(np.full((1, 6), 10), 0, spend="greedy")
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+from dnd_gen.character import Character
+from dnd_gen.render import SHEET_FORMATS, render, write_sheets
+from dnd_gen.rules import apply_racial_asi
+from dnd_gen.sheet import iter_characters, sheet_text
+
+STATS = {"Strength": 15, "Dexterity": 14, "Constitution": 13,
+         "Intelligence": 12, "Wisdom": 10, "Charisma": 8}
+
+def classic_sheet(char):
+    """The ``.txt`` sheet exactly as the app has always built it."""
+    txt = f"""D&D Character Sheet (PHB Only)
+--------------------
+Name: {char.name}
+Race: {char.lineage}
+Class: {char.char_class}
+Background: {char.background}
+Alignment: {char.alignment}
+Level: {char.level}
+
+Ability Scores (base – before lineage bonuses):
+"""
+    for stat, score in char.base_stats.items():
+        txt += f"    {stat}: {score}\n"
+
+    if char.apply_racial:
+        txt += "\nAbility Scores (final – after lineage bonuses):\n"
+        for stat, score in char.final_stats.items():
+            txt += f"    {stat}: {score}\n"
+
+    txt += f"\nBackstory:\n{char.backstory}\n"
+    txt += "\nNote: This character was created using only options from the official Player's Handbook (PHB).\n"
+    return txt
+
+def _characters():
+    yield Character("Arin Stoneheart", "Half-Elf", "Fighter", "Soldier", "Lawful Good", 8,
+                    STATS, apply_racial_asi(STATS, "Half-Elf"), "Arin grew up on the march.\n" * 3)
+    yield Character("Tova", "Dwarf", "Cleric", "Acolyte", "Neutral Good", 1, STATS,
+                    apply_racial_asi(STATS, "Dwarf", subrace="Hill Dwarf"),
+                    "100% {braces} and %s stay as written.", subrace="Hill Dwarf")
+    yield Character("Nim", "Gnome", "Wizard", "Sage", "True Neutral", 3, STATS, STATS,
+                    "", apply_racial=False)
+
+@pytest.mark.parametrize("char", list(_characters()), ids=lambda c: c.name)
+def test_txt_sheet_is_byte_identical_to_the_classic_sheet(char):
+    assert render(char, "txt").encode() == classic_sheet(char).encode()
+    assert sheet_text(char) == classic_sheet(char)
+
+def test_written_sheets_are_the_sheets_back_to_back():
+    npcs = list(iter_characters(1_200, seed=0))
+    out = io.BytesIO()
+    written = write_sheets(npcs, out, "txt")
+    expected = "".join(classic_sheet(c) for c in npcs).encode()
+    assert out.getvalue() == expected
+    assert written == len(expected)
+
+@pytest.mark.parametrize("fmt", SHEET_FORMATS)
+def test_every_format_renders(fmt):
+    for char in _characters():
+        assert char.name in render(char, fmt)
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        render(next(_characters()), "pdf")
@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import pytest
+
+from dnd_gen.resilience import (
+    CircuitBreaker, CircuitOpen, DeadlineExceeded, ProviderUnavailable, Resilience, _env_hedge,
+)
+
+def _policy(**kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failures=100))
+    return Resilience(**{"backoff": 0.01, "max_backoff": 0.01, **kwargs})
+
+def test_transient_failures_are_retried():
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise TimeoutError
+        return "ok"
+
+    assert _policy(retries=2).call(attempt) == "ok"
+    assert len(calls) == 3
+
+def test_retries_run_out():
+    def attempt(timeout):
+        raise ConnectionError("down")
+
+    with pytest.raises(ProviderUnavailable):
+        _policy(retries=1).call(attempt)
+
+def test_other_errors_are_not_retried():
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        _policy().call(attempt)
+    assert len(calls) == 1
+
+def test_attempts_are_cut_to_the_time_left():
+    policy = _policy(timeout=5.0, slo=0.3)
+    seen = []
+
+    def attempt(timeout):
+        seen.append(timeout)
+        time.sleep(timeout)
+        raise TimeoutError
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        policy.call(attempt)
+    assert time.monotonic() - started < 0.6
+    assert seen[0] <= 0.3
+
+def test_a_spent_deadline_makes_no_attempt():
+    with pytest.raises(DeadlineExceeded):
+        _policy().call(lambda timeout: "late", deadline=time.monotonic() - 1)
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=2, cooldown=0.1)
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    time.sleep(0.11)
+    assert breaker.state == "half-open"
+    breaker.check()
+    with pytest.raises(CircuitOpen):
+        breaker.check()         # one probe at a time
+    breaker.failure()
+    assert breaker.state == "open"
+    time.sleep(0.11)
+    breaker.check()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.opened == 2
+
+def test_open_breaker_fails_calls_at_once():
+    def attempt(timeout):
+        raise TimeoutError
+
+    policy = _policy(breaker=CircuitBreaker(failures=1, cooldown=30))
+    with pytest.raises(ProviderUnavailable):
+        policy.call(attempt)
+    with pytest.raises(CircuitOpen):
+        policy.call(lambda timeout: "ok")
+
+def test_a_hedge_answers_for_a_slow_attempt():
+    policy = _policy(hedge=0.95, hedge_delay=0.05, timeout=2.0)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            time.sleep(1.0)
+            return "slow"
+        return "fast"
+
+    extra = []
+    started = time.monotonic()
+    assert policy.call(attempt, on_retry=lambda: extra.append(1)) == "fast"
+    assert time.monotonic() - started < 0.5
+    assert extra == [1]
+
+def test_a_hedged_call_still_times_out():
+    policy = _policy(hedge=0.95, hedge_delay=0.05, timeout=0.3, slo=0.4, retries=0)
+    started = time.monotonic()
+    with pytest.raises((ProviderUnavailable, DeadlineExceeded)):
+        policy.call(lambda timeout: time.sleep(2))
+    assert time.monotonic() - started < 1.0
+
+def test_async_hedge_and_deadline():
+    policy = _policy(hedge=0.95, hedge_delay=0.05, timeout=0.5, slo=0.6, retries=0)
+    calls = []
+
+    async def attempt(timeout):
+        calls.append(timeout)
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def stuck(timeout):
+        await asyncio.sleep(5)
+
+    assert asyncio.run(policy.acall(attempt)) == 2
+    started = time.monotonic()
+    with pytest.raises((ProviderUnavailable, DeadlineExceeded)):
+        asyncio.run(policy.acall(stuck, hedge=False))
+    assert time.monotonic() - started < 1.0
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), ("", None), ("0", None), ("off", None),
+    ("on", 0.95), ("p95", 0.95), ("p50", 0.5), ("0.9", 0.9), ("1", 1.0), ("2.5", 2.5),
+])
+def test_hedge_setting(value, expected):
+    assert _env_hedge(value) == expected
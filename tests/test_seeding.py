@@ -0,0 +1,87 @@
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from dnd_gen import seeding, sheet
+from dnd_gen.batch import generate_characters
+from dnd_gen.sheet import character_from_seed, chunk_plan, iter_characters, iter_chunks
+from dnd_gen.store import set_character_store
+
+APP = Path(__file__).resolve().parent.parent / "dnd_generator_app.py"
+
+def _key(char):
+    return (char.name, char.race, char.char_class, char.background, char.alignment,
+            char.scores, char.backstory, char.seed)
+
+def test_a_run_repeats_with_its_seed():
+    first = [_key(c) for c in iter_characters(500, seed=42)]
+    assert first == [_key(c) for c in iter_characters(500, seed=42)]
+    assert first != [_key(c) for c in iter_characters(500, seed=43)]
+
+def test_every_character_replays_from_its_own_seed():
+    for char in list(iter_characters(200, seed=7, spend_asis=True, level=9))[::17]:
+        again = character_from_seed(char.seed, spend_asis=True, level=9)
+        assert _key(again) == _key(char)
+
+def test_options_replay_too():
+    options = dict(race="Dwarf", subrace="Mountain Dwarf", char_class="Fighter",
+                   method="pointbuy", apply_racial=True)
+    for char in iter_characters(20, seed=3, **options):
+        assert _key(character_from_seed(char.seed, **options)) == _key(char)
+
+def test_chunks_split_the_run_exactly(monkeypatch):
+    monkeypatch.setattr(sheet, "BATCH_CHUNK", 64)
+    plan = chunk_plan(300, seed=11)
+    assert [size for _, size in plan] == [64, 64, 64, 64, 44]
+    whole = [_key(c) for c in iter_characters(300, seed=11)]
+    parts = [_key(c) for part in (plan[:2], plan[2:]) for c in iter_chunks(part)]
+    assert parts == whole
+
+def test_rows_do_not_depend_on_their_batch():
+    seeds = seeding.character_seeds(seeding.spawn(5, 1)[0], 1_000)
+    whole = generate_characters(len(seeds), seeds=seeds)
+    part = generate_characters(10, seeds=seeds[500:510])
+    for field in ("race", "class", "base_stats", "final_stats"):
+        assert (whole[field][500:510] == part[field]).all()
+    assert (whole["base_stats"] == seeding.roll_scores(seeds)).all()
+
+def test_scalar_draws_match_the_vector_ones():
+    seeds = seeding.character_seeds(seeding.spawn(6, 1)[0], 50)
+    for position in (0, seeding.DICE, seeding.NAMES + 3):
+        vector = seeding.uniforms(seeds, position, 1)[:, 0]
+        scalar = [seeding.uniform_at(int(s), position) for s in seeds.tolist()]
+        assert vector.tolist() == scalar
+
+def test_seeds_fit_63_bits():
+    assert 0 <= seeding.new_seed() < 1 << seeding.SEED_BITS
+    seeds = seeding.character_seeds(seeding.spawn(None, 1)[0], 10_000)
+    assert int(seeds.max()) < 1 << seeding.SEED_BITS
+    assert len(np.unique(seeds)) == len(seeds)
+
+def test_app_replay_regenerates_a_character_whose_backstory_never_finished(tmp_path, monkeypatch):
+    testing = pytest.importorskip("streamlit.testing.v1")
+    path = tmp_path / "characters.db"
+    monkeypatch.setenv("DND_STORE_PATH", str(path))
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    set_character_store(None)
+
+    def session():
+        at = testing.AppTest.from_file(str(APP), default_timeout=60)
+        at.query_params["owner"] = "me"
+        at.run()
+        at.text_input(key="seed").input("77").run()
+        return at.button(key="create_character").click().run()
+
+    try:
+        first = session()
+        unfinished = first.session_state.sheet_id
+        with sqlite3.connect(path) as db:    # as if the tab closed mid-stream
+            db.execute("UPDATE characters SET backstory = NULL WHERE id = ?", (unfinished,))
+        second = session()
+        assert not second.exception
+        assert second.session_state.sheet_id != unfinished
+        assert second.session_state.sheet.backstory
+    finally:
+        set_character_store(None)
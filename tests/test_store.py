@@ -0,0 +1,107 @@
+import pytest
+
+from dnd_gen.sheet import iter_characters
+from dnd_gen.store import CharacterStore
+
+@pytest.fixture
+def store():
+    store = CharacterStore(":memory:")
+    yield store
+    store.close()
+
+def _walk(store, limit, **filters):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = store.page(cursor, limit, **filters)
+        seen += [row["id"] for row in rows]
+        if cursor is None:
+            return seen
+
+def test_keyset_pages_cover_every_row_once_newest_first(store):
+    assert store.add_many(iter_characters(237, seed=1), batch=50) == 237
+    ids = _walk(store, 50)
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == len(set(ids)) == 237 == len(store)
+
+def test_exact_page_multiple_ends_without_an_empty_page(store):
+    store.add_many(iter_characters(100, seed=2))
+    rows, cursor = store.page(limit=50)
+    rows, cursor = store.page(cursor, 50)
+    assert len(rows) == 50 and cursor is None
+
+def test_filtered_pages_and_counts_agree(store):
+    npcs = list(iter_characters(300, seed=3))
+    store.add_many(npcs)
+    elves = sum(c.race == "Elf" for c in npcs)
+    assert len(_walk(store, 7, race="Elf")) == elves == store.count(race="Elf")
+    wizards = [c for c in npcs if c.char_class == "Wizard" and c.level == 1]
+    assert store.count(char_class="Wizard", level=1) == len(wizards)
+    assert store.count(race=None) == 300
+    with pytest.raises(TypeError):
+        store.page(colour="red")
+
+def test_counts_follow_writes(store):
+    [a, b] = iter_characters(2, seed=4)
+    assert store.count() == 0
+    char_id = store.add(a)
+    assert store.count() == 1
+    store.add_many([b])
+    assert store.count() == 2
+    store.delete(char_id)
+    assert store.count() == 1
+
+def test_owners_see_only_their_characters(store):
+    [a, b, c] = iter_characters(3, seed=5)
+    store.add(a, owner="alice")
+    store.add(b, owner="bob")
+    store.add_many([c])
+    assert [r["name"] for r in store.page(owner="alice")[0]] == [a.name]
+    assert store.count(owner="bob") == 1
+    assert store.count() == 3
+
+def test_find_seed_matches_the_inputs(store):
+    [char] = iter_characters(1, seed=6)
+    char_id = store.add(char, asis_spent=1, owner="alice", gender="Female",
+                        racial_choices=["Wisdom", "Strength"], name_mode="Random")
+    found_id, found, spent = store.find_seed(char.seed, race=char.race, gender="Female",
+                                             racial_choices=["Strength", "Wisdom"],
+                                             name_mode="Random", owner="alice")
+    assert (found_id, found, spent) == (char_id, char, 1)
+    assert store.find_seed(char.seed, gender="Male") is None
+    assert store.find_seed(char.seed, racial_choices=["Strength", "Charisma"]) is None
+    assert store.find_seed(char.seed, owner="bob") is None
+    assert store.find_seed(char.seed, subrace=None)[0] == char_id
+    assert store.find_seed(char.seed + 1) is None
+
+def test_find_seed_returns_the_newest_match(store):
+    [char] = iter_characters(1, seed=7)
+    store.add(char)
+    newest = store.add(char)
+    assert store.find_seed(char.seed)[0] == newest
+
+def test_find_seed_skips_an_unfinished_backstory(store):
+    [char] = iter_characters(1, seed=10)
+    finished = store.add(char)
+    char.backstory = None       # saved while its backstory was still streaming
+    store.add(char)
+    assert store.find_seed(char.seed)[0] == finished
+    store.delete(finished)
+    assert store.find_seed(char.seed) is None
+
+def test_update_round_trips(store):
+    [char] = iter_characters(1, seed=8)
+    char_id = store.add(char)
+    char.level = 4
+    char.backstory = "Rewritten."
+    store.update(char_id, char, asis_spent=1)
+    assert store.get(char_id) == (char, 1)
+    assert store.count(level=4) == 1
+
+def test_rows_survive_reopening(tmp_path):
+    path = tmp_path / "characters.db"
+    store = CharacterStore(path)
+    store.add_many(iter_characters(10, seed=9))
+    store.close()
+    store = CharacterStore(path)
+    assert len(store) == 10
+    store.close()
@@ -0,0 +1,120 @@
+import pytest
+
+from dnd_gen import ai, templates
+from dnd_gen.cache import FIRST_NAME_SLOT, NAME_SLOT
+from dnd_gen.rules import PRONOUNS
+from dnd_gen.templates import (
+    TemplateBank, make_template, personalize, pronoun_group, set_template_bank, template_key,
+)
+
+HE, SHE, THEY = PRONOUNS["Male"], PRONOUNS["Female"], PRONOUNS["Non-binary"]
+
+def test_names_and_pronouns_are_slotted():
+    story = "Arin Stone lost his way. He found him again; Arin kept it to himself."
+    template = make_template(story, "Arin Stone", HE)
+    assert template == (f"{NAME_SLOT} lost {{poss}} way. {{Subj}} found {{obj}} again; "
+                        f"{FIRST_NAME_SLOT} kept it to {{obj}}self.")
+    assert personalize(template, "Tova Hill", SHE) == \
+        "Tova Hill lost her way. She found her again; Tova kept it to herself."
+
+def test_her_is_read_from_the_next_word():
+    template = make_template("Her mentor taught her to read, and she gave her word.", None, SHE)
+    assert template == "{Poss} mentor taught {obj} to read, and {subj} gave {poss} word."
+    assert personalize(template, None, HE) == \
+        "His mentor taught him to read, and he gave his word."
+
+@pytest.mark.parametrize("story, pronoun", [("The choice was his.", HE),
+                                            ("The blade is hers now.", SHE)])
+def test_independent_possessives_are_not_kept(story, pronoun):
+    assert make_template(story, None, pronoun) is None
+
+def test_they_stories_keep_their_pronouns():
+    story = "Sam knew they were ready."
+    assert make_template(story, "Sam", THEY) == f"{NAME_SLOT} knew they were ready."
+    assert pronoun_group(HE) == pronoun_group(SHE) != pronoun_group(THEY)
+    assert template_key("Elf", "Wizard", "Sage", "True Neutral", HE) == \
+        template_key("Elf", "Wizard", "Sage", "True Neutral", SHE)
+
+def test_name_slots_are_left_for_later_without_a_name():
+    template = make_template(f"{NAME_SLOT} smiled; she was home.", None, SHE)
+    assert personalize(template, None, HE) == f"{NAME_SLOT} smiled; he was home."
+
+# ---------- The bank ----------
+KEY = ("backstory", "Elf", "Wizard", "Sage", "True Neutral", "he/she")
+
+class Clock:
+    now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(templates.time, "time", clock)
+    return clock
+
+def test_reuse_off_keeps_nothing(clock):
+    bank = TemplateBank(reuse=0)
+    bank.add(KEY, "story")
+    assert bank.draw(KEY) is None
+    assert bank.stats()["templates"] == 0
+
+def test_draws_spread_over_the_least_used_templates(clock):
+    bank = TemplateBank(reuse=1.0, max_uses=None)
+    assert bank.draw(KEY) is None           # nothing yet: write a fresh story
+    bank.add(KEY, "a")
+    bank.add(KEY, "b")
+    drawn = [bank.draw(KEY) for _ in range(6)]
+    assert sorted(drawn) == ["a", "a", "a", "b", "b", "b"]
+    assert bank.stats()["reused"] == 6 and bank.stats()["fresh"] == 1
+
+def test_templates_retire_after_max_uses_or_ttl(clock):
+    bank = TemplateBank(reuse=1.0, max_uses=2, ttl=60)
+    bank.add(KEY, "a")
+    assert [bank.draw(KEY) for _ in range(3)] == ["a", "a", None]
+    bank.add(KEY, "b")
+    clock.now += 61
+    assert bank.draw(KEY) is None
+
+def test_the_bank_is_bounded(clock):
+    bank = TemplateBank(reuse=1.0, size=2, max_keys=2)
+    for template in "abc":
+        bank.add(KEY, template)
+    assert {bank.draw(KEY) for _ in range(4)} == {"b", "c"}
+    bank.add(("other",), "x")
+    bank.add(("third",), "y")
+    assert bank.stats()["keys"] == 2 and bank.draw(KEY) is None
+
+def test_bad_reuse_ratio_is_refused():
+    with pytest.raises(ValueError):
+        TemplateBank(reuse=1.5)
+
+# ---------- Reuse mode end to end ----------
+SPEC = {"race": "Elf", "char_class": "Wizard", "background": "Sage",
+        "alignment": "True Neutral"}
+
+def test_one_completion_serves_a_whole_key(fake_openai):
+    set_template_bank(TemplateBank(reuse=1.0))
+    specs = [dict(SPEC, name=f"Hero {i}", gender=gender, pronoun=PRONOUNS[gender])
+             for i, gender in enumerate(["Female", "Male", "Female", "Male"])]
+    pairs = ai.generate_many(specs)
+    assert fake_openai.stats["requests"] == 1
+    for (name, story), spec in zip(pairs, specs):
+        assert name == spec["name"] and name in story
+        assert "{" not in story
+        other = "her" if spec["gender"] == "Male" else "his"
+        assert f" {other} " not in story
+
+def test_a_failed_ai_name_is_filled_in_offline(fake_openai, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("name service down")
+
+    monkeypatch.setattr(ai.get_name_pool(), "aget", broken)
+    monkeypatch.setattr(ai, "generate_name", lambda race: "Offline Name")
+    set_template_bank(TemplateBank(reuse=1.0))
+    spec = dict(SPEC, gender="Female", pronoun=PRONOUNS["Female"])
+    pairs = ai.generate_many([spec, dict(spec)])
+    for name, story in pairs:
+        assert name == "Offline Name" and "Offline Name" in story
+        assert "Error" not in story and NAME_SLOT not in story